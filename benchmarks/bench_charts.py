@@ -0,0 +1,53 @@
+"""
+bench_charts.py
+
+Benchmark of ChartGenerator's bar, line and box plots with and without preaggregate,
+on a synthetic year of WEX-style fuel transactions.
+
+Usage: python benchmarks/bench_charts.py [transactions]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from fuel_bill_automation.helpers.synthetic_data import make_wex_transactions
+from fuel_bill_automation.reports.charts import ChartGenerator
+
+
+def time_chart(
+    generator: ChartGenerator, method: str, filename: str, **options
+) -> float:
+    start = time.perf_counter()
+    getattr(generator, method)(filename=filename, **options)
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = make_wex_transactions(rows)
+    df["Day"] = df["Transaction Date"].dt.floor("D")
+
+    charts = [
+        ("bar_chart", {"x_col": "Department", "y_col": "Total Fuel Cost"}),
+        ("line_chart", {"x_col": "Day", "y_col": "Total Fuel Cost"}),
+        ("box_plot", {"x_col": "Department", "y_col": "Units"}),
+    ]
+
+    print(f"{rows} transactions")
+    with tempfile.TemporaryDirectory() as folder:
+        for method, options in charts:
+            times = []
+            for preaggregate in (False, True):
+                generator = ChartGenerator(df, preaggregate=preaggregate)
+                filename = os.path.join(folder, f"{method}_{preaggregate}.png")
+                times.append(time_chart(generator, method, filename, **options))
+            print(
+                f"{method:11s} raw {times[0]:7.2f} s   preaggregated {times[1]:7.2f} s"
+                f"   speedup {times[0] / times[1]:6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+bench_departments.py
+
+Benchmark of process_departments against process_departments_vectorized on synthetic
+multi-department financial summary tables.
+
+Usage: python benchmarks/bench_departments.py [departments] [columns] [lines]
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+from fuel_bill_automation.helpers.file_loader import (
+    process_departments,
+    process_departments_vectorized,
+)
+from fuel_bill_automation.helpers.synthetic_data import make_department_table
+
+
+def time_function(func, df: pd.DataFrame, repeat: int) -> float:
+    """Returns the best wall time of func(df) over repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    departments = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    lines = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+
+    df = make_department_table(departments, columns, lines)
+    expected = process_departments(df)
+    result = process_departments_vectorized(df)
+    assert result.equals(expected), "vectorized output differs from process_departments"
+
+    serial_time = time_function(process_departments, df, repeat=3)
+    vectorized_time = time_function(process_departments_vectorized, df, repeat=3)
+
+    print(
+        f"{departments} departments x {columns} columns x {lines} lines "
+        f"-> {len(expected)} rows"
+    )
+    print(f"process_departments:            {serial_time * 1000:9.1f} ms")
+    print(f"process_departments_vectorized: {vectorized_time * 1000:9.1f} ms")
+    print(f"speedup: {serial_time / vectorized_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
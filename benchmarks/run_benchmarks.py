@@ -0,0 +1,325 @@
+"""
+run_benchmarks.py
+
+Benchmark suite over the hot paths of file_loader, data_cleaner, reports/excel and
+reports/charts, on synthetic data from helpers.synthetic_data. Each case runs in a fresh
+process, so its peak resident memory is its own, and is timed as the best of several
+runs, then run once more under tracemalloc for its peak traced memory. The peak memory
+of the worker processes a case starts is recorded too. Results are written as JSON
+lines; given a baseline file from an earlier run, cases that got slower or bigger than
+the tolerance allows are reported and the exit code is 1. Cases whose optional
+dependencies are missing, e.g. reportlab for the PDF case (pip install .[bench]), are
+skipped.
+
+Usage: python benchmarks/run_benchmarks.py [--scale 1.0] [--repeat 3]
+           [--output results.jsonl] [--baseline baseline.jsonl] [--tolerance 0.25]
+           [--only case ...]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from fuel_bill_automation.helpers.data_cleaner import (
+    MonthPartitionedFrame,
+    filter_by_month,
+    reconcile_job_numbers,
+)
+from fuel_bill_automation.helpers.file_loader import (
+    extract_tables_from_pdf,
+    iter_xlsx_chunks,
+    load_and_concatenate_xlsx,
+    load_and_concatenate_xlsx_parallel,
+    process_departments_vectorized,
+)
+from fuel_bill_automation.helpers.instrumentation import peak_rss_bytes, run_log
+from fuel_bill_automation.helpers.synthetic_data import (
+    make_department_table,
+    make_labor_sheet,
+    make_wex_transactions,
+    write_financial_summary_pdf,
+    write_labor_workbooks,
+)
+from fuel_bill_automation.reports.charts import ChartGenerator, ChartSpec
+from fuel_bill_automation.reports.excel import (
+    DataFrameSummarizer,
+    SummarySpec,
+    SummaryWorkbookWriter,
+)
+
+# Each case builds its inputs in folder at the given scale and returns
+# (function to benchmark, rows it processes)
+
+
+def labor_workbooks(folder, scale):
+    paths = write_labor_workbooks(
+        os.path.join(folder, "labor"), 8, int(5_000 * scale), month=3
+    )
+    return lambda: load_and_concatenate_xlsx(paths), 8 * int(5_000 * scale)
+
+
+def labor_workbooks_parallel(folder, scale):
+    paths = write_labor_workbooks(
+        os.path.join(folder, "labor_parallel"), 8, int(5_000 * scale), month=3
+    )
+    return lambda: load_and_concatenate_xlsx_parallel(paths), 8 * int(5_000 * scale)
+
+
+def xlsx_chunks(folder, scale):
+    rows = int(50_000 * scale)
+    file_path = os.path.join(folder, "chunks.xlsx")
+    make_labor_sheet(rows).to_excel(file_path, index=False)
+
+    def run():
+        return sum(len(chunk) for chunk in iter_xlsx_chunks(file_path))
+
+    return run, rows
+
+
+def financial_summary_pdf(folder, scale):
+    pages, departments, lines = max(1, int(20 * scale)), 8, 12
+    file_path = write_financial_summary_pdf(
+        os.path.join(folder, "financial_summary.pdf"), pages, departments, 4, lines
+    )
+    return lambda: extract_tables_from_pdf(file_path), pages * departments * lines
+
+
+def department_tables(folder, scale):
+    departments, lines = max(1, int(200 * scale)), 40
+    table = make_department_table(departments, 6, lines)
+    return lambda: process_departments_vectorized(table), departments * lines
+
+
+def month_filter(folder, scale):
+    df = make_wex_transactions(int(1_000_000 * scale))
+    return lambda: filter_by_month(df, "Transaction Date", 6, 2024), len(df)
+
+
+def month_partitions(folder, scale):
+    df = make_wex_transactions(int(1_000_000 * scale))
+
+    def run():
+        partitioned = MonthPartitionedFrame(df, "Transaction Date")
+        return [partitioned.month(month, 2024) for month in range(1, 13)]
+
+    return run, len(df)
+
+
+def job_reconciliation(folder, scale):
+    rows = int(500_000 * scale)
+    labor = make_labor_sheet(rows, seed=1)
+    man_hours = make_labor_sheet(rows, seed=2)
+    return (
+        lambda: reconcile_job_numbers(
+            labor, man_hours, "Employee", "Date", "Job Number"
+        ),
+        2 * rows,
+    )
+
+
+def summaries(folder, scale):
+    df = make_wex_transactions(int(500_000 * scale))
+    specs = [
+        SummarySpec("describe"),
+        SummarySpec(
+            "group_by",
+            {
+                "group_columns": ["Department"],
+                "agg_funcs": {"Total Fuel Cost": "sum", "Units": "mean"},
+            },
+        ),
+        SummarySpec("value_counts", {"columns": ["Vehicle", "Product"]}),
+        SummarySpec("missing_values_table"),
+    ]
+    return lambda: DataFrameSummarizer([df]).summarize(specs), len(df)
+
+
+def summary_workbook(folder, scale):
+    df = make_wex_transactions(int(100_000 * scale))
+    file_path = os.path.join(folder, "summary.xlsx")
+
+    def run():
+        with SummaryWorkbookWriter(file_path) as writer:
+            writer.add_frame("Fuel", df, index=False)
+
+    return run, len(df)
+
+
+def charts(folder, scale):
+    df = make_wex_transactions(int(200_000 * scale))
+    df["Day"] = df["Transaction Date"].dt.floor("D")
+    specs = [
+        ChartSpec(
+            "bar_chart",
+            os.path.join(folder, "bar.png"),
+            {"x_col": "Department", "y_col": "Total Fuel Cost"},
+        ),
+        ChartSpec(
+            "line_chart",
+            os.path.join(folder, "line.png"),
+            {"x_col": "Day", "y_col": "Total Fuel Cost"},
+        ),
+        ChartSpec(
+            "box_plot",
+            os.path.join(folder, "box.png"),
+            {"x_col": "Department", "y_col": "Units"},
+        ),
+    ]
+    generator = ChartGenerator(df, preaggregate=True)
+    # In this process, so tracemalloc sees the rendering
+    return lambda: generator.render_batch(specs, max_workers=1), len(df)
+
+
+CASES = {
+    "file_loader.load_and_concatenate_xlsx": labor_workbooks,
+    "file_loader.load_and_concatenate_xlsx_parallel": labor_workbooks_parallel,
+    "file_loader.iter_xlsx_chunks": xlsx_chunks,
+    "file_loader.extract_tables_from_pdf": financial_summary_pdf,
+    "file_loader.process_departments_vectorized": department_tables,
+    "data_cleaner.filter_by_month": month_filter,
+    "data_cleaner.MonthPartitionedFrame": month_partitions,
+    "data_cleaner.reconcile_job_numbers": job_reconciliation,
+    "excel.DataFrameSummarizer.summarize": summaries,
+    "excel.SummaryWorkbookWriter": summary_workbook,
+    "charts.render_batch": charts,
+}
+
+
+def run_case(name, folder, scale, repeat):
+    """
+    Times one case as the best of repeat runs and measures its peak memory. Run it in a
+    fresh process, as the peak resident memory is the process's high-water mark.
+    """
+    # Keep the suite's own stage records out of a run log set by FUEL_BILL_RUN_LOG
+    run_log.configure(None)
+    rss_start = peak_rss_bytes()
+    func, rows = CASES[name](folder, scale)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = min(times)
+    peak_rss = peak_rss_bytes()
+    return {
+        "case": name,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+        "peak_bytes": peak_bytes,
+        "peak_rss_bytes": peak_rss,
+        "peak_rss_growth_bytes": (
+            peak_rss - rss_start if None not in (peak_rss, rss_start) else None
+        ),
+        "worker_peak_rss_bytes": worker_peak_rss_bytes(),
+        "scale": scale,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def worker_peak_rss_bytes():
+    """Returns the largest peak resident memory of this process's finished children."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case_in_process(name, folder, scale, repeat):
+    """Runs one case in a fresh process; returns None if its dependencies are missing."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        try:
+            return executor.submit(run_case, name, folder, scale, repeat).result()
+        except ImportError as e:
+            print(f"{name:48s} skipped: {e}")
+            return None
+
+
+def find_regressions(results, baseline_path, tolerance):
+    """Compares results with a baseline run at the same scale; returns the regressions."""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {
+            record["case"]: record for record in map(json.loads, file) if record
+        }
+
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["case"])
+        if previous is None or previous["scale"] != result["scale"]:
+            continue
+        for metric in (
+            "seconds",
+            "peak_bytes",
+            "peak_rss_growth_bytes",
+            "worker_peak_rss_bytes",
+        ):
+            if result.get(metric) is None or previous.get(metric) is None:
+                continue
+            if result[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{result['case']}: {metric} {previous[metric]} -> {result[metric]}"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.jsonl")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--only", nargs="*", choices=sorted(CASES), default=None)
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for name in args.only or CASES:
+            result = run_case_in_process(name, folder, args.scale, args.repeat)
+            if result is None:
+                continue
+            results.append(result)
+            workers = result["worker_peak_rss_bytes"]
+            print(
+                f"{name:48s} {result['seconds']:8.3f} s "
+                f"{result['rows_per_second'] or 0:>12,} rows/s "
+                f"{result['peak_bytes'] / 1024**2:9.1f} MiB traced "
+                f"{(result['peak_rss_growth_bytes'] or 0) / 1024**2:9.1f} MiB RSS growth"
+                + (f" {workers / 1024**2:9.1f} MiB workers" if workers else "")
+            )
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        for result in results:
+            file.write(json.dumps(result) + "\n")
+
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
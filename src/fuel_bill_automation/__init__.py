@@ -1,3 +1,29 @@
-from . import reports
+"""
+Fuel bill automation.
 
-print("welcome to the fuel bill automation")
+Subpackages are imported on first attribute access, so importing the package, or a
+command that only needs a few light modules, does not load pandas or matplotlib.
+"""
+
+import importlib
+
+_SUBPACKAGES = (
+    "configs",
+    "helpers",
+    "models",
+    "outlook",
+    "pipeline",
+    "reports",
+    "scrapers",
+    "views",
+)
+
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBPACKAGES))
@@ -0,0 +1,5 @@
+import sys
+
+from fuel_bill_automation.cli import main
+
+sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+cli.py
+
+The fuel-bill command line, with one subcommand per task. Each subcommand imports what
+it needs when it runs, so light commands such as scan or harvest start without loading
+pandas or matplotlib; startup-check measures that with python -X importtime.
+
+Usage: fuel-bill <command> [options], or python -m fuel_bill_automation <command>
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+# Cumulative import time allowed for the CLI and the modules of its light commands
+IMPORT_TIME_BUDGET_MS = 300
+LIGHT_COMMAND_MODULES = (
+    "fuel_bill_automation.cli",
+    "fuel_bill_automation.helpers.folder_scanner",
+    "fuel_bill_automation.helpers.folder_index",
+    "fuel_bill_automation.outlook.harvester",
+    "fuel_bill_automation.outlook.sender",
+    "fuel_bill_automation.scrapers.core",
+    "fuel_bill_automation.scrapers.wex",
+    "fuel_bill_automation.scrapers.trust",
+    "fuel_bill_automation.scrapers.sharepoint",
+)
+# Modules light commands must not import
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "seaborn", "pyarrow", "pdfplumber")
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+_START_MARKER = "-- fuel-bill import check --"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["backfill"]:
+        # argparse's REMAINDER would not pass on leading options such as --help
+        return _run_backfill(argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    return args.handler(args) or 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="fuel-bill", description="Fuel bill automation tasks."
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    month = commands.add_parser("month", help="Run one month's pipeline.")
+    month.add_argument("month", type=parse_month, help="Month, YYYY-MM")
+    month.add_argument("--output", default=None, help="Folder of the report workbook")
+    month.add_argument("--workers", type=int, default=None)
+    month.set_defaults(handler=_run_month)
+
+    # Listed for the help only; main hands its arguments to pipeline.backfill.main
+    commands.add_parser(
+        "backfill", help="Regenerate the fuel bills of a range of months."
+    )
+
+    scan = commands.add_parser(
+        "scan", help="Print the latest matching file of a folder."
+    )
+    scan.add_argument("folder")
+    scan.add_argument("--extension", default=None, help="e.g. .xlsx")
+    scan.add_argument("--pattern", default=None, help="Regex the file name must match")
+    scan.add_argument(
+        "--days", type=float, default=None, help="Only files modified this recently"
+    )
+    scan.add_argument(
+        "--index", action="store_true", help="Search the persistent folder index"
+    )
+    scan.set_defaults(handler=_run_scan)
+
+    index = commands.add_parser("index", help="Bring the folder index up to date.")
+    index.add_argument("folders", nargs="+")
+    index.add_argument("--full", action="store_true", help="List every directory again")
+    index.set_defaults(handler=_run_index)
+
+    harvest = commands.add_parser(
+        "harvest", help="Save new matching attachments from the Outlook inbox."
+    )
+    harvest.add_argument("search_word")
+    harvest.add_argument("extension", help="e.g. .pdf")
+    harvest.add_argument("save_path")
+    harvest.set_defaults(handler=_run_harvest)
+
+    review = commands.add_parser(
+        "review", help="Open a CSV or Excel file in the review window."
+    )
+    review.add_argument("file")
+    review.add_argument("--sheet", default=None, help="Sheet of an Excel file")
+    review.set_defaults(handler=_run_review)
+
+    check = commands.add_parser(
+        "startup-check",
+        help="Measure the import time of the light commands against the budget.",
+    )
+    check.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    check.add_argument("--top", type=int, default=10, help="Slowest imports shown")
+    check.set_defaults(handler=_run_startup_check)
+    return parser
+
+
+def measure_import_time(modules=LIGHT_COMMAND_MODULES):
+    """
+    Import modules in a fresh interpreter under python -X importtime.
+
+    :param modules: Names of the modules to import.
+    :return: (total milliseconds, list of (milliseconds, module) of every import
+             sorted slowest first, set of imported top-level packages)
+    """
+    code = (
+        f"import sys; print({_START_MARKER!r}, file=sys.stderr, flush=True); "
+        f"import {', '.join(modules)}"
+    )
+    environment = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [package_root, environment.get("PYTHONPATH")])
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=environment,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    lines = completed.stderr.splitlines()
+    lines = lines[lines.index(_START_MARKER) + 1 :]
+    total_us = 0
+    imports = []
+    packages = set()
+    for line in lines:
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        _, cumulative_us, indent, name = match.groups()
+        if not indent:
+            total_us += int(cumulative_us)
+        imports.append((int(cumulative_us) / 1000, name))
+        packages.add(name.split(".")[0])
+    imports.sort(reverse=True)
+    return total_us / 1000, imports, packages
+
+
+def _run_month(args):
+    from fuel_bill_automation.pipeline.monthly import run_month
+
+    year, month = args.month
+    run = run_month(year, month, max_workers=args.workers, output_directory=args.output)
+    for name, seconds in sorted(run.seconds.items(), key=lambda item: -item[1]):
+        print(f"{name:24s} {seconds:8.2f} s")
+    print(f"{'total':24s} {run.wall_seconds:8.2f} s")
+    print(run.results.get("report", ""))
+
+
+def _run_backfill(arguments):
+    from fuel_bill_automation.pipeline.backfill import main as backfill_main
+
+    backfill_main(arguments)
+    return 0
+
+
+def _run_scan(args):
+    from fuel_bill_automation.helpers.folder_scanner import find_latest_file
+
+    modified_within = timedelta(days=args.days) if args.days is not None else None
+    if args.index:
+        from fuel_bill_automation.helpers.folder_index import FolderIndex
+
+        with FolderIndex() as index:
+            path = find_latest_file(
+                args.folder, args.extension, args.pattern, None, modified_within, index
+            )
+    else:
+        path = find_latest_file(
+            args.folder, args.extension, args.pattern, None, modified_within
+        )
+    if path is None:
+        print("No matching file", file=sys.stderr)
+        return 1
+    print(path)
+
+
+def _run_index(args):
+    from fuel_bill_automation.helpers.folder_index import FolderIndex
+
+    with FolderIndex() as index:
+        for folder in args.folders:
+            listed = index.refresh(folder, full=args.full)
+            print(f"{folder}: listed {listed} directories")
+
+
+def _run_harvest(args):
+    from fuel_bill_automation.outlook.harvester import harvest_attachments
+
+    result = harvest_attachments(args.search_word, args.extension, args.save_path)
+    for error in result.errors:
+        print(error, file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+def _run_review(args):
+    from fuel_bill_automation.views.review_window import read_for_review, show_dataframe
+
+    return show_dataframe(
+        read_for_review(args.file, args.sheet), os.path.basename(args.file)
+    )
+
+
+def _run_startup_check(args):
+    total_ms, imports, packages = measure_import_time()
+    heavy = sorted(packages.intersection(HEAVY_MODULES))
+    for milliseconds, name in imports[: args.top]:
+        print(f"{milliseconds:9.1f} ms  {name}")
+    print(f"Light command imports: {total_ms:.1f} ms (budget {args.budget_ms:g} ms)")
+    if heavy:
+        print(f"Heavy modules imported: {', '.join(heavy)}")
+    return 1 if heavy or total_ms > args.budget_ms else 0
+
+
+def parse_month(text):
+    """argparse type of a YYYY-MM month; returns (year, month)."""
+    try:
+        parsed = datetime.strptime(text, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM, got '{text}'")
+    return parsed.year, parsed.month
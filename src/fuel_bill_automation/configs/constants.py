@@ -28,3 +28,42 @@ MAN_HOURS_LABOR_SHEET = r"L:\Rollout\Vehicle Management - SC\Fuel Bills\2024\08
 LABOR_REPORT_DIRECTORY = (
     r"L:\Rollout\Admin - FS\Admin\Admin Report\Hotels - Admin\Labor Reports"
 )
+
+# LOCAL DATA STUFF
+APP_DATA_DIRECTORY = os.path.join(os.path.expanduser("~"), ".fuel_bill_automation")
+PARSE_CACHE_DIRECTORY = os.path.join(APP_DATA_DIRECTORY, "parse_cache")
+FOLDER_INDEX_DATABASE = os.path.join(APP_DATA_DIRECTORY, "folder_index.sqlite3")
+OUTLOOK_HARVEST_STATE = os.path.join(APP_DATA_DIRECTORY, "outlook_harvest_state.json")
+RUN_LOG_FILE = os.path.join(APP_DATA_DIRECTORY, "run_log.jsonl")
+VEHICLE_MASTER_SNAPSHOT_DIRECTORY = os.path.join(APP_DATA_DIRECTORY, "vehicle_master")
+SCRAPER_VALIDATORS_FILE = os.path.join(APP_DATA_DIRECTORY, "scraper_validators.json")
+EMAIL_SEND_LOG_DATABASE = os.path.join(APP_DATA_DIRECTORY, "email_send_log.sqlite3")
+
+# MONTHLY PATH TEMPLATES
+# Formatted with year, month (number) and month_name, e.g. by pipeline.monthly.month_input_paths
+FUEL_BILL_MONTH_DIRECTORY_TEMPLATE = os.path.join(
+    FUEL_BILL_DIRECTORY, "{year}", "{month:02d} - {month_name} {year}"
+)
+FUEL_CHARGES_SHEET_TEMPLATE = os.path.join(
+    FUEL_BILL_MONTH_DIRECTORY_TEMPLATE,
+    "{month:02d} - {month_name} {year} Fuel Charges.xlsx",
+)
+BEST_PASS_TOLL_SHEET_TEMPLATE = os.path.join(
+    BEST_PASS_STATEMENTS_DIRECTORY,
+    "{year}",
+    "{year}-{month:02d} Best Pass Toll Details.xlsx",
+)
+BEST_PASS_FINANCIAL_SUMMARY_PDF_TEMPLATE = os.path.join(
+    FUEL_BILL_MONTH_DIRECTORY_TEMPLATE, "{month_name}-Financial Summary.pdf"
+)
+BEST_PASS_PURCHASE_ACTIVITY_PDF_TEMPLATE = os.path.join(
+    FUEL_BILL_MONTH_DIRECTORY_TEMPLATE, "{month_name}-Purchase Activity.pdf"
+)
+MAN_HOURS_LABOR_SHEET_TEMPLATE = os.path.join(
+    FUEL_BILL_MONTH_DIRECTORY_TEMPLATE,
+    "{month:02d} - {month_name} {year} Man Hours Labor.xlsx",
+)
+MONTHLY_REPORT_DIRECTORY_TEMPLATE = os.path.join(
+    APP_DATA_DIRECTORY, "reports", "{year}-{month:02d}"
+)
+BACKFILL_REPORT_DIRECTORY = os.path.join(APP_DATA_DIRECTORY, "backfill")
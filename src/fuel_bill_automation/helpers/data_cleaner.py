@@ -1,27 +1,101 @@
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
 
+from fuel_bill_automation.helpers.instrumentation import instrumented
+
 
 def filter_by_month(
-    df: pd.DataFrame, date_column: str, month: int, year: int
+    df: pd.DataFrame,
+    date_column: str,
+    month: int,
+    year: int,
+    date_format: Optional[str] = None,
 ) -> pd.DataFrame:
     """
-    Filter the DataFrame by the given month and year.
+    Filter the DataFrame by the given month and year. The input DataFrame is not modified;
+    the returned rows have the date column converted to datetime.
 
     :param df: The input DataFrame
     :param date_column: Name of the column containing the date or datetime
     :param month: The month to filter by
     :param year: The year to filter by
+    :param date_format: (Optional) strftime format of the dates, parsed faster than inferred
     :return: Filtered DataFrame
     """
-    df[date_column] = pd.to_datetime(
-        df[date_column]
-    )  # Ensure the date column is in datetime format
-    filtered_df = df[
-        (df[date_column].dt.month == month) & (df[date_column].dt.year == year)
-    ]
+    # Ensure the date column is in datetime format
+    dates = pd.to_datetime(df[date_column], format=date_format)
+    mask = (dates.dt.month == month) & (dates.dt.year == year)
+    filtered_df = df[mask].assign(**{date_column: dates[mask]})
     return filtered_df
 
 
+class MonthPartitionedFrame:
+    def __init__(
+        self, df: pd.DataFrame, date_column: str, date_format: Optional[str] = None
+    ):
+        """
+        A view of a DataFrame partitioned by month, for selecting many months cheaply.
+
+        The date column is parsed once and the rows are stably sorted by month into a
+        private copy, so selecting a month is a slice and the caller's DataFrame is never
+        modified. Rows without a date are left out.
+
+        :param df: The input DataFrame
+        :param date_column: Name of the column containing the date or datetime
+        :param date_format: (Optional) strftime format of the dates, parsed faster than inferred
+        """
+        self.date_column = date_column
+        dates = pd.to_datetime(df[date_column], format=date_format)
+        valid = dates.notna().to_numpy()
+        dates = dates[valid]
+
+        # Months since year 0, so sorting by key sorts chronologically
+        keys = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self.frame = df[valid].assign(**{date_column: dates}).iloc[order]
+
+        sorted_keys = keys[order]
+        month_keys, starts = np.unique(sorted_keys, return_index=True)
+        stops = np.append(starts[1:], len(sorted_keys))
+        self._slices = {
+            int(key): (int(start), int(stop))
+            for key, start, stop in zip(month_keys, starts, stops)
+        }
+
+    def month(self, month: int, year: int) -> pd.DataFrame:
+        """
+        Rows of the given month and year, in their original order; the same rows
+        filter_by_month returns.
+
+        :param month: The month to select
+        :param year: The year to select
+        :return: DataFrame slice of the month, empty if the month has no rows
+        """
+        start, stop = self._slices.get(year * 12 + month - 1, (0, 0))
+        return self.frame.iloc[start:stop]
+
+    @property
+    def months(self) -> List[pd.Period]:
+        """The months that have rows, in chronological order."""
+        return [_month_period(key) for key in self._slices]
+
+    def groupby_month(self) -> Iterator[Tuple[pd.Period, pd.DataFrame]]:
+        """
+        Iterate over the months in chronological order.
+
+        :return: Iterator of (month period, DataFrame slice) tuples
+        """
+        for key, (start, stop) in self._slices.items():
+            yield _month_period(key), self.frame.iloc[start:stop]
+
+
+def _month_period(key: int) -> pd.Period:
+    year, month_index = divmod(key, 12)
+    return pd.Period(year=year, month=month_index + 1, freq="M")
+
+
 def check_job_number(
     df1: pd.DataFrame,
     df2: pd.DataFrame,
@@ -57,6 +131,282 @@ def check_job_number(
     return good_df, bad_df
 
 
+class JobNumberReconciliation(NamedTuple):
+    """Result of reconcile_job_numbers, one DataFrame per outcome."""
+
+    matched: pd.DataFrame
+    mismatched: pd.DataFrame
+    left_only: pd.DataFrame
+    right_only: pd.DataFrame
+
+
+@instrumented()
+def reconcile_job_numbers(
+    df1: pd.DataFrame,
+    df2: pd.DataFrame,
+    employee_column: str,
+    date_column: str,
+    job_number_column: str,
+) -> JobNumberReconciliation:
+    """
+    Reconciles the job numbers of two DataFrames by employee name and date without
+    multiplying rows like check_job_number's merge does for repeated employee/date pairs.
+
+    Employees, dates and job numbers are factorized into integer codes shared by both sides,
+    each side is reduced to its distinct (employee/date key, job number) pairs with a row
+    count, and the pairs are hash-joined, so memory grows with the number of distinct
+    pairs rather than with the product of duplicates.
+
+    :param df1: First DataFrame
+    :param df2: Second DataFrame
+    :param employee_column: Column name for the employee
+    :param date_column: Column name for the date or datetime
+    :param job_number_column: Column name for the job number
+    :return: JobNumberReconciliation of
+             matched: employee/date/job number found on both sides,
+             mismatched: employee/date on both sides with a job number missing on one
+             side, pairing job_number_df1 with job_number_df2 per employee/date,
+             left_only: employee/date found only in df1,
+             right_only: employee/date found only in df2.
+             Every frame has rows_df1 and/or rows_df2 counts of the original rows.
+    """
+    left_rows = len(df1)
+    employee_codes, employees = pd.factorize(
+        pd.concat([df1[employee_column], df2[employee_column]], ignore_index=True),
+        use_na_sentinel=False,
+    )
+    date_codes, dates = pd.factorize(
+        pd.concat([df1[date_column], df2[date_column]], ignore_index=True),
+        use_na_sentinel=False,
+    )
+    job_codes, jobs = pd.factorize(
+        pd.concat([df1[job_number_column], df2[job_number_column]], ignore_index=True),
+        use_na_sentinel=False,
+    )
+    # One integer key per employee/date pair
+    keys = employee_codes.astype(np.int64) * max(len(dates), 1) + date_codes
+
+    left = _count_job_pairs(keys[:left_rows], job_codes[:left_rows], "rows_df1")
+    right = _count_job_pairs(keys[left_rows:], job_codes[left_rows:], "rows_df2")
+
+    pairs = left.merge(right, on=["key", "job"], how="outer", indicator=True)
+    key_in_left = pairs["key"].isin(left["key"])
+    key_in_right = pairs["key"].isin(right["key"])
+    left_side = pairs["_merge"] == "left_only"
+    right_side = pairs["_merge"] == "right_only"
+
+    matched = pairs[pairs["_merge"] == "both"]
+    left_only = pairs[left_side & ~key_in_right]
+    right_only = pairs[right_side & ~key_in_left]
+    mismatched = pairs.loc[left_side & key_in_right, ["key", "job", "rows_df1"]].merge(
+        pairs.loc[right_side & key_in_left, ["key", "job", "rows_df2"]],
+        on="key",
+        how="outer",
+        suffixes=("_df1", "_df2"),
+    )
+
+    decoder = _JobPairDecoder(employees, dates, jobs, employee_column, date_column)
+    return JobNumberReconciliation(
+        matched=decoder.decode(matched, {"job": job_number_column}),
+        mismatched=decoder.decode(
+            mismatched,
+            {
+                "job_df1": job_number_column + "_df1",
+                "job_df2": job_number_column + "_df2",
+            },
+        ),
+        left_only=decoder.decode(
+            left_only.drop(columns="rows_df2"), {"job": job_number_column}
+        ),
+        right_only=decoder.decode(
+            right_only.drop(columns="rows_df1"), {"job": job_number_column}
+        ),
+    )
+
+
+def _count_job_pairs(
+    keys: np.ndarray, job_codes: np.ndarray, count_column: str
+) -> pd.DataFrame:
+    """Reduces one side to its distinct (key, job) pairs with their row counts."""
+    return (
+        pd.DataFrame({"key": keys, "job": job_codes})
+        .groupby(["key", "job"], sort=False)
+        .size()
+        .rename(count_column)
+        .reset_index()
+    )
+
+
+class _JobPairDecoder:
+    """Turns integer key and job codes back into the original column values."""
+
+    def __init__(self, employees, dates, jobs, employee_column, date_column):
+        self.employees = pd.Index(employees)
+        self.dates = pd.Index(dates)
+        self.jobs = pd.Index(jobs)
+        self.employee_column = employee_column
+        self.date_column = date_column
+        self.date_count = max(len(dates), 1)
+
+    def decode(self, pairs: pd.DataFrame, job_columns: dict) -> pd.DataFrame:
+        pairs = pairs.sort_values(["key", *job_columns], ignore_index=True)
+        keys = pairs["key"].to_numpy(dtype=np.int64)
+        decoded = {
+            self.employee_column: self.employees.take(keys // self.date_count),
+            self.date_column: self.dates.take(keys % self.date_count),
+        }
+        for code_column, job_column in job_columns.items():
+            # Missing jobs come out of the outer merge as NaN codes
+            codes = pairs[code_column].fillna(-1).to_numpy(dtype=np.int64)
+            decoded[job_column] = pd.api.extensions.take(
+                self.jobs.to_numpy(), codes, allow_fill=True
+            )
+        for count_column in ("rows_df1", "rows_df2"):
+            if count_column in pairs.columns:
+                decoded[count_column] = (
+                    pairs[count_column].fillna(0).to_numpy(dtype=np.int64)
+                )
+        return pd.DataFrame(decoded)
+
+
+class CostAllocation(NamedTuple):
+    """Result of allocate_costs_by_hours."""
+
+    allocated: pd.DataFrame
+    unallocated: pd.DataFrame
+
+
+@instrumented()
+def allocate_costs_by_hours(
+    charges: pd.DataFrame,
+    labor: pd.DataFrame,
+    charge_date_column: str,
+    cost_column: str,
+    by: Sequence[str],
+    labor_date_column: str = "Date",
+    job_number_column: str = "Job Number",
+    hours_column: Optional[str] = "Hours",
+    tolerance: pd.Timedelta = pd.Timedelta(days=3),
+) -> CostAllocation:
+    """
+    Allocates fuel or toll charges to jobs in proportion to the hours worked on each job.
+
+    Each charge is matched with a sorted as-of join to the latest labor day of the same
+    employee (and vehicle, or any other by columns) on or before the charge, no more than
+    tolerance earlier, so a Saturday fill-up goes to Friday's jobs. The charge is then
+    split over that day's jobs by their share of the day's hours, rounded to cents with
+    the rounding difference on the largest share, so the allocations add up to the charge.
+    Rows without hours, or days with no hours at all, are split equally.
+
+    :param charges: DataFrame of charges, e.g. fuel charges enriched with the assigned
+                    employee by VehicleMaster.enrich
+    :param labor: DataFrame of labor or man hours rows
+    :param charge_date_column: Column name for the date or datetime of the charge
+    :param cost_column: Column name for the amount of the charge
+    :param by: Column names both DataFrames are matched on, e.g. ['Employee']
+    :param labor_date_column: Column name for the date of the labor
+    :param job_number_column: Column name for the job number of the labor
+    :param hours_column: (Optional) Column name for the hours of the labor
+    :param tolerance: Largest time from the labor day back to the charge
+    :raises ValueError: If charges already has one of the output columns below
+    :return: CostAllocation of
+             allocated: one row per charge and job with the charge's columns,
+             'Charge Row', job_number_column, 'Labor Date', 'Share' and 'Allocated Cost',
+             unallocated: the charges without a cost or without labor in the
+             tolerance window.
+    """
+    by = list(by)
+    added_columns = ["Charge Row", job_number_column, "Labor Date", "Share"]
+    collisions = [
+        column for column in added_columns + ["Allocated Cost"] if column in charges
+    ]
+    if collisions:
+        raise ValueError(f"charges already has the output columns {collisions}")
+    # merge_asof needs both sides at the same resolution
+    charge_dates = pd.to_datetime(charges[charge_date_column]).astype("datetime64[ns]")
+
+    # One row per (by, day, job) with its share of the day's hours
+    days = labor[by].assign(
+        **{
+            "Labor Date": pd.to_datetime(labor[labor_date_column])
+            .dt.normalize()
+            .astype("datetime64[ns]")
+        }
+    )
+    if hours_column is not None and hours_column in labor.columns:
+        days["Hours"] = pd.to_numeric(labor[hours_column], errors="coerce").fillna(0)
+    else:
+        days["Hours"] = 1.0
+    days[job_number_column] = labor[job_number_column]
+    days = days.dropna(subset=by + ["Labor Date", job_number_column])
+    jobs = (
+        days.groupby(by + ["Labor Date", job_number_column], sort=False)["Hours"]
+        .sum()
+        .reset_index()
+    )
+    day_keys = by + ["Labor Date"]
+    day_hours = jobs.groupby(day_keys, sort=False)["Hours"].transform("sum")
+    job_count = jobs.groupby(day_keys, sort=False)["Hours"].transform("size")
+    jobs["Share"] = np.where(day_hours > 0, jobs["Hours"] / day_hours, 1 / job_count)
+
+    # As-of join of each charge to its labor day
+    costs = pd.to_numeric(charges[cost_column], errors="coerce").to_numpy(float)
+    matchable = (
+        charges[by].notna().all(axis=1).to_numpy()
+        & charge_dates.notna().to_numpy()
+        & ~np.isnan(costs)
+    )
+    left = charges.loc[matchable, by].assign(
+        **{
+            "Charge Row": np.flatnonzero(matchable),
+            "Charge Date": charge_dates[matchable],
+        }
+    )
+    right = jobs[day_keys].drop_duplicates()
+    matched = pd.merge_asof(
+        left.sort_values("Charge Date"),
+        right.sort_values("Labor Date"),
+        left_on="Charge Date",
+        right_on="Labor Date",
+        by=by,
+        tolerance=tolerance,
+        direction="backward",
+    ).dropna(subset=["Labor Date"])
+
+    # Split every matched charge over its day's jobs
+    split = matched[["Charge Row"] + day_keys].merge(
+        jobs[day_keys + [job_number_column, "Share"]], on=day_keys
+    )
+    split = split.sort_values(["Charge Row", "Share"], ascending=[True, False])
+    rows = split["Charge Row"].to_numpy()
+    if len(rows) == 0:
+        # No charge matched a labor day
+        allocated = charges.iloc[:0].reset_index(drop=True)
+        for column in added_columns:
+            allocated[column] = split[column].to_numpy()
+        allocated["Allocated Cost"] = np.empty(0, dtype=float)
+        return CostAllocation(allocated, charges)
+    costs = costs[rows]
+    cents = np.round(costs * split["Share"].to_numpy() * 100)
+    # Largest share first, so the rounding difference lands on the first row of a charge
+    first = np.r_[True, rows[1:] != rows[:-1]]
+    starts = np.flatnonzero(first)
+    charge_cents = np.round(costs[starts] * 100)
+    cents[starts] += charge_cents - np.add.reduceat(cents, starts)
+
+    allocated = charges.iloc[rows].reset_index(drop=True)
+    allocated["Charge Row"] = rows
+    allocated[job_number_column] = split[job_number_column].to_numpy()
+    allocated["Labor Date"] = split["Labor Date"].to_numpy()
+    allocated["Share"] = split["Share"].to_numpy()
+    allocated["Allocated Cost"] = cents / 100
+
+    unallocated_mask = np.ones(len(charges), dtype=bool)
+    unallocated_mask[rows] = False
+    return CostAllocation(allocated, charges[unallocated_mask])
+
+
+@instrumented()
 def process_dataframes(
     df1: pd.DataFrame,
     df2: pd.DataFrame,
@@ -1,9 +1,14 @@
+import io
 import os
-from datetime import datetime, timedelta
-from typing import List, Optional
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import pandas as pd
 import pdfplumber
+from openpyxl import load_workbook
 from pdfplumber.page import Page
 
 from fuel_bill_automation.configs.constants import (
@@ -11,26 +16,38 @@ from fuel_bill_automation.configs.constants import (
     BEST_PASS_FINANCIAL_SUMMARY_PDF,
     # Include other constants as needed
 )
+from fuel_bill_automation.helpers.folder_index import FolderIndex
+from fuel_bill_automation.helpers.instrumentation import instrumented
+from fuel_bill_automation.helpers.parse_cache import ParseCache
+
+# Bump these when a parser's output changes so cached results are not reused
+PDF_PARSER_VERSION = 1
+XLSX_PARSER_VERSION = 1
 
 
 def find_xlsx_files_by_modified_date(
-    folder_path: str, year: int, month: int
+    folder_path: str, year: int, month: int, index: Optional[FolderIndex] = None
 ) -> List[str]:
     """
     Scans a folder for .xlsx files and returns a list of file paths that were modified
     within the given month, including one week prior and one week after the month.
+
+    When an index is given, the folder is refreshed incrementally and searched in the
+    index instead of being walked.
     """
     result = []
-
-    # Calculate the date range (start of the previous week to end of the following week)
-    first_day_of_month = datetime(year, month, 1)
-    if month == 12:
-        last_day_of_month = datetime(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        last_day_of_month = datetime(year, month + 1, 1) - timedelta(days=1)
-
-    start_range = first_day_of_month - timedelta(days=7)
-    end_range = last_day_of_month + timedelta(days=7)
+    start_range, end_range = modified_date_range(year, month)
+
+    if index is not None:
+        index.refresh(folder_path)
+        rows = index.query(
+            folder_path,
+            extension=".xlsx",
+            modified_after=start_range,
+            modified_before=end_range,
+        )
+        # The index matches extensions case-insensitively, os.walk below does not
+        return sorted(path for path, _, _ in rows if path.endswith(".xlsx"))
 
     # Iterate through files in the folder
     for root, _, files in os.walk(folder_path):
@@ -46,34 +63,81 @@ def find_xlsx_files_by_modified_date(
     return result
 
 
+def modified_date_range(year: int, month: int) -> Tuple[datetime, datetime]:
+    """
+    Returns the modified date window of a month's files: from one week before the
+    first day of the month to one week after its last day.
+    """
+    # Calculate the date range (start of the previous week to end of the following week)
+    first_day_of_month = datetime(year, month, 1)
+    if month == 12:
+        last_day_of_month = datetime(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        last_day_of_month = datetime(year, month + 1, 1) - timedelta(days=1)
+
+    start_range = first_day_of_month - timedelta(days=7)
+    end_range = last_day_of_month + timedelta(days=7)
+    return start_range, end_range
+
+
+@instrumented()
 def load_and_concatenate_xlsx(
-    file_paths: List[str], max_columns: Optional[int] = None
+    file_paths: List[str],
+    max_columns: Optional[int] = None,
+    cache: Optional[ParseCache] = None,
 ) -> pd.DataFrame:
     """
     Takes a list of .xlsx file paths, loads the first sheet in each file as a DataFrame,
     sets the first row as the column names if the column names are not all strings,
     and returns a DataFrame of all the data combined after removing duplicates.
+
+    When a cache is given, the result is reused as long as the files' content is unchanged.
     """
+    if cache is not None:
+        return cache.get_or_parse(
+            file_paths,
+            "load_and_concatenate_xlsx",
+            XLSX_PARSER_VERSION,
+            lambda: load_and_concatenate_xlsx(file_paths, max_columns),
+            max_columns,
+        )
+
     dataframes = []
 
     for file_path in file_paths:
         # Load the first sheet of the Excel file into a DataFrame
         df = pd.read_excel(file_path, sheet_name=0)
-        if max_columns is not None:
-            df = df.iloc[:, :max_columns]
-
-        # Check if the column names are not all strings
-        if not all(isinstance(col, str) for col in df.columns) or any(
-            "Unnamed" in str(col) for col in df.columns
-        ):
-            # Set the first row as the column names
-            df.columns = df.iloc[0]
-            df = df[1:]
+        df = prepare_labor_sheet(df, max_columns)
 
         # Append the DataFrame to the list
         dataframes.append(df)
 
-    # Concatenate all the DataFrames into one and remove duplicates
+    return concatenate_labor_sheets(dataframes)
+
+
+def prepare_labor_sheet(
+    df: pd.DataFrame, max_columns: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Trims a loaded sheet to max_columns and sets the first row as the column names
+    if the column names are not all strings.
+    """
+    if max_columns is not None:
+        df = df.iloc[:, :max_columns]
+
+    # Check if the column names are not all strings
+    if not all(isinstance(col, str) for col in df.columns) or any(
+        "Unnamed" in str(col) for col in df.columns
+    ):
+        # Set the first row as the column names
+        df.columns = df.iloc[0]
+        df = df[1:]
+
+    return df
+
+
+def concatenate_labor_sheets(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenates the loaded sheets into one DataFrame and removes duplicates."""
     if dataframes:
         combined_df = pd.concat(dataframes, ignore_index=True).drop_duplicates()
     else:
@@ -82,24 +146,251 @@ def load_and_concatenate_xlsx(
     return combined_df
 
 
+@dataclass
+class WorkbookLoadResult:
+    """Timing and outcome of loading a single workbook."""
+
+    file_path: str
+    read_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    rows: int = 0
+    error: Optional[str] = None
+
+
+@instrumented()
+def load_and_concatenate_xlsx_parallel(
+    file_paths: List[str],
+    max_columns: Optional[int] = None,
+    io_workers: int = 8,
+    parse_workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, List[WorkbookLoadResult]]:
+    """
+    Loads the workbooks like load_and_concatenate_xlsx, reading the files on a thread
+    pool and parsing them on a process pool. Each workbook is handed to the parsers as
+    soon as it has been read, and the sheets are combined in input order.
+
+    A workbook that fails to read or parse is left out of the combined DataFrame and
+    reported in its result instead of aborting the batch.
+
+    :param file_paths: List of .xlsx file paths.
+    :param max_columns: (Optional) Number of leading columns to keep.
+    :param io_workers: Number of threads reading files.
+    :param parse_workers: (Optional) Number of parsing processes. Defaults to the CPU count.
+    :return: Tuple of (combined_dataframe, list of WorkbookLoadResult in input order)
+    """
+    results = [WorkbookLoadResult(file_path) for file_path in file_paths]
+    dataframes: List[Optional[pd.DataFrame]] = [None] * len(file_paths)
+
+    with (
+        ThreadPoolExecutor(max_workers=io_workers) as io_executor,
+        ProcessPoolExecutor(max_workers=parse_workers) as parse_executor,
+    ):
+        read_futures = {
+            io_executor.submit(_read_file_bytes, file_path): idx
+            for idx, file_path in enumerate(file_paths)
+        }
+        parse_futures = {}
+        for read_future in as_completed(read_futures):
+            idx = read_futures[read_future]
+            try:
+                content, results[idx].read_seconds = read_future.result()
+            except Exception as e:
+                results[idx].error = f"read failed: {e}"
+                continue
+            parse_future = parse_executor.submit(
+                _parse_labor_sheet, content, max_columns
+            )
+            parse_futures[parse_future] = idx
+
+        for parse_future in as_completed(parse_futures):
+            idx = parse_futures[parse_future]
+            try:
+                df, results[idx].parse_seconds = parse_future.result()
+            except Exception as e:
+                results[idx].error = f"parse failed: {e}"
+                continue
+            results[idx].rows = len(df)
+            dataframes[idx] = df
+
+    combined_df = concatenate_labor_sheets([df for df in dataframes if df is not None])
+    return combined_df, results
+
+
+def _read_file_bytes(file_path: str) -> Tuple[bytes, float]:
+    """Thread task: reads a whole file and returns its content and the read time."""
+    start = time.perf_counter()
+    with open(file_path, "rb") as file:
+        content = file.read()
+    return content, time.perf_counter() - start
+
+
+def _parse_labor_sheet(
+    content: bytes, max_columns: Optional[int]
+) -> Tuple[pd.DataFrame, float]:
+    """Process task: parses the first sheet of a workbook and returns it with the parse time."""
+    start = time.perf_counter()
+    df = pd.read_excel(io.BytesIO(content), sheet_name=0)
+    df = prepare_labor_sheet(df, max_columns)
+    return df, time.perf_counter() - start
+
+
+def iter_xlsx_chunks(
+    file_path: str,
+    columns: Optional[Sequence[str]] = None,
+    row_filter: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    chunk_size: int = 10_000,
+    max_columns: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Streams the first sheet of a workbook as DataFrame chunks using openpyxl's
+    read-only, values-only mode, so memory scales with chunk_size instead of the sheet.
+
+    The header row follows the same rule as load_and_concatenate_xlsx: if the first
+    row is not all strings, the second row is used as the column names. Rows are
+    filtered before any DataFrame is built. Column dtypes are inferred per chunk.
+
+    :param file_path: Path to the .xlsx file.
+    :param columns: (Optional) Column names to keep, in the order given.
+    :param row_filter: (Optional) Predicate called with a {column name: value} dict of
+                       the full row; rows for which it returns False are dropped.
+    :param chunk_size: Maximum number of rows per yielded DataFrame.
+    :param max_columns: (Optional) Number of leading columns to keep before projecting.
+    :return: Iterator of DataFrames.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+
+        header = _next_header_row(rows, max_columns)
+        if header is None:
+            return
+        width = len(header)
+
+        if columns is None:
+            positions = list(range(width))
+            output_columns = header
+        else:
+            missing = [col for col in columns if col not in header]
+            if missing:
+                raise KeyError(f"Columns not found in {file_path}: {missing}")
+            positions = [header.index(col) for col in columns]
+            output_columns = list(columns)
+
+        chunk = []
+        # Blank rows are held back so trailing ones are dropped like pd.read_excel does
+        pending_blank_rows = 0
+        for row in rows:
+            row = _fit_row(row, width)
+            if all(value is None for value in row):
+                pending_blank_rows += 1
+                continue
+            if pending_blank_rows:
+                if row_filter is None:
+                    chunk.extend([[None] * len(positions)] * pending_blank_rows)
+                pending_blank_rows = 0
+            if row_filter is not None and not row_filter(dict(zip(header, row))):
+                continue
+            chunk.append([row[pos] for pos in positions])
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk[:chunk_size], columns=output_columns)
+                chunk = chunk[chunk_size:]
+
+        if chunk:
+            yield pd.DataFrame(chunk, columns=output_columns)
+    finally:
+        # Read-only workbooks keep the file open until closed
+        workbook.close()
+
+
+def _next_header_row(
+    rows: Iterator[tuple], max_columns: Optional[int]
+) -> Optional[list]:
+    """Reads the header row, promoting the next row if the first is not all strings."""
+    header = next(rows, None)
+    if header is None:
+        return None
+    header = list(header[:max_columns] if max_columns is not None else header)
+    if not all(isinstance(col, str) for col in header) or any(
+        "Unnamed" in col for col in header
+    ):
+        promoted = next(rows, None)
+        if promoted is None:
+            return None
+        header = _fit_row(promoted, len(header))
+    return header
+
+
+def _fit_row(row: tuple, width: int) -> list:
+    """Pads or trims a row read in read-only mode to the header width."""
+    row = list(row[:width])
+    if len(row) < width:
+        row.extend([None] * (width - len(row)))
+    return row
+
+
+def date_range_filter(
+    date_column: str, start: date, end: date
+) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Builds a row predicate for iter_xlsx_chunks keeping rows whose date falls in [start, end).
+
+    :param date_column: Name of the column containing the date or datetime
+    :param start: First date to keep
+    :param end: First date past the range
+    :return: Predicate taking a row dict
+    """
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end)
+
+    def row_filter(row: Dict[str, Any]) -> bool:
+        value = row.get(date_column)
+        if value is None:
+            return False
+        try:
+            value = pd.Timestamp(value)
+        except (TypeError, ValueError):
+            return False
+        return start_ts <= value < end_ts
+
+    return row_filter
+
+
+def month_filter(
+    date_column: str, month: int, year: int
+) -> Callable[[Dict[str, Any]], bool]:
+    """Builds a row predicate for iter_xlsx_chunks keeping rows in the given month."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return date_range_filter(date_column, start, end)
+
+
 def clean_column_name(column: str) -> str:
     """Cleans a DataFrame column name by replacing newline characters with spaces."""
     return column.replace("\n", " ")
 
 
-def extract_tables_from_pdf(file_path: str) -> pd.DataFrame:
+@instrumented()
+def extract_tables_from_pdf(
+    file_path: str, cache: Optional[ParseCache] = None
+) -> pd.DataFrame:
     """
     Extracts tables from a PDF file and returns them as a DataFrame.
+
+    When a cache is given, the result is reused as long as the file's content is unchanged.
     """
-    all_tables = []
+    if cache is not None:
+        return cache.get_or_parse(
+            [file_path],
+            "extract_tables_from_pdf",
+            PDF_PARSER_VERSION,
+            lambda: extract_tables_from_pdf(file_path),
+        )
 
     with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            tables = extract_tables_from_page(page)
-            for table in tables:
-                processed_df = process_table(table)
-                if not processed_df.empty:
-                    all_tables.append(processed_df)
+        all_tables = extract_tables_from_pages(pdf.pages)
 
     if all_tables:
         return pd.concat(all_tables, ignore_index=True)
@@ -107,6 +398,97 @@ def extract_tables_from_pdf(file_path: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+@instrumented()
+def extract_tables_from_pdf_parallel(
+    file_path: str,
+    max_workers: Optional[int] = None,
+    chunk_size: int = 25,
+    cache: Optional[ParseCache] = None,
+) -> pd.DataFrame:
+    """
+    Extracts tables from a PDF file using a pool of worker processes and returns
+    them as a DataFrame identical to the one produced by extract_tables_from_pdf.
+
+    The document is split into ranges of chunk_size pages. Each worker opens its
+    own pdfplumber handle, processes its range and returns the tables in page
+    order, so the merged result keeps the serial ordering.
+
+    :param file_path: Path to the PDF file.
+    :param max_workers: (Optional) Number of worker processes. Defaults to the CPU count.
+    :param chunk_size: Number of pages handled by a worker per task.
+    :param cache: (Optional) Parse cache shared with extract_tables_from_pdf.
+    :return: DataFrame of all the processed tables.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    if cache is not None:
+        # Same key as the serial parser, the output is identical
+        return cache.get_or_parse(
+            [file_path],
+            "extract_tables_from_pdf",
+            PDF_PARSER_VERSION,
+            lambda: extract_tables_from_pdf_parallel(
+                file_path, max_workers, chunk_size
+            ),
+        )
+
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+
+    page_ranges = split_page_ranges(page_count, chunk_size)
+
+    # A single range gains nothing from a process pool
+    if len(page_ranges) <= 1 or max_workers == 1:
+        return extract_tables_from_pdf(file_path)
+
+    all_tables = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # map() yields results in submission order, which is page order
+        for tables in executor.map(
+            _extract_tables_from_page_range,
+            [file_path] * len(page_ranges),
+            page_ranges,
+        ):
+            all_tables.extend(tables)
+
+    if all_tables:
+        return pd.concat(all_tables, ignore_index=True)
+    else:
+        return pd.DataFrame()
+
+
+def split_page_ranges(page_count: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Splits a page count into consecutive (start, stop) page ranges."""
+    return [
+        (start, min(start + chunk_size, page_count))
+        for start in range(0, page_count, chunk_size)
+    ]
+
+
+def _extract_tables_from_page_range(
+    file_path: str, page_range: Tuple[int, int]
+) -> List[pd.DataFrame]:
+    """Worker task: opens the PDF and processes the tables of one page range."""
+    start, stop = page_range
+    with pdfplumber.open(file_path) as pdf:
+        return extract_tables_from_pages(pdf.pages[start:stop])
+
+
+def extract_tables_from_pages(pages: List[Page]) -> List[pd.DataFrame]:
+    """Extracts and processes the tables of the given pages, in page order."""
+    all_tables = []
+    for page in pages:
+        tables = extract_tables_from_page(page)
+        for table in tables:
+            processed_df = process_table(table)
+            if not processed_df.empty:
+                all_tables.append(processed_df)
+        # Release the cached page layout, long documents otherwise grow memory
+        page.close()
+    return all_tables
+
+
 def extract_tables_from_page(page: Page) -> List[List[List[str | None]]]:
     """Extracts tables from a single PDF page."""
     return page.extract_tables()
@@ -121,7 +503,7 @@ def process_table(table: List[List[str | None]]) -> pd.DataFrame:
     df.columns = [clean_column_name(col) for col in df.columns]
     df.replace("", None, inplace=True)
     if "DEPARTMENT" in df.columns:
-        return process_departments(df)
+        return process_departments_vectorized(df)
     else:
         return pd.DataFrame()
 
@@ -157,6 +539,55 @@ def process_departments(df: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def process_departments_vectorized(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized equivalent of process_departments. The newline-packed cells of every
+    department are split in one DataFrame-wide pass and all columns are exploded
+    together, instead of building one DataFrame per department and column.
+    """
+    # Remove rows where 'DESCRIPTION' is 'YTD' or 'PERIOD'
+    df = df[~df["DESCRIPTION"].isin(["YTD", "PERIOD"])]
+
+    departments = df["DEPARTMENT"].iloc[0].split("\n")
+    value_columns = df.columns[1:].tolist()  # Skip 'DEPARTMENT' column
+
+    # Row idx holds the data of department idx; departments without a row are empty
+    department_count = min(len(departments), len(df))
+    keep = [
+        idx
+        for idx in range(department_count)
+        if departments[idx] != "ACCOUNTS RECEIVABLE"
+    ]
+    if not keep:
+        return pd.DataFrame()
+    rows = df.iloc[keep, 1:]
+    rows.columns = range(len(value_columns))
+
+    # Split every cell into a list of values, non-string cells become one value
+    split = rows.map(
+        lambda value: value.split("\n") if isinstance(value, str) else [value]
+    )
+    lengths = split.map(len)
+
+    # The first column sets a department's row count, columns of another length are blanked
+    row_counts = lengths[0]
+    mismatched = lengths.ne(row_counts, axis=0)
+    if mismatched.any(axis=None):
+        blanks = row_counts.map(lambda count: [None] * count)
+        split = split.mask(mismatched, blanks, axis=0)
+
+    exploded = split.explode(list(split.columns), ignore_index=False)
+    exploded = exploded.replace("", None).dropna(how="all")
+    if exploded.empty:
+        return pd.DataFrame()
+
+    department_names = pd.Series([departments[idx] for idx in keep], index=split.index)
+    exploded.columns = value_columns
+    exploded["DEPARTMENT"] = department_names.loc[exploded.index].to_numpy()
+    result = exploded[df.columns.tolist()]
+    return result.reset_index(drop=True)
+
+
 def extract_department_data(df: pd.DataFrame, department_idx: int) -> pd.DataFrame:
     """
     Extracts data for a single department based on the department index.
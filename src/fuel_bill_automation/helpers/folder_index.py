@@ -0,0 +1,284 @@
+"""
+folder_index.py
+
+A module to keep a persistent SQLite index of the files under one or more folders,
+so repeated searches do not walk and stat slow network directories on every call.
+"""
+
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from fuel_bill_automation.configs.constants import FOLDER_INDEX_DATABASE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+CREATE INDEX IF NOT EXISTS files_extension_mtime ON files (extension, mtime);
+"""
+
+
+class FolderIndex:
+    def __init__(self, database_path=FOLDER_INDEX_DATABASE):
+        """
+        Initialize the FolderIndex, creating the database if needed.
+
+        :param database_path: Path to the SQLite database file, or ":memory:".
+        """
+        if database_path != ":memory:":
+            os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(database_path)
+        self.connection.create_function("REGEXP", 2, _regexp_search, deterministic=True)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def refresh(self, folder_path, full=False):
+        """
+        Bring the index of a folder tree up to date.
+
+        Only directories whose mtime changed since the last refresh are listed again.
+        A directory's mtime changes when files are added, removed or renamed in it,
+        but not when an existing file is rewritten in place, so the files of unchanged
+        directories are re-stat'd in one scandir pass and only the changed rows are
+        written.
+
+        :param folder_path: Root of the folder tree to index.
+        :param full: (Optional) List every directory regardless of its mtime.
+        :return: Number of directories that were listed.
+        """
+        folder_path = os.path.normpath(folder_path)
+        known = {
+            path: mtime
+            for path, mtime in self.connection.execute(
+                "SELECT path, mtime FROM directories WHERE " + _under_clause("path"),
+                _under_params(folder_path),
+            )
+        }
+        listed = 0
+        stack = [folder_path]
+
+        with self.connection:
+            while stack:
+                directory = stack.pop()
+                try:
+                    dir_mtime = os.stat(directory).st_mtime
+                except OSError:
+                    self._forget_directory(directory)
+                    continue
+
+                if not full and known.get(directory) == dir_mtime:
+                    self._restat_files(directory)
+                    stack.extend(
+                        path
+                        for (path,) in self.connection.execute(
+                            "SELECT path FROM directories WHERE parent = ?",
+                            (directory,),
+                        )
+                    )
+                    continue
+
+                listed += 1
+                stack.extend(self._list_directory(directory, dir_mtime))
+
+        return listed
+
+    def query(
+        self,
+        folder_path=None,
+        extension=None,
+        filename_pattern=None,
+        size_limit=None,
+        modified_after=None,
+        modified_before=None,
+    ):
+        """
+        Find indexed files matching the given criteria.
+
+        :param folder_path: (Optional) Only return files under this folder.
+        :param extension: (Optional) File extension to filter by (e.g., '.txt'), case-insensitive.
+        :param filename_pattern: (Optional) A regex pattern that filenames should match.
+        :param size_limit: (Optional) A tuple (min_size, max_size) in bytes.
+                          Use None for min_size or max_size if you don't want to set a limit.
+        :param modified_after: (Optional) datetime; only files modified at or after it.
+        :param modified_before: (Optional) datetime; only files modified at or before it.
+        :return: List of (path, size, mtime) tuples, newest first.
+        """
+        clauses = []
+        params = []
+        if folder_path is not None:
+            clauses.append(_under_clause("directory"))
+            params.extend(_under_params(os.path.normpath(folder_path)))
+        if extension:
+            clauses.append("substr(lower(name), -?) = ?")
+            params.extend([len(extension), extension.lower()])
+        if filename_pattern:
+            clauses.append("name REGEXP ?")
+            params.append(filename_pattern)
+        if size_limit:
+            min_size, max_size = size_limit
+            if min_size is not None:
+                clauses.append("size >= ?")
+                params.append(min_size)
+            if max_size is not None:
+                clauses.append("size <= ?")
+                params.append(max_size)
+        if modified_after is not None:
+            clauses.append("mtime >= ?")
+            params.append(modified_after.timestamp())
+        if modified_before is not None:
+            clauses.append("mtime <= ?")
+            params.append(modified_before.timestamp())
+
+        sql = "SELECT path, size, mtime FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY mtime DESC"
+        return self.connection.execute(sql, params).fetchall()
+
+    def find_latest_file(
+        self,
+        folder_path,
+        extension=None,
+        filename_pattern=None,
+        size_limit=None,
+        modified_within=None,
+    ):
+        """
+        Index-backed equivalent of folder_scanner.find_latest_file. The caller is
+        responsible for refreshing the folder first.
+
+        :return: The path to the latest modified file, or None if no files match.
+        """
+        modified_after = None
+        if modified_within:
+            modified_after = datetime.now() - modified_within
+        rows = self.query(
+            folder_path,
+            extension=extension,
+            filename_pattern=filename_pattern,
+            size_limit=size_limit,
+            modified_after=modified_after,
+        )
+        return rows[0][0] if rows else None
+
+    def _list_directory(self, directory, dir_mtime):
+        """Re-reads one directory into the index and returns its subdirectories."""
+        files = []
+        subdirectories = []
+        try:
+            with os.scandir(directory) as scanner:
+                for entry in scanner:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                        elif entry.is_file():
+                            # On Windows the stat comes with the listing for free
+                            stat = entry.stat()
+                            files.append(
+                                (
+                                    entry.path,
+                                    directory,
+                                    entry.name,
+                                    os.path.splitext(entry.name)[1].lower(),
+                                    stat.st_size,
+                                    stat.st_mtime,
+                                )
+                            )
+                    except OSError:
+                        # The entry might have been removed during the listing
+                        continue
+        except OSError:
+            self._forget_directory(directory)
+            return []
+
+        self.connection.execute("DELETE FROM files WHERE directory = ?", (directory,))
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", files
+        )
+
+        # Drop subdirectories that no longer exist, with everything under them
+        current = set(subdirectories)
+        for (path,) in self.connection.execute(
+            "SELECT path FROM directories WHERE parent = ?", (directory,)
+        ).fetchall():
+            if path not in current:
+                self._forget_directory(path)
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO directories VALUES (?, ?, ?)",
+            (directory, os.path.dirname(directory), dir_mtime),
+        )
+        return subdirectories
+
+    def _restat_files(self, directory):
+        """Updates the size and mtime of the indexed files of an unchanged directory."""
+        indexed = {
+            path: (size, mtime)
+            for path, size, mtime in self.connection.execute(
+                "SELECT path, size, mtime FROM files WHERE directory = ?", (directory,)
+            )
+        }
+        changed = []
+        try:
+            with os.scandir(directory) as scanner:
+                for entry in scanner:
+                    if entry.path not in indexed:
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if indexed[entry.path] != (stat.st_size, stat.st_mtime):
+                        changed.append((stat.st_size, stat.st_mtime, entry.path))
+        except OSError:
+            return
+        self.connection.executemany(
+            "UPDATE files SET size = ?, mtime = ? WHERE path = ?", changed
+        )
+
+    def _forget_directory(self, directory):
+        """Removes a directory and everything under it from the index."""
+        params = _under_params(directory)
+        self.connection.execute(
+            "DELETE FROM files WHERE " + _under_clause("directory"), params
+        )
+        self.connection.execute(
+            "DELETE FROM directories WHERE " + _under_clause("path"), params
+        )
+
+
+def _under_clause(column):
+    """SQL condition matching a folder path and every path below it."""
+    return f"({column} = ? OR substr({column}, 1, ?) = ?)"
+
+
+def _under_params(folder_path):
+    prefix = os.path.join(folder_path, "")
+    return (folder_path, len(prefix), prefix)
+
+
+def _regexp_search(pattern, value):
+    return value is not None and re.search(pattern, value) is not None
@@ -15,6 +15,7 @@ def find_latest_file(
     filename_pattern=None,
     size_limit=None,
     modified_within=None,
+    index=None,
 ):
     """
     Find the latest modified file in the specified folder that matches given criteria.
@@ -26,8 +27,16 @@ def find_latest_file(
                       Use None for min_size or max_size if you don't want to set a limit.
     :param modified_within: (Optional) A timedelta object representing the time window from now.
                             Only files modified within this time window are considered.
+    :param index: (Optional) A FolderIndex; the folder is refreshed incrementally and
+                  searched in the index instead of walking it.
     :return: The path to the latest modified file, or None if no files match.
     """
+    if index is not None:
+        index.refresh(folder_path)
+        return index.find_latest_file(
+            folder_path, extension, filename_pattern, size_limit, modified_within
+        )
+
     latest_file = None
     latest_mtime = None
     now = datetime.now()
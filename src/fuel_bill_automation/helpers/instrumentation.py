@@ -0,0 +1,322 @@
+"""
+instrumentation.py
+
+A module to record how long each processing stage takes and how much memory it uses.
+Stages are measured with the instrument_stage context manager or the instrumented
+decorator and kept in a run log, which also appends them as JSON lines to a file when
+one is configured with run_log.configure or the FUEL_BILL_RUN_LOG environment variable.
+One stage can also be captured with cProfile or tracemalloc.
+"""
+
+import cProfile
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+import warnings
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+# Path of the run log file, e.g. RUN_LOG_FILE; unset or empty writes no file
+RUN_LOG_ENVIRONMENT_VARIABLE = "FUEL_BILL_RUN_LOG"
+# Records kept in memory; older ones are dropped, the file keeps them all
+MAX_RECORDS = 10_000
+# Parameters of instrumented functions whose files are counted in bytes_read
+PATH_PARAMETERS = ("file_path", "file_paths")
+RUN_ID = uuid.uuid4().hex[:12]
+
+
+@dataclass
+class StageRecord:
+    """
+    Measurements of one stage run; rows_in, rows_out and bytes_read may be set by the stage.
+
+    process_peak_rss_bytes is the peak resident memory of the whole process at the end of
+    the stage, and peak_rss_growth_bytes how much the stage raised it; 0 means the stage
+    stayed below an earlier peak.
+    """
+
+    stage: str
+    started: str = ""
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    process_peak_rss_bytes: Optional[int] = None
+    peak_rss_growth_bytes: Optional[int] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    bytes_read: Optional[int] = None
+    error: Optional[str] = None
+    profile_path: Optional[str] = None
+    traced_peak_bytes: Optional[int] = None
+    run_id: str = RUN_ID
+    pid: int = 0
+
+
+class RunLog:
+    def __init__(self, log_path: Optional[str] = None, max_records: int = MAX_RECORDS):
+        """
+        Collects the latest stage records and appends every record to a JSON lines file.
+
+        :param log_path: (Optional) Path of the .jsonl file, e.g. RUN_LOG_FILE; None keeps
+                         records in memory only.
+        :param max_records: Records kept in memory.
+        """
+        self.log_path = log_path
+        self.records = deque(maxlen=max_records)
+        self.profiled_stage = None
+        self.profile_mode = None
+        self._lock = threading.Lock()
+
+    def configure(self, log_path=None, profiled_stage=None, profile_mode="cprofile"):
+        """
+        Change where records are written and which stage, if any, is profiled.
+
+        :param log_path: (Optional) Path of the .jsonl file, e.g. RUN_LOG_FILE; None keeps
+                         records in memory only.
+        :param profiled_stage: (Optional) Name of the stage to capture.
+        :param profile_mode: 'cprofile' for a .prof file of the stage, or 'tracemalloc'
+                             for its top allocations and traced peak memory.
+        """
+        if profile_mode not in PROFILE_MODES:
+            raise ValueError(f"profile_mode must be one of {PROFILE_MODES}")
+        self.log_path = log_path
+        self.profiled_stage = profiled_stage
+        self.profile_mode = profile_mode
+
+    def write(self, record: StageRecord):
+        with self._lock:
+            self.records.append(record)
+            if self.log_path is None:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(asdict(record)) + "\n")
+            except OSError as e:
+                # Instrumentation must never break the stage it measures
+                warnings.warn(f"Could not write run log: {e}")
+
+
+run_log = RunLog(os.environ.get(RUN_LOG_ENVIRONMENT_VARIABLE) or None)
+_active = threading.local()
+
+
+@contextmanager
+def instrument_stage(stage: str, log: Optional[RunLog] = None):
+    """
+    Measure a block of code as a stage and write its record to the run log.
+
+    The yielded StageRecord can be given rows_in, rows_out and bytes_read. A stage nested
+    in a running stage of the same name, such as a cached call to itself, is not recorded
+    twice. CPU time and peak memory are the whole process's, so they include threads running
+    alongside the stage but not worker processes it starts.
+
+    :param stage: Name of the stage.
+    :param log: (Optional) RunLog to write to; defaults to the module's run_log.
+    """
+    log = log or run_log
+    active = getattr(_active, "stages", None)
+    if active is None:
+        active = _active.stages = []
+    record = StageRecord(stage, pid=os.getpid())
+    if stage in active:
+        yield record
+        return
+
+    active.append(stage)
+    profiler = None
+    profile_mode = log.profile_mode if log.profiled_stage == stage else None
+    if profile_mode == "cprofile":
+        profiler = cProfile.Profile()
+    elif profile_mode == "tracemalloc":
+        if tracemalloc.is_tracing():
+            # Somebody else is tracing; leave their session alone
+            profile_mode = None
+        else:
+            tracemalloc.start()
+
+    record.started = datetime.now().isoformat(timespec="seconds")
+    rss_start = peak_rss_bytes()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            if profiler is not None:
+                profiler.disable()
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            record.process_peak_rss_bytes = peak_rss_bytes()
+            if rss_start is not None and record.process_peak_rss_bytes is not None:
+                record.peak_rss_growth_bytes = record.process_peak_rss_bytes - rss_start
+            if profile_mode is not None:
+                try:
+                    record.profile_path = _save_profile(log, record, profiler)
+                except Exception as e:
+                    # Instrumentation must never break the stage it measures
+                    warnings.warn(f"Could not save the profile of {stage}: {e}")
+        finally:
+            if profile_mode == "tracemalloc" and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            active.pop()
+            log.write(record)
+
+
+def instrumented(stage: Optional[str] = None, rows_in=None, bytes_read=None):
+    """
+    Decorator measuring every call of a function as a stage.
+
+    By default rows_in counts the rows of DataFrame arguments, bytes_read sums the size of
+    the files of the PATH_PARAMETERS arguments (alone or in lists) and rows_out counts the
+    rows of a returned DataFrame, list or tuple of DataFrames.
+
+    :param stage: (Optional) Stage name; defaults to the function's qualified name.
+    :param rows_in: (Optional) Function of the call's arguments returning the input rows.
+    :param bytes_read: (Optional) Function of the call's arguments returning the bytes read.
+    """
+
+    def decorator(func):
+        name = stage or func.__qualname__
+        signature = inspect.signature(func)
+        path_parameters = [
+            parameter
+            for parameter in signature.parameters
+            if parameter in PATH_PARAMETERS
+        ]
+
+        def count_path_bytes(*args, **kwargs):
+            if not path_parameters:
+                return None
+            try:
+                arguments = signature.bind(*args, **kwargs).arguments
+            except TypeError:
+                # The call itself fails with the same error
+                return None
+            return _count_file_bytes(
+                [arguments[name] for name in path_parameters if name in arguments]
+            )
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with instrument_stage(name) as record:
+                record.rows_in = (rows_in or _count_input_rows)(*args, **kwargs)
+                record.bytes_read = (bytes_read or count_path_bytes)(*args, **kwargs)
+                result = func(*args, **kwargs)
+                record.rows_out = count_rows(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Returns the peak resident memory of this process so far, or None if unknown."""
+    if sys.platform == "win32":
+        return _windows_peak_working_set()
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _windows_peak_working_set():
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(
+        process, ctypes.byref(counters), counters.cb
+    ):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def _save_profile(log, record, profiler):
+    """Writes the stage's cProfile stats or tracemalloc top allocations next to the log."""
+    folder = os.path.dirname(log.log_path) if log.log_path else "."
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(folder, f"{record.stage}-{stamp}-{record.pid}")
+    os.makedirs(folder, exist_ok=True)
+    if profiler is not None:
+        path = base + ".prof"
+        profiler.dump_stats(path)
+        return path
+
+    snapshot = tracemalloc.take_snapshot()
+    _, record.traced_peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    path = base + ".tracemalloc.txt"
+    with open(path, "w", encoding="utf-8") as file:
+        for statistic in snapshot.statistics("lineno")[:50]:
+            file.write(f"{statistic}\n")
+    return path
+
+
+def count_rows(value) -> Optional[int]:
+    """Rows of a DataFrame, or the total rows of a list or tuple of DataFrames, else None."""
+    if hasattr(value, "shape") and hasattr(value, "columns"):
+        return len(value)
+    if isinstance(value, (list, tuple)) and any(
+        hasattr(item, "columns") for item in value
+    ):
+        return sum(len(item) for item in value if hasattr(item, "columns"))
+    return None
+
+
+def _count_input_rows(*args, **kwargs):
+    counts = [
+        len(value)
+        for value in list(args) + list(kwargs.values())
+        if hasattr(value, "shape") and hasattr(value, "columns")
+    ]
+    return sum(counts) if counts else None
+
+
+def _count_file_bytes(values):
+    """Total size of the files among paths and lists of paths, or None if there are none."""
+    total = None
+    for value in values:
+        paths = value if isinstance(value, (list, tuple)) else [value]
+        for path in paths:
+            if isinstance(path, (str, os.PathLike)):
+                try:
+                    if os.path.isfile(path):
+                        total = (total or 0) + os.path.getsize(path)
+                except (OSError, ValueError):
+                    continue
+    return total
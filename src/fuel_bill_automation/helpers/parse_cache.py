@@ -0,0 +1,227 @@
+"""
+parse_cache.py
+
+A module to cache parsed PDF and Excel inputs on disk as Parquet files, keyed on the
+content hash of the source files and the version of the parser that produced them.
+Each file also records the dtypes of the parsed DataFrame, so a cache hit returns the
+same dtypes and Python values as a fresh parse.
+"""
+
+import hashlib
+import json
+import os
+import warnings
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fuel_bill_automation.configs.constants import PARSE_CACHE_DIRECTORY
+
+CACHE_FILE_EXTENSION = ".parquet"
+# Parquet schema metadata key of the manifest of the DataFrame's dtypes
+MANIFEST_METADATA_KEY = b"fuel_bill_automation.manifest"
+
+
+def hash_file(file_path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's content."""
+    with open(file_path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+class ParseCache:
+    def __init__(
+        self,
+        cache_directory: str = PARSE_CACHE_DIRECTORY,
+        max_bytes: Optional[int] = 2 * 1024**3,
+        max_entries: Optional[int] = None,
+    ):
+        """
+        Initialize the ParseCache.
+
+        :param cache_directory: Folder where the cached DataFrames are stored.
+        :param max_bytes: (Optional) Total size limit of the cache in bytes.
+        :param max_entries: (Optional) Maximum number of cached DataFrames.
+        """
+        self.cache_directory = cache_directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(cache_directory, exist_ok=True)
+
+    def make_key(
+        self, file_paths: Iterable[str], parser_name: str, parser_version, *params
+    ) -> str:
+        """
+        Build the cache key for a parse of the given files.
+
+        :param file_paths: Source files, in the order they are parsed.
+        :param parser_name: Name of the parsing function.
+        :param parser_version: Version of the parser; bump it when its output changes.
+        :param params: Extra parameters that change the parser output.
+        :return: Hex digest identifying the parse result.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{parser_name}:{parser_version}:{params!r}".encode())
+        for file_path in file_paths:
+            digest.update(hash_file(file_path).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Load a cached DataFrame, or return None if the key is not cached.
+        """
+        path = self._entry_path(key)
+        try:
+            df = _read_with_dtypes(path)
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """
+        Store a DataFrame in the cache and evict old entries if over the limits.
+
+        :return: True if the DataFrame was stored, False if it cannot be written as Parquet
+                 (for example mixed-type object columns or non-string column names).
+        """
+        path = self._entry_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            _write_with_dtypes(df, temp_path)
+        except (ImportError, TypeError, ValueError, OSError) as error:
+            # pyarrow raises ArrowException subclasses of TypeError and ValueError
+            warnings.warn(f"Not caching parse result: {error}", stacklevel=2)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+        os.replace(temp_path, path)
+        self.evict()
+        return True
+
+    def get_or_parse(
+        self,
+        file_paths: List[str],
+        parser_name: str,
+        parser_version,
+        parse_func: Callable[[], pd.DataFrame],
+        *params,
+    ) -> pd.DataFrame:
+        """
+        Return the cached DataFrame for the given files, parsing and caching it on a miss.
+
+        :param file_paths: Source files the parser reads.
+        :param parser_name: Name of the parsing function.
+        :param parser_version: Version of the parser.
+        :param parse_func: Function called without arguments to parse the files.
+        :param params: Extra parameters that change the parser output.
+        :return: The parsed DataFrame.
+        """
+        key = self.make_key(file_paths, parser_name, parser_version, *params)
+        df = self.get(key)
+        if df is None:
+            df = parse_func()
+            self.put(key, df)
+        return df
+
+    def evict(self) -> None:
+        """
+        Delete least recently used entries until the cache is within its limits.
+        """
+        entries = self._entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        # Oldest access time first
+        entries.sort(key=lambda entry: entry[2])
+        while entries and (
+            (self.max_bytes is not None and total_bytes > self.max_bytes)
+            or (self.max_entries is not None and len(entries) > self.max_entries)
+        ):
+            path, size, _ = entries.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+
+    def clear(self) -> None:
+        """Delete every cached entry."""
+        for path, _, _ in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_directory, key + CACHE_FILE_EXTENSION)
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        """Returns (path, size, last used time) for each cached entry."""
+        entries = []
+        with os.scandir(self.cache_directory) as scanner:
+            for entry in scanner:
+                if not entry.name.endswith(CACHE_FILE_EXTENSION):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+
+def _write_with_dtypes(df: pd.DataFrame, path: str) -> None:
+    """
+    Writes df as Parquet with a manifest in the schema metadata: the dtype of every
+    column, and the object columns whose missing values are NaN rather than None.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not df.columns.is_unique or not all(isinstance(c, str) for c in df.columns):
+        raise ValueError("column names must be unique strings")
+    table = pa.Table.from_pandas(df)
+    manifest = {
+        "dtypes": {column: str(dtype) for column, dtype in df.dtypes.items()},
+        "nan_columns": [
+            column
+            for column in df.columns
+            if df[column].dtype == object
+            and any(isinstance(value, float) for value in df[column][df[column].isna()])
+        ],
+    }
+    metadata = dict(table.schema.metadata or {})
+    metadata[MANIFEST_METADATA_KEY] = json.dumps(manifest).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def _read_with_dtypes(path: str) -> pd.DataFrame:
+    """
+    Reads a file of _write_with_dtypes back with the dtypes it was written with.
+
+    Parquet stores an object column by the type of its values, e.g. the integers of a
+    header-promoted Excel column, which read back as int64, or float64 when some are
+    missing, and its missing values as nulls. Object columns are rebuilt from the
+    Parquet values as Python objects, with their missing values restored.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    metadata = table.schema.metadata or {}
+    if MANIFEST_METADATA_KEY not in metadata:
+        raise KeyError("The cache entry has no dtype manifest")
+    manifest = json.loads(metadata[MANIFEST_METADATA_KEY])
+    nan_columns = set(manifest["nan_columns"])
+    df = table.to_pandas()
+    for column, dtype in manifest["dtypes"].items():
+        if dtype == "object":
+            values = table.column(column).to_pylist()
+            if column in nan_columns:
+                values = [np.nan if value is None else value for value in values]
+            df[column] = pd.Series(values, index=df.index, dtype=object)
+        elif str(df[column].dtype) != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
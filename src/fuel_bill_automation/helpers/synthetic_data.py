@@ -0,0 +1,197 @@
+"""
+synthetic_data.py
+
+A module to generate synthetic fuel bill inputs at any scale: WEX-style fuel
+transactions, Best Pass toll details, multi-department financial summary tables and
+PDFs, and labor report workbooks. The same seed always gives the same data, so
+benchmarks and tests can run without the network drive inputs.
+"""
+
+import os
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from fuel_bill_automation.helpers.file_loader import modified_date_range
+
+EMPLOYEE_COUNT = 120
+VEHICLE_COUNT = 250
+DEPARTMENT_COUNT = 12
+TOLL_AGENCIES = ("NYSTA", "MTA B&T", "PANYNJ", "NJ TURNPIKE", "MASS DOT")
+
+
+def make_wex_transactions(rows: int, seed: int = 0, year: int = 2024) -> pd.DataFrame:
+    """Builds a year of fuel card transactions with WEX-style columns."""
+    rng = np.random.default_rng(seed)
+    vehicles = [f"SC-{number:04d}" for number in range(VEHICLE_COUNT)]
+    departments = [f"DEPARTMENT {number}" for number in range(DEPARTMENT_COUNT)]
+    start = np.datetime64(f"{year}-01-01T00:00")
+    minutes = rng.integers(0, 366 * 24 * 60, rows)
+    gallons = rng.gamma(4.0, 4.0, rows).round(3)
+    price = rng.normal(3.40, 0.25, rows).round(3)
+    df = pd.DataFrame(
+        {
+            "Transaction Date": start + minutes.astype("timedelta64[m]"),
+            "Vehicle": rng.choice(vehicles, rows),
+            "Department": rng.choice(departments, rows),
+            "Product": rng.choice(["Unleaded", "Diesel"], rows, p=[0.7, 0.3]),
+            "Units": gallons,
+            "Unit Cost": price,
+            "Total Fuel Cost": (gallons * price).round(2),
+        }
+    )
+    return df.sort_values("Transaction Date", ignore_index=True)
+
+
+def make_best_pass_tolls(
+    rows: int, seed: int = 0, year: int = 2024, month: int = 1
+) -> pd.DataFrame:
+    """Builds a month of E-ZPass toll transactions with Best Pass toll detail columns."""
+    rng = np.random.default_rng(seed)
+    days = pd.Period(year=year, month=month, freq="M").days_in_month
+    start = np.datetime64(f"{year}-{month:02d}-01T00:00")
+    entry_minutes = rng.integers(0, days * 24 * 60, rows)
+    exit_minutes = entry_minutes + rng.integers(5, 120, rows)
+    tags = np.array([f"00{number:08d}" for number in range(VEHICLE_COUNT)])
+    vehicle = rng.integers(0, VEHICLE_COUNT, rows)
+    df = pd.DataFrame(
+        {
+            "Tag Number": tags[vehicle],
+            "Plate": np.char.add("SC", vehicle.astype(str)),
+            "Agency": rng.choice(TOLL_AGENCIES, rows),
+            "Entry Plaza": rng.integers(1, 60, rows),
+            "Exit Plaza": rng.integers(1, 60, rows),
+            "Entry Date": start + entry_minutes.astype("timedelta64[m]"),
+            "Exit Date": start + exit_minutes.astype("timedelta64[m]"),
+            "Class": rng.choice([2, 3, 5], rows, p=[0.8, 0.15, 0.05]),
+            "Amount": rng.choice([1.25, 2.50, 3.75, 6.94, 14.75], rows),
+        }
+    )
+    return df.sort_values("Exit Date", ignore_index=True)
+
+
+def make_labor_sheet(
+    rows: int,
+    seed: int = 0,
+    year: int = 2024,
+    month: int = 1,
+    employees: int = EMPLOYEE_COUNT,
+) -> pd.DataFrame:
+    """Builds a month of labor report rows: employee, date, job number and hours."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"EMPLOYEE {number:03d}" for number in range(employees)])
+    dates = pd.date_range(f"{year}-{month:02d}-01", periods=28, freq="D")
+    return pd.DataFrame(
+        {
+            "Employee": names[rng.integers(0, employees, rows)],
+            "Date": dates[rng.integers(0, len(dates), rows)],
+            "Job Number": rng.integers(24000, 24400, rows),
+            "Hours": rng.choice([2.0, 4.0, 6.0, 8.0], rows),
+        }
+    )
+
+
+def write_labor_workbooks(
+    folder_path: str,
+    files: int,
+    rows_per_file: int,
+    seed: int = 0,
+    year: int = 2024,
+    month: int = 1,
+) -> List[str]:
+    """
+    Write weekly labor report workbooks for a month, with modified times inside the
+    window find_xlsx_files_by_modified_date searches for that month.
+
+    :param folder_path: Folder to write the workbooks in
+    :param files: Number of workbooks
+    :param rows_per_file: Rows of each workbook
+    :param seed: Random seed
+    :param year: Year of the labor
+    :param month: Month of the labor
+    :return: List of the written paths
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    start_range, end_range = modified_date_range(year, month)
+    span = (end_range - start_range).total_seconds()
+    paths = []
+    for number in range(files):
+        df = make_labor_sheet(rows_per_file, seed + number, year, month)
+        file_path = os.path.join(
+            folder_path, f"Labor Report {year}-{month:02d} {number + 1}.xlsx"
+        )
+        df.to_excel(file_path, index=False)
+        modified = start_range.timestamp() + span * (number + 0.5) / files
+        os.utime(file_path, (time.time(), modified))
+        paths.append(file_path)
+    return paths
+
+
+def make_department_table(
+    departments: int, columns: int, lines: int, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Builds a table shaped like pdfplumber output for a financial summary page: the first
+    row packs every department name, and row i packs department i's values one per line.
+    """
+    rng = np.random.default_rng(seed)
+    names = ["ACCOUNTS RECEIVABLE"] + [f"DEPARTMENT {i}" for i in range(departments)]
+    header = ["DEPARTMENT", "DESCRIPTION"] + [f"AMOUNT {i}" for i in range(columns)]
+
+    rows = []
+    for idx in range(len(names)):
+        row = ["\n".join(names) if idx == 0 else None]
+        row.append("\n".join(f"LINE {line}" for line in range(lines)))
+        for _ in range(columns):
+            amounts = rng.uniform(0, 500, lines).round(2)
+            row.append("\n".join(f"{amount:.2f}" for amount in amounts))
+        rows.append(row)
+    rows.append([None, "YTD"] + [None] * columns)
+    return pd.DataFrame(rows, columns=header)
+
+
+def write_financial_summary_pdf(
+    file_path: str,
+    pages: int,
+    departments: int = 4,
+    columns: int = 3,
+    lines: int = 3,
+    seed: int = 0,
+) -> str:
+    """
+    Write a financial summary PDF with one multi-department table per page, readable by
+    extract_tables_from_pdf. Needs reportlab, from the bench extra.
+
+    :param file_path: Path of the .pdf file to create
+    :param pages: Number of pages
+    :param departments: Departments per table
+    :param columns: Amount columns per table
+    :param lines: Description lines per department
+    :param seed: Random seed
+    :return: file_path
+    """
+    try:
+        from reportlab.lib import colors
+        from reportlab.platypus import PageBreak, SimpleDocTemplate, Table, TableStyle
+    except ImportError as e:
+        raise ImportError(
+            "write_financial_summary_pdf needs reportlab: pip install .[bench]"
+        ) from e
+
+    elements = []
+    for page in range(pages):
+        table = make_department_table(departments, columns, lines, seed + page)
+        data = [list(table.columns)] + table.fillna("").values.tolist()
+        pdf_table = Table(data)
+        pdf_table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.black)]))
+        elements += [pdf_table, PageBreak()]
+
+    # Size the page to fit the table, a table split across pages loses its departments
+    line_height = 12
+    width = 72 * 2 + 60 * (columns + 2) + 40
+    height = 72 * 2 + line_height * ((departments + 1) * (lines + 2) + departments + 3)
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    SimpleDocTemplate(file_path, pagesize=(width, height)).build(elements)
+    return file_path
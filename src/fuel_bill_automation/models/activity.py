@@ -0,0 +1,32 @@
+"""
+activity.py
+
+Models of the department lines of the Best Pass purchase activity statement.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from fuel_bill_automation.models.batch import ColumnSpec, DepartmentLineBatch
+
+
+@dataclass(frozen=True, slots=True)
+class PurchaseActivityLine:
+    """One amount of the purchase activity statement."""
+
+    department: str
+    description: Optional[str]
+    column: str
+    amount: float
+
+
+class PurchaseActivityBatch(DepartmentLineBatch):
+    """Purchase activity lines, built with from_pdf_table."""
+
+    record_type = PurchaseActivityLine
+    columns = (
+        ColumnSpec("DEPARTMENT", "string"),
+        ColumnSpec("DESCRIPTION", "string", nullable=True),
+        ColumnSpec("COLUMN", "string"),
+        ColumnSpec("AMOUNT", "float"),
+    )
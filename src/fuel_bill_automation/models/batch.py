@@ -0,0 +1,311 @@
+"""
+batch.py
+
+Building blocks of the models package: ColumnSpec describes one column of an input,
+and RecordBatch holds many rows as validated pandas columns. A batch is coerced and
+validated once per column with vectorized checks; single rows are only turned into
+slotted record objects when they are asked for.
+"""
+
+from dataclasses import dataclass, fields
+from typing import ClassVar, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+COLUMN_KINDS = ("string", "float", "int", "datetime", "category", "bool")
+# Row positions listed per failed check in a BatchValidationError message
+MAX_REPORTED_ROWS = 10
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """
+    Describes one column of a RecordBatch.
+
+    :param name: Column name in the DataFrame, e.g. 'Transaction Date'.
+    :param kind: One of COLUMN_KINDS; the column is coerced to it.
+    :param nullable: Whether missing values are allowed. A nullable column that is
+                     absent from the input is filled with missing values.
+    :param minimum: (Optional) Smallest allowed value of a float or int column.
+    :param maximum: (Optional) Largest allowed value of a float or int column.
+    :param choices: (Optional) Allowed values.
+    """
+
+    name: str
+    kind: str
+    nullable: bool = False
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    choices: Optional[Tuple] = None
+
+
+class BatchValidationError(ValueError):
+    def __init__(self, batch_name: str, errors: List[Tuple[str, str, np.ndarray]]):
+        """
+        Raised when rows of a batch fail validation.
+
+        :param batch_name: Name of the RecordBatch class.
+        :param errors: List of (column, message, failing row positions).
+        """
+        self.errors = errors
+        lines = [f"{batch_name} failed validation:"]
+        for column, message, rows in errors:
+            shown = ", ".join(str(row) for row in rows[:MAX_REPORTED_ROWS])
+            more = "..." if len(rows) > MAX_REPORTED_ROWS else ""
+            lines.append(
+                f"  {column}: {message} in {len(rows)} rows (rows {shown}{more})"
+            )
+        super().__init__("\n".join(lines))
+
+
+class RecordBatch:
+    """
+    Many rows of one record type, stored column by column in a DataFrame.
+
+    Subclasses set record_type to a slotted dataclass and columns to one ColumnSpec per
+    field of the record, in field order.
+    """
+
+    record_type: ClassVar[type]
+    columns: ClassVar[Tuple[ColumnSpec, ...]]
+
+    def __init__(self, frame: pd.DataFrame, rejected: Optional[pd.DataFrame] = None):
+        """
+        Wrap an already validated DataFrame; use from_frame or from_records to build one.
+
+        :param frame: DataFrame with exactly the batch's columns, already coerced.
+        :param rejected: (Optional) Rows dropped by from_frame, with a 'Reason' column.
+        """
+        self.frame = frame
+        self.rejected = rejected
+
+    @classmethod
+    def column_names(cls) -> List[str]:
+        return [spec.name for spec in cls.columns]
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        rename: Optional[Dict[str, str]] = None,
+        errors: str = "raise",
+    ):
+        """
+        Coerce and validate a DataFrame into a batch with one vectorized pass per column.
+
+        Extra columns are left out. Values that cannot be converted to the column's kind
+        count as invalid, like missing values in a column that is not nullable and values
+        outside the column's range or choices. The input DataFrame is not modified.
+
+        :param df: The input DataFrame
+        :param rename: (Optional) Dictionary of input column name to batch column name
+        :param errors: 'raise' to raise BatchValidationError on invalid rows, or 'drop' to
+                       leave them out and keep them in the batch's rejected DataFrame
+        :return: Batch of the valid rows
+        """
+        if errors not in ("raise", "drop"):
+            raise ValueError("errors must be 'raise' or 'drop'")
+        if rename:
+            df = df.rename(columns=rename)
+
+        missing = [
+            spec.name
+            for spec in cls.columns
+            if spec.name not in df.columns and not spec.nullable
+        ]
+        if missing:
+            raise KeyError(f"{cls.__name__} is missing columns: {missing}")
+
+        coerced = {}
+        failures = []
+        for spec in cls.columns:
+            if spec.name in df.columns:
+                values, invalid = _coerce_column(df[spec.name], spec)
+            else:
+                values = _coerce_column(pd.Series(pd.NA, index=df.index), spec)[0]
+                invalid = np.zeros(len(df), dtype=bool)
+            coerced[spec.name] = values
+            failures.append((spec.name, "invalid values", invalid))
+            failures.extend(
+                (spec.name, *check) for check in _check_column(values, spec, invalid)
+            )
+
+        frame = pd.DataFrame(coerced, index=df.index, copy=False)
+        failures.extend(("(row)", *check) for check in cls.check_rows(frame))
+        failures = [failure for failure in failures if failure[2].any()]
+        if not failures:
+            return cls(frame)
+
+        if errors == "raise":
+            raise BatchValidationError(
+                cls.__name__,
+                [
+                    (column, message, np.flatnonzero(mask))
+                    for column, message, mask in failures
+                ],
+            )
+        bad = np.logical_or.reduce([mask for _, _, mask in failures])
+        reasons = pd.Series("", index=df.index)
+        for column, message, mask in failures:
+            reasons[mask] += f"{column}: {message}; "
+        rejected = df[bad].assign(Reason=reasons[bad].str.rstrip("; "))
+        return cls(frame[~bad], rejected)
+
+    @classmethod
+    def check_rows(cls, frame: pd.DataFrame) -> List[Tuple[str, np.ndarray]]:
+        """
+        Checks across columns, overridden by batches that have any.
+
+        :param frame: The coerced DataFrame
+        :return: List of (message, boolean mask of failing rows)
+        """
+        return []
+
+    @classmethod
+    def from_records(cls, records: Sequence):
+        """Builds a batch from record objects, validated like from_frame."""
+        names = [field.name for field in fields(cls.record_type)]
+        rows = [[getattr(record, name) for name in names] for record in records]
+        return cls.from_frame(pd.DataFrame(rows, columns=cls.column_names()))
+
+    @classmethod
+    def concat(cls, batches: Sequence["RecordBatch"]):
+        """Combines batches of this type; they are already valid, so nothing is re-checked."""
+        if not batches:
+            return cls.from_frame(pd.DataFrame(columns=cls.column_names()))
+        return cls(pd.concat([batch.frame for batch in batches], ignore_index=True))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns the batch as a DataFrame sharing the batch's column data, not a copy."""
+        return self.frame.copy(deep=False)
+
+    def to_arrow(self):
+        """Returns the batch as a pyarrow Table. Needs pyarrow."""
+        import pyarrow as pa
+
+        return pa.Table.from_pandas(self.frame, preserve_index=False)
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns one column as a NumPy array, without a copy where the dtype allows."""
+        return self.frame[name].to_numpy()
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __getitem__(self, position: int):
+        values = self.frame.iloc[position]
+        return self.record_type(*(_python_value(value) for value in values))
+
+    def __iter__(self) -> Iterator:
+        for row in self.frame.itertuples(index=False, name=None):
+            yield self.record_type(*(_python_value(value) for value in row))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} rows)"
+
+
+class DepartmentLineBatch(RecordBatch):
+    """
+    Batch of Best Pass statement lines: one amount per department, description and
+    statement column, as read from the department tables of the PDF statements.
+    """
+
+    @classmethod
+    def from_pdf_table(cls, df: pd.DataFrame, errors: str = "raise"):
+        """
+        Build a batch from a department table of extract_tables_from_pdf, which has one
+        amount column per statement column. Amounts such as '$1,234.50' or '(12.00)'
+        are parsed; blank amounts are left out.
+
+        :param df: DataFrame returned by extract_tables_from_pdf
+        :param errors: 'raise' or 'drop', see RecordBatch.from_frame
+        :return: Batch with one row per department, description and statement column
+        """
+        id_columns = [
+            column for column in ("DEPARTMENT", "DESCRIPTION") if column in df
+        ]
+        lines = df.melt(id_vars=id_columns, var_name="COLUMN", value_name="AMOUNT")
+        text = lines["AMOUNT"].astype("string").str.strip().replace("", pd.NA)
+        negative = text.str.match(r"^\(.*\)$").fillna(False).to_numpy(dtype=bool)
+        numbers = pd.to_numeric(
+            text.str.replace(r"[$,()]", "", regex=True), errors="coerce"
+        ).astype("float64")
+        numbers[negative] = -numbers[negative]
+        # Unparseable text is kept so from_frame reports it
+        lines["AMOUNT"] = numbers.astype(object).where(numbers.notna(), text)
+        lines = lines[text.notna().to_numpy()]
+        return cls.from_frame(lines, errors=errors)
+
+
+def _coerce_column(series: pd.Series, spec: ColumnSpec) -> Tuple[pd.Series, np.ndarray]:
+    """Converts a column to its kind; returns it and the mask of unconvertible values."""
+    if spec.kind not in COLUMN_KINDS:
+        raise ValueError(f"Unknown column kind: {spec.kind}")
+    present = series.notna().to_numpy()
+
+    if spec.kind == "float":
+        values = pd.to_numeric(series, errors="coerce").astype("float64")
+    elif spec.kind == "int":
+        numbers = pd.to_numeric(series, errors="coerce")
+        fractional = (numbers % 1 != 0).to_numpy() & numbers.notna().to_numpy()
+        values = numbers.where(~fractional).astype("Int64")
+    elif spec.kind == "datetime":
+        values = pd.to_datetime(series, errors="coerce")
+    elif spec.kind == "bool":
+        values = series.astype("boolean")
+    elif spec.kind == "category":
+        values = series.astype("category")
+    else:
+        if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+            # Excel reads whole-number identifiers with gaps as floats, e.g. 24000.0
+            series = series.astype("Int64")
+        elif series.dtype == object:
+            # and as float elements in columns mixing numeric and text cells
+            series = series.map(_whole_float_as_int, na_action="ignore")
+        values = series.astype("string")
+    invalid = present & values.isna().to_numpy()
+    return values, invalid
+
+
+def _whole_float_as_int(value):
+    """A whole-number float element as an int, e.g. 12345.0 -> 12345; others unchanged."""
+    if (
+        isinstance(value, (float, np.floating))
+        and np.isfinite(value)
+        and value % 1 == 0
+    ):
+        return int(value)
+    return value
+
+
+def _check_column(
+    values: pd.Series, spec: ColumnSpec, invalid: np.ndarray
+) -> List[Tuple[str, np.ndarray]]:
+    """Checks one coerced column; values that failed to convert are only reported once."""
+    checks = []
+    if not spec.nullable:
+        checks.append(("missing values", values.isna().to_numpy() & ~invalid))
+    if spec.minimum is not None:
+        checks.append(
+            (f"below {spec.minimum}", (values < spec.minimum).fillna(False).to_numpy())
+        )
+    if spec.maximum is not None:
+        checks.append(
+            (f"above {spec.maximum}", (values > spec.maximum).fillna(False).to_numpy())
+        )
+    if spec.choices is not None:
+        outside = ~values.isin(spec.choices).to_numpy() & values.notna().to_numpy()
+        checks.append(("unexpected values", outside))
+    return checks
+
+
+def _python_value(value):
+    """Converts a pandas scalar of a batch column to what the record field holds."""
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,48 @@
+"""
+bill.py
+
+Models of the fuel bill lines charged back to departments.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from fuel_bill_automation.models.batch import ColumnSpec, RecordBatch
+
+# Largest difference allowed between a line's total and its fuel plus toll cost
+TOTAL_TOLERANCE = 0.005
+
+
+@dataclass(frozen=True, slots=True)
+class BillLine:
+    """Fuel and toll cost of one vehicle charged to one department and job."""
+
+    department: str
+    vehicle: Optional[str]
+    job_number: Optional[str]
+    fuel_cost: float
+    toll_cost: float
+    total_cost: float
+
+
+class BillBatch(RecordBatch):
+    """Lines of a month's fuel bill."""
+
+    record_type = BillLine
+    columns = (
+        ColumnSpec("Department", "string"),
+        ColumnSpec("Vehicle", "string", nullable=True),
+        ColumnSpec("Job Number", "string", nullable=True),
+        ColumnSpec("Fuel Cost", "float"),
+        ColumnSpec("Toll Cost", "float"),
+        ColumnSpec("Total Cost", "float"),
+    )
+
+    @classmethod
+    def check_rows(cls, frame: pd.DataFrame):
+        difference = frame["Total Cost"] - frame["Fuel Cost"] - frame["Toll Cost"]
+        wrong_total = np.abs(difference.to_numpy()) > TOTAL_TOLERANCE
+        return [("total is not fuel plus toll cost", wrong_total)]
@@ -0,0 +1,42 @@
+"""
+charges.py
+
+Models of the WEX fuel card transactions in the monthly fuel charges sheet.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from fuel_bill_automation.models.batch import ColumnSpec, RecordBatch
+
+
+@dataclass(frozen=True, slots=True)
+class FuelCharge:
+    """One fuel card transaction."""
+
+    transaction_date: datetime
+    vehicle: str
+    department: Optional[str]
+    product: str
+    units: float
+    unit_cost: float
+    total_fuel_cost: float
+    card_number: Optional[str]
+
+
+class FuelChargeBatch(RecordBatch):
+    """Fuel card transactions, e.g. a month of the fuel charges sheet."""
+
+    record_type = FuelCharge
+    columns = (
+        ColumnSpec("Transaction Date", "datetime"),
+        ColumnSpec("Vehicle", "string"),
+        ColumnSpec("Department", "string", nullable=True),
+        ColumnSpec("Product", "category"),
+        # Credits and corrections come through as negative units and costs
+        ColumnSpec("Units", "float"),
+        ColumnSpec("Unit Cost", "float", minimum=0),
+        ColumnSpec("Total Fuel Cost", "float"),
+        ColumnSpec("Card Number", "string", nullable=True),
+    )
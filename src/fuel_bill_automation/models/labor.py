@@ -0,0 +1,34 @@
+"""
+labor.py
+
+Models of the labor report and man hours rows: who worked which job on which day.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from fuel_bill_automation.models.batch import ColumnSpec, RecordBatch
+
+
+@dataclass(frozen=True, slots=True)
+class LaborEntry:
+    """Hours one employee worked on one job on one day."""
+
+    employee: str
+    date: datetime
+    job_number: str
+    hours: Optional[float]
+
+
+class LaborBatch(RecordBatch):
+    """Labor entries, e.g. the concatenated labor reports of a month."""
+
+    record_type = LaborEntry
+    columns = (
+        ColumnSpec("Employee", "string"),
+        ColumnSpec("Date", "datetime"),
+        # Job numbers are identifiers, some with letters, so they are kept as text
+        ColumnSpec("Job Number", "string"),
+        ColumnSpec("Hours", "float", nullable=True, minimum=0, maximum=24),
+    )
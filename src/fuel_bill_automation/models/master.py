@@ -0,0 +1,244 @@
+"""
+master.py
+
+Models of the vehicle master workbook: each vehicle with its fuel card and
+Best Pass transponder, and VehicleMaster, the service every fuel charge and toll is
+matched against. The workbook is parsed once into an Arrow snapshot that later runs
+memory-map instead of reading the xlsx again.
+"""
+
+import glob
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from fuel_bill_automation.configs.constants import (
+    VEHICLE_MASTER_SNAPSHOT_DIRECTORY,
+    VEHICLE_SHEET,
+)
+from fuel_bill_automation.helpers.parse_cache import hash_file
+from fuel_bill_automation.models.batch import ColumnSpec, RecordBatch
+
+# Bump when the snapshot's content changes so old snapshots are not reused
+SNAPSHOT_VERSION = 2
+# source identifies the workbook path, so masters sharing a folder keep their snapshots
+SNAPSHOT_FILE_PATTERN = "vehicle_master-{source}-v{version}-{digest}.arrow"
+
+# Lookup key name -> (vehicle master column, strip leading zeros)
+LOOKUP_KEYS = {
+    "unit_number": ("Unit Number", False),
+    "fuel_card": ("Fuel Card", True),
+    "transponder": ("Transponder", True),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Vehicle:
+    """One vehicle of the vehicle master."""
+
+    unit_number: str
+    fuel_card: Optional[str]
+    transponder: Optional[str]
+    plate: Optional[str]
+    department: Optional[str]
+    assigned_employee: Optional[str]
+
+
+class VehicleBatch(RecordBatch):
+    """Rows of the vehicle master."""
+
+    record_type = Vehicle
+    columns = (
+        ColumnSpec("Unit Number", "string"),
+        ColumnSpec("Fuel Card", "string", nullable=True),
+        ColumnSpec("Transponder", "string", nullable=True),
+        ColumnSpec("Plate", "string", nullable=True),
+        ColumnSpec("Department", "string", nullable=True),
+        ColumnSpec("Assigned Employee", "string", nullable=True),
+    )
+
+
+class VehicleMaster:
+    def __init__(
+        self,
+        workbook_path: str = VEHICLE_SHEET,
+        snapshot_directory: str = VEHICLE_MASTER_SNAPSHOT_DIRECTORY,
+        rename: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Load the vehicle master and index it by unit number, fuel card and transponder.
+
+        The snapshot is named after the workbook's content hash, so it is rebuilt only
+        when the workbook changes. Rows failing VehicleBatch validation are left out and,
+        when this instance built the snapshot, kept in rejected. When a key appears on several vehicles, the first
+        vehicle wins and the others are listed in duplicates.
+
+        :param workbook_path: Path of the vehicle master workbook.
+        :param snapshot_directory: Folder of the Arrow snapshots.
+        :param rename: (Optional) Dictionary of workbook column name to VehicleBatch
+                       column name, for headers that differ.
+        """
+        self.workbook_path = workbook_path
+        self.snapshot_directory = snapshot_directory
+        self.rejected = None
+        self.snapshot_path = self._snapshot_path(rename)
+
+        if not os.path.exists(self.snapshot_path):
+            self._write_snapshot(rename)
+        # Keep the map open; the table's buffers point into it
+        self._source = pa.memory_map(self.snapshot_path, "r")
+        self.table = pa.ipc.open_file(self._source).read_all()
+        # Arrow-backed columns share the mapped buffers instead of copying them
+        self.vehicles = VehicleBatch(self.table.to_pandas(types_mapper=pd.ArrowDtype))
+
+        self.indexes = {}
+        self.duplicates = {}
+        for key, (column, strip_zeros) in LOOKUP_KEYS.items():
+            self.indexes[key], self.duplicates[key] = _build_index(
+                self.vehicles.frame[column], strip_zeros
+            )
+
+    def __len__(self) -> int:
+        return len(self.vehicles)
+
+    def lookup(self, key: str, values: Sequence) -> np.ndarray:
+        """
+        Find many vehicles at once with one hash table probe per value.
+
+        :param key: One of LOOKUP_KEYS, e.g. 'fuel_card'.
+        :param values: Unit numbers, fuel cards or transponders to find.
+        :return: Array of vehicle positions, -1 where no vehicle matches.
+        """
+        if key not in LOOKUP_KEYS:
+            raise ValueError(f"key must be one of {tuple(LOOKUP_KEYS)}")
+        # Charges repeat the same few thousand cards, so only distinct values are normalized
+        codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+        normalized = normalize_keys(pd.Series(uniques), LOOKUP_KEYS[key][1])
+        index, positions = self.indexes[key]
+        found = index.get_indexer(normalized.to_numpy(dtype=object))
+        unique_positions = np.append(np.where(found >= 0, positions[found], -1), -1)
+        # The sentinel code -1 of missing values picks the appended -1
+        return unique_positions[codes]
+
+    def get(self, key: str, value) -> Optional[Vehicle]:
+        """Returns the vehicle matching one unit number, fuel card or transponder."""
+        position = self.lookup(key, [value])[0]
+        return None if position < 0 else self.vehicles[position]
+
+    def enrich(
+        self,
+        df: pd.DataFrame,
+        column: str,
+        key: str,
+        columns: Optional[Sequence[str]] = None,
+        suffix: str = " (Master)",
+    ) -> pd.DataFrame:
+        """
+        Add vehicle master columns to every row of a DataFrame in one vectorized join.
+
+        :param df: The input DataFrame, e.g. a month of fuel charges; it is not modified.
+        :param column: Column of df holding the key values.
+        :param key: One of LOOKUP_KEYS the column is matched on.
+        :param columns: (Optional) Vehicle master columns to add; defaults to all of them.
+        :param suffix: Added to the name of a vehicle master column df already has.
+        :return: Copy of df with the vehicle master columns, missing where no vehicle matches.
+        """
+        positions = self.lookup(key, df[column].to_numpy())
+        added = {}
+        for name in columns or self.vehicles.column_names():
+            values = self.vehicles.frame[name].astype("string").array
+            taken = values.take(positions, allow_fill=True)
+            added[name + suffix if name in df.columns else name] = taken
+        return df.assign(**added)
+
+    def _snapshot_path(self, rename) -> str:
+        digest = hashlib.sha256(
+            f"{hash_file(self.workbook_path)}:{sorted((rename or {}).items())!r}".encode()
+        ).hexdigest()[:16]
+        file_name = SNAPSHOT_FILE_PATTERN.format(
+            source=self._source_id(), version=SNAPSHOT_VERSION, digest=digest
+        )
+        return os.path.join(self.snapshot_directory, file_name)
+
+    def _source_id(self) -> str:
+        path = os.path.normcase(os.path.abspath(self.workbook_path))
+        return hashlib.sha256(path.encode()).hexdigest()[:8]
+
+    def _write_snapshot(self, rename):
+        """Parses the workbook and writes it as an uncompressed Arrow IPC file."""
+        df = pd.read_excel(self.workbook_path, sheet_name=0)
+        batch = VehicleBatch.from_frame(df, rename=rename, errors="drop")
+        self.rejected = batch.rejected
+        table = batch.to_arrow()
+
+        os.makedirs(self.snapshot_directory, exist_ok=True)
+        temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with pa.OSFile(temp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, self.snapshot_path)
+
+        # Older snapshots of this workbook only
+        old_pattern = SNAPSHOT_FILE_PATTERN.format(
+            source=self._source_id(), version="*", digest="*"
+        )
+        for old_path in glob.glob(os.path.join(self.snapshot_directory, old_pattern)):
+            if old_path != self.snapshot_path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    # Still mapped by another process on Windows
+                    pass
+
+
+def normalize_keys(values: pd.Series, strip_zeros: bool = False) -> pd.Series:
+    """
+    Normalize identifiers for matching: upper case without spaces or punctuation, and
+    optionally without leading zeros, so '0012 3456' and '123456' match.
+    """
+    if pd.api.types.is_float_dtype(values):
+        # Card numbers read from Excel come back as floats when a cell is blank; a value
+        # with a fraction, infinite or beyond int64 is no identifier, so it is made
+        # missing and matches nothing
+        integral = (values == np.floor(values)) & (values.abs() < 2.0**63)
+        values = values.where(integral).astype("Int64")
+    elif values.dtype == object:
+        # Columns mixing numeric and text cells hold the numbers as floats, which would
+        # otherwise become '12345.0' and then '123450'
+        values = values.map(_float_key, na_action="ignore")
+    keys = values.astype("string").str.upper().str.replace(r"[^0-9A-Z]", "", regex=True)
+    if strip_zeros:
+        keys = keys.str.lstrip("0")
+    return keys.replace("", pd.NA)
+
+
+def _float_key(value):
+    """An identifier read as a float element as its integer, else the value itself."""
+    if not isinstance(value, (float, np.floating)):
+        return value
+    if np.isfinite(value) and value == np.floor(value) and abs(value) < 2.0**63:
+        return int(value)
+    return pd.NA
+
+
+def _build_index(
+    column: pd.Series, strip_zeros: bool
+) -> Tuple[Tuple[pd.Index, np.ndarray], pd.DataFrame]:
+    """
+    Builds a hash index of a key column: the unique keys and the vehicle position of
+    each. Missing keys are left out so a missing lookup value matches nothing.
+    """
+    keys = normalize_keys(column, strip_zeros)
+    present = keys.notna().to_numpy()
+    repeated = keys.duplicated(keep="first").to_numpy() & present
+    duplicates = pd.DataFrame(
+        {"Key": keys[repeated].to_numpy(), "Position": np.flatnonzero(repeated)}
+    )
+    indexed = present & ~repeated
+    index = pd.Index(keys[indexed].to_numpy(dtype=object))
+    return (index, np.flatnonzero(indexed)), duplicates
@@ -0,0 +1,32 @@
+"""
+summary.py
+
+Models of the department lines of the Best Pass financial summary statement.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from fuel_bill_automation.models.batch import ColumnSpec, DepartmentLineBatch
+
+
+@dataclass(frozen=True, slots=True)
+class FinancialSummaryLine:
+    """One amount of the financial summary statement."""
+
+    department: str
+    description: Optional[str]
+    column: str
+    amount: float
+
+
+class FinancialSummaryBatch(DepartmentLineBatch):
+    """Financial summary lines, built with from_pdf_table."""
+
+    record_type = FinancialSummaryLine
+    columns = (
+        ColumnSpec("DEPARTMENT", "string"),
+        ColumnSpec("DESCRIPTION", "string", nullable=True),
+        ColumnSpec("COLUMN", "string"),
+        ColumnSpec("AMOUNT", "float"),
+    )
@@ -0,0 +1,51 @@
+"""
+tolls.py
+
+Models of the E-ZPass transactions in the Best Pass toll details sheet.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from fuel_bill_automation.models.batch import ColumnSpec, RecordBatch
+
+
+@dataclass(frozen=True, slots=True)
+class Toll:
+    """One toll transaction of a transponder."""
+
+    tag_number: str
+    plate: Optional[str]
+    agency: Optional[str]
+    entry_plaza: Optional[str]
+    exit_plaza: Optional[str]
+    entry_date: Optional[datetime]
+    exit_date: datetime
+    toll_class: Optional[int]
+    amount: float
+
+
+class TollBatch(RecordBatch):
+    """Toll transactions, e.g. a month of the Best Pass toll details sheet."""
+
+    record_type = Toll
+    columns = (
+        ColumnSpec("Tag Number", "string"),
+        ColumnSpec("Plate", "string", nullable=True),
+        ColumnSpec("Agency", "category", nullable=True),
+        ColumnSpec("Entry Plaza", "string", nullable=True),
+        ColumnSpec("Exit Plaza", "string", nullable=True),
+        # Plazas without an entry, like bridges, only have an exit date
+        ColumnSpec("Entry Date", "datetime", nullable=True),
+        ColumnSpec("Exit Date", "datetime"),
+        ColumnSpec("Class", "int", nullable=True, minimum=1),
+        ColumnSpec("Amount", "float"),
+    )
+
+    @classmethod
+    def check_rows(cls, frame: pd.DataFrame):
+        exits_before_entry = (frame["Exit Date"] < frame["Entry Date"]).fillna(False)
+        return [("exit date before entry date", exits_before_entry.to_numpy())]
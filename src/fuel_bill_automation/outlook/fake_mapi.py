@@ -0,0 +1,142 @@
+"""
+fake_mapi.py
+
+An in-memory stand-in for the parts of the Outlook MAPI object model used by the
+outlook package, so the attachment harvester can run and be tested without Outlook.
+"""
+
+import re
+from datetime import datetime
+
+from fuel_bill_automation.outlook.harvester import (
+    HAS_ATTACHMENT_FILTER,
+    OL_MAIL_ITEM_CLASS,
+    RESTRICT_DATE_FORMAT,
+)
+
+_RECEIVED_TIME_FILTER = re.compile(r"\[ReceivedTime\]\s*(>=|>|<=|<)\s*'([^']+)'")
+_COMPARISONS = {
+    ">=": lambda a, b: a >= b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    "<": lambda a, b: a < b,
+}
+
+
+class FakeAttachment:
+    def __init__(self, file_name, content=b""):
+        """
+        :param file_name: Attachment file name.
+        :param content: Bytes written by SaveAsFile.
+        """
+        self.FileName = file_name
+        self.content = content
+        self.Size = len(content)
+        self.save_count = 0
+
+    def SaveAsFile(self, path):
+        with open(path, "wb") as file:
+            file.write(self.content)
+        self.save_count += 1
+
+
+class FakeAttachments:
+    def __init__(self, attachments):
+        self._attachments = list(attachments)
+
+    @property
+    def Count(self):
+        return len(self._attachments)
+
+    def Item(self, index):
+        # COM collections are 1-based
+        return self._attachments[index - 1]
+
+    def __iter__(self):
+        return iter(self._attachments)
+
+
+class FakeMailItem:
+    def __init__(
+        self, entry_id, received_time, attachments=(), item_class=OL_MAIL_ITEM_CLASS
+    ):
+        """
+        :param entry_id: Unique EntryID of the message.
+        :param received_time: datetime the message was received.
+        :param attachments: FakeAttachment objects.
+        :param item_class: Outlook item Class, 43 for mail items.
+        """
+        self.EntryID = entry_id
+        self.ReceivedTime = received_time
+        self.Attachments = FakeAttachments(attachments)
+        self.Class = item_class
+
+
+class FakeItems:
+    def __init__(self, items):
+        self._items = list(items)
+        self._position = 0
+        self.restrictions = []
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    def Sort(self, property_name, descending=False):
+        if property_name != "[ReceivedTime]":
+            raise ValueError(f"Unsupported sort property: {property_name}")
+        self._items.sort(key=lambda item: item.ReceivedTime, reverse=descending)
+
+    def Restrict(self, filter_text):
+        """Supports the ReceivedTime comparisons and hasattachment filters Outlook does."""
+        if filter_text == HAS_ATTACHMENT_FILTER:
+            matches = [item for item in self._items if item.Attachments.Count > 0]
+        else:
+            clauses = _RECEIVED_TIME_FILTER.findall(filter_text)
+            if not clauses:
+                raise ValueError(f"Unsupported filter: {filter_text}")
+            matches = self._items
+            for operator, value in clauses:
+                bound = datetime.strptime(value, RESTRICT_DATE_FORMAT)
+                compare = _COMPARISONS[operator]
+                matches = [
+                    item for item in matches if compare(item.ReceivedTime, bound)
+                ]
+        restricted = FakeItems(matches)
+        restricted.restrictions = self.restrictions + [filter_text]
+        return restricted
+
+    def GetFirst(self):
+        self._position = 0
+        return self.GetNext()
+
+    def GetNext(self):
+        if self._position >= len(self._items):
+            return None
+        item = self._items[self._position]
+        self._position += 1
+        return item
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class FakeFolder:
+    def __init__(self, items=()):
+        self.Items = FakeItems(items)
+
+    def add(self, item):
+        self.Items._items.append(item)
+
+
+class FakeNamespace:
+    def __init__(self, folders=None):
+        """
+        :param folders: (Optional) Dictionary of default folder number to FakeFolder.
+                        An empty inbox (6) is created if missing.
+        """
+        self.folders = folders or {}
+        self.folders.setdefault(6, FakeFolder())
+
+    def GetDefaultFolder(self, folder_type):
+        return self.folders[folder_type]
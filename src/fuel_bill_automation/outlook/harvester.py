@@ -0,0 +1,236 @@
+"""
+harvester.py
+
+A module to incrementally save matching attachments from the Outlook inbox. Only mail
+received since the last run is requested from Outlook, messages are walked in batches,
+and attachments that were already saved are skipped.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from fuel_bill_automation.configs.constants import OUTLOOK_HARVEST_STATE
+from fuel_bill_automation.helpers.instrumentation import instrumented
+
+OL_FOLDER_INBOX = 6
+OL_MAIL_ITEM_CLASS = 43
+# Outlook's Restrict only understands dates in this form, to the minute
+RESTRICT_DATE_FORMAT = "%m/%d/%Y %I:%M %p"
+HAS_ATTACHMENT_FILTER = '@SQL="urn:schemas:httpmail:hasattachment" = True'
+
+
+@dataclass
+class HarvestResult:
+    """Outcome of a harvest run."""
+
+    saved: List[str] = field(default_factory=list)
+    skipped: int = 0
+    messages: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class HarvestState:
+    def __init__(self, state_path: str, key: str):
+        """
+        Sync state of one harvest, persisted as JSON.
+
+        :param state_path: Path of the JSON state file, shared by every harvest.
+        :param key: Identifies this harvest inside the state file.
+        """
+        self.state_path = state_path
+        self.key = key
+        self.last_received: Optional[datetime] = None
+        # EntryIDs already handled in the minute of last_received, since Restrict
+        # cannot filter below a minute and returns them again
+        self.boundary_entry_ids: set = set()
+        self.saved_sizes: dict = {}
+        # EntryID -> received minute of messages that failed, retried on the next run
+        self.failed: dict = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, encoding="utf-8") as file:
+            state = json.load(file).get(self.key, {})
+        if state.get("last_received"):
+            self.last_received = datetime.fromisoformat(state["last_received"])
+        self.boundary_entry_ids = set(state.get("boundary_entry_ids", []))
+        self.saved_sizes = state.get("saved_sizes", {})
+        self.failed = {
+            entry_id: datetime.fromisoformat(received)
+            for entry_id, received in state.get("failed", {}).items()
+        }
+
+    def save(self):
+        """Write the state to disk, keeping the state of other harvests."""
+        states = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as file:
+                states = json.load(file)
+        states[self.key] = {
+            "last_received": (
+                self.last_received.isoformat() if self.last_received else None
+            ),
+            "boundary_entry_ids": sorted(self.boundary_entry_ids),
+            "saved_sizes": self.saved_sizes,
+            "failed": {
+                entry_id: received.isoformat()
+                for entry_id, received in self.failed.items()
+            },
+        }
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(states, file, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    @property
+    def since(self) -> Optional[datetime]:
+        """Time to request mail from: the sync point, or an earlier failed message."""
+        times = list(self.failed.values())
+        if self.last_received is not None:
+            times.append(self.last_received)
+        return min(times, default=None)
+
+    def mark_message(self, entry_id: str, received: datetime):
+        """Record a processed message, moving the sync point forward."""
+        self.failed.pop(entry_id, None)
+        received_minute = received.replace(second=0, microsecond=0)
+        if self.last_received is None or received_minute > self.last_received:
+            self.last_received = received_minute
+            self.boundary_entry_ids = set()
+        if received_minute == self.last_received:
+            self.boundary_entry_ids.add(entry_id)
+
+    def mark_failed(self, entry_id: str, received: datetime):
+        """Record a message that failed, so later runs request and retry it."""
+        self.failed[entry_id] = received.replace(second=0, microsecond=0)
+
+    def is_processed(self, entry_id: str, received: datetime) -> bool:
+        """True if the message is at or before the sync point and was handled."""
+        if self.last_received is None or entry_id in self.failed:
+            return False
+        received_minute = received.replace(second=0, microsecond=0)
+        if received_minute < self.last_received:
+            return True
+        return (
+            received_minute == self.last_received
+            and entry_id in self.boundary_entry_ids
+        )
+
+
+def connect_outlook():
+    """Returns the MAPI namespace of the running Outlook application."""
+    import win32com.client
+
+    return win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
+
+
+@instrumented()
+def harvest_attachments(
+    search_word: str,
+    file_extension: str,
+    save_path: str,
+    namespace=None,
+    state_path: str = OUTLOOK_HARVEST_STATE,
+    batch_size: int = 200,
+) -> HarvestResult:
+    """
+    Save the inbox attachments whose name contains search_word and ends with
+    file_extension, only looking at mail received since the previous harvest.
+
+    Outlook filters the inbox to items with attachments received since the last
+    sync point. Messages are walked oldest first and the sync state is written after
+    every batch, so an interrupted run resumes where it stopped. A message that fails is
+    kept in the state and retried by later runs. An attachment is skipped when a file of
+    the same name and size was already saved.
+
+    :param search_word: Text the attachment name must contain.
+    :param file_extension: Extension the attachment name must end with (e.g., '.pdf').
+    :param save_path: Folder to save the attachments in.
+    :param namespace: (Optional) MAPI namespace; defaults to the running Outlook.
+    :param state_path: (Optional) Path of the JSON sync state file.
+    :param batch_size: Number of messages between state checkpoints.
+    :return: HarvestResult with the saved paths, skipped attachments and errors.
+    """
+    os.makedirs(save_path, exist_ok=True)
+    if namespace is None:
+        namespace = connect_outlook()
+
+    state = HarvestState(
+        state_path, f"{search_word}|{file_extension}|{os.path.abspath(save_path)}"
+    )
+    result = HarvestResult()
+
+    items = namespace.GetDefaultFolder(OL_FOLDER_INBOX).Items
+    if state.since is not None:
+        since = state.since.strftime(RESTRICT_DATE_FORMAT)
+        items = items.Restrict(f"[ReceivedTime] >= '{since}'")
+    items = items.Restrict(HAS_ATTACHMENT_FILTER)
+    # Sort the restricted collection, Restrict does not keep a prior sort
+    items.Sort("[ReceivedTime]")
+
+    in_batch = 0
+    message = items.GetFirst()
+    while message is not None:
+        try:
+            if message.Class == OL_MAIL_ITEM_CLASS:
+                _harvest_message(
+                    message, search_word, file_extension, save_path, state, result
+                )
+        except Exception as e:
+            result.errors.append(f"Error processing message: {e}")
+            try:
+                state.mark_failed(
+                    message.EntryID, message.ReceivedTime.replace(tzinfo=None)
+                )
+            except Exception as e:
+                result.errors.append(f"Message cannot be retried: {e}")
+
+        in_batch += 1
+        if in_batch >= batch_size:
+            state.save()
+            in_batch = 0
+        message = items.GetNext()
+
+    state.save()
+    print(
+        f"Saved {len(result.saved)} attachments, skipped {result.skipped}, "
+        f"from {result.messages} messages with {len(result.errors)} errors"
+    )
+    return result
+
+
+def _harvest_message(message, search_word, file_extension, save_path, state, result):
+    """Saves the matching attachments of one message and records it in the state."""
+    entry_id = message.EntryID
+    # pywin32 returns COM dates as aware datetimes in local time labelled UTC
+    received = message.ReceivedTime.replace(tzinfo=None)
+    if state.is_processed(entry_id, received):
+        return
+
+    result.messages += 1
+    attachments = message.Attachments
+    for index in range(1, attachments.Count + 1):
+        attachment = attachments.Item(index)
+        attachment_name = attachment.FileName
+        if search_word not in attachment_name or not attachment_name.endswith(
+            file_extension
+        ):
+            continue
+
+        file_path = os.path.join(save_path, attachment_name)
+        size = attachment.Size
+        if state.saved_sizes.get(attachment_name) == size and os.path.exists(file_path):
+            result.skipped += 1
+            continue
+
+        attachment.SaveAsFile(file_path)
+        state.saved_sizes[attachment_name] = size
+        result.saved.append(file_path)
+
+    state.mark_message(entry_id, received)
@@ -1,12 +1,17 @@
 import os
-import win32com.client
 
+from fuel_bill_automation.helpers.instrumentation import instrumented
 
+
+@instrumented()
 def save_attachments_from_inbox(search_word: str, file_extension: str, save_path: str):
     # Ensure the save_path exists
     if not os.path.exists(save_path):
         os.makedirs(save_path)
 
+    # Windows only, so imported here to keep the module importable elsewhere
+    import win32com.client
+
     # Connect to Outlook
     outlook = win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
     inbox = outlook.GetDefaultFolder(6)  # 6 refers to the inbox
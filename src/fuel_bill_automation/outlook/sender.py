@@ -0,0 +1,560 @@
+"""
+sender.py
+
+A module to email the fuel bills, charts and error reports over SMTP. Messages are sent
+in batches over a pool of reused SMTP connections at a throttled rate, attachments are
+streamed from disk while the message is sent instead of being read into memory, and
+every sent message is recorded in a SQLite log so a re-run after a crash does not send
+it again.
+"""
+
+import base64
+import hashlib
+import mimetypes
+import os
+import queue
+import re
+import smtplib
+import sqlite3
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.message import EmailMessage, MIMEPart
+from email.policy import SMTP
+from email.utils import formatdate, make_msgid
+from typing import Dict, Iterator, List, Optional
+
+from fuel_bill_automation.configs.constants import EMAIL_SEND_LOG_DATABASE
+from fuel_bill_automation.helpers.instrumentation import instrumented
+from fuel_bill_automation.reports.errors import generate_error_email_body
+
+# 57 raw bytes encode to one 76 character base64 line
+ATTACHMENT_READ_SIZE = 57 * 1024
+# Idle connections older than this are checked with NOOP before reuse
+IDLE_CHECK_SECONDS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent (
+    key TEXT PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    sent_at TEXT NOT NULL
+);
+"""
+
+_LINE_START_DOT = re.compile(rb"(?m)^\.")
+
+
+@dataclass
+class OutgoingEmail:
+    """
+    One message to send.
+
+    inline_images maps a Content-ID to an image path; the HTML body shows the image with
+    <img src="cid:...">. key identifies the message in the send log; when it is not given
+    it is derived from the recipients, subject, bodies and attachment names.
+    """
+
+    to: List[str]
+    subject: str
+    html_body: str
+    text_body: Optional[str] = None
+    attachments: List[str] = field(default_factory=list)
+    inline_images: Dict[str, str] = field(default_factory=dict)
+    cc: List[str] = field(default_factory=list)
+    key: Optional[str] = None
+
+    @property
+    def recipients(self) -> List[str]:
+        return list(self.to) + list(self.cc)
+
+    def idempotency_key(self) -> str:
+        if self.key is not None:
+            return self.key
+        digest = hashlib.sha256()
+        for value in (
+            *sorted(self.to),
+            *sorted(self.cc),
+            self.subject,
+            self.html_body,
+            self.text_body or "",
+            *(os.path.basename(path) for path in self.attachments),
+            *sorted(self.inline_images),
+        ):
+            digest.update(value.encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+
+@dataclass
+class SendResult:
+    """Outcome of EmailSender.send_all, by idempotency key."""
+
+    sent: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+
+class SendLog:
+    def __init__(self, database_path=EMAIL_SEND_LOG_DATABASE):
+        """
+        Persistent record of sent messages, shared by the sending threads.
+
+        :param database_path: Path to the SQLite database file, or ":memory:".
+        """
+        if database_path != ":memory:":
+            os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(database_path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def sent_keys(self, keys: List[str]) -> set:
+        """Returns the keys among keys that were already sent."""
+        found = set()
+        with self._lock:
+            # SQLite limits the number of parameters of one statement
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = self.connection.execute(
+                    "SELECT key FROM sent WHERE key IN (%s)"
+                    % ",".join("?" * len(chunk)),
+                    chunk,
+                )
+                found.update(key for (key,) in rows)
+        return found
+
+    def mark_sent(self, key: str, message_id: str, recipients: List[str], subject: str):
+        """Records a message as soon as the server accepted it, committed right away."""
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sent VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    message_id,
+                    ", ".join(recipients),
+                    subject,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+            self.connection.commit()
+
+
+class RateLimiter:
+    def __init__(self, rate: Optional[float]):
+        """
+        Spaces calls evenly across threads.
+
+        :param rate: Calls per second, or None for no limit.
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class _PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SmtpConnectionPool:
+    def __init__(
+        self,
+        host: str,
+        port: int = 25,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        security: str = "none",
+        size: int = 4,
+        timeout: float = 60.0,
+        max_messages: int = 100,
+    ):
+        """
+        A pool of logged-in SMTP connections, opened on demand and reused across batches.
+
+        :param host: SMTP server, e.g. 'smtp.office365.com'.
+        :param port: SMTP port.
+        :param username: (Optional) Login user name.
+        :param password: (Optional) Login password.
+        :param security: 'none', 'starttls' or 'ssl'.
+        :param size: Number of connections open at once.
+        :param timeout: Socket timeout in seconds.
+        :param max_messages: Messages sent over one connection before it is replaced,
+                             below the server's per-session limit.
+        """
+        if security not in ("none", "starttls", "ssl"):
+            raise ValueError("security must be 'none', 'starttls' or 'ssl'")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.size = size
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.opened = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self) -> _PooledConnection:
+        """Returns an idle connection that still answers, or a new one."""
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if time.monotonic() - connection.last_used < IDLE_CHECK_SECONDS:
+                    return connection
+                try:
+                    if connection.smtp.noop()[0] == 250:
+                        return connection
+                except OSError:
+                    pass
+                _close(connection.smtp)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: _PooledConnection, broken: bool = False):
+        """Returns a connection to the pool; broken or worn out connections are closed."""
+        if broken or connection.messages >= self.max_messages:
+            _close(connection.smtp)
+        else:
+            connection.last_used = time.monotonic()
+            self._idle.put(connection)
+        self._slots.release()
+
+    def close(self):
+        """Closes the idle connections."""
+        while True:
+            try:
+                _close(self._idle.get_nowait().smtp)
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open(self) -> _PooledConnection:
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(
+                self.host,
+                self.port,
+                timeout=self.timeout,
+                context=ssl.create_default_context(),
+            )
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.security == "starttls":
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+        except BaseException:
+            _close(smtp)
+            raise
+        self.opened += 1
+        return _PooledConnection(smtp)
+
+
+class EmailSender:
+    def __init__(
+        self,
+        pool: SmtpConnectionPool,
+        sender: str,
+        rate: Optional[float] = None,
+        send_log: Optional[SendLog] = None,
+        batch_size: int = 25,
+    ):
+        """
+        Send messages in batches, one pooled connection per batch.
+
+        :param pool: SmtpConnectionPool; its size is the number of batches sent at once.
+        :param sender: From address.
+        :param rate: (Optional) Messages per second across all connections, e.g. 0.5
+                     for the 30 a minute Exchange Online allows.
+        :param send_log: (Optional) SendLog; defaults to the one under APP_DATA_DIRECTORY.
+        :param batch_size: Messages per batch.
+        """
+        self.pool = pool
+        self.sender = sender
+        self.limiter = RateLimiter(rate)
+        self.send_log = send_log if send_log is not None else SendLog()
+        self.batch_size = batch_size
+
+    @instrumented(rows_in=lambda self, emails, *args, **kwargs: len(emails))
+    def send_all(self, emails: List[OutgoingEmail]) -> SendResult:
+        """
+        Send every message not already in the send log.
+
+        A message is logged as soon as the server accepts it; a crash between the
+        server's reply and the log write is the only case that can send it twice.
+
+        :param emails: List of OutgoingEmail.
+        :return: SendResult
+        """
+        result = SendResult()
+        keys = [email.idempotency_key() for email in emails]
+        already_sent = self.send_log.sent_keys(keys)
+        pending = []
+        for key, email in zip(keys, emails):
+            if key in already_sent:
+                result.skipped.append(key)
+            else:
+                # The same message twice in one call is sent once
+                already_sent.add(key)
+                pending.append((key, email))
+
+        batches = [
+            pending[start : start + self.batch_size]
+            for start in range(0, len(pending), self.batch_size)
+        ]
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            for sent, failed in executor.map(self._send_batch, batches):
+                result.sent.extend(sent)
+                result.failed.update(failed)
+        return result
+
+    def _send_batch(self, batch):
+        sent, failed = [], {}
+        connection = None
+        try:
+            for key, email in batch:
+                missing = [
+                    path
+                    for path in (*email.attachments, *email.inline_images.values())
+                    if not os.path.isfile(path)
+                ]
+                if missing:
+                    failed[key] = f"Missing files: {missing}"
+                    continue
+                # One retry on a fresh connection when the server dropped the old one
+                for attempt in range(2):
+                    if connection is None:
+                        try:
+                            connection = self.pool.acquire()
+                        except OSError as e:
+                            failed[key] = f"Could not connect: {e}"
+                            break
+                    try:
+                        self.limiter.wait()
+                        message_id = self._send_one(connection, email)
+                    except (
+                        smtplib.SMTPResponseException,
+                        smtplib.SMTPRecipientsRefused,
+                    ) as e:
+                        # Refused by the server; the connection is still usable
+                        failed[key] = str(e)
+                        _reset(connection.smtp)
+                        break
+                    except OSError as e:
+                        # Socket errors and SMTPServerDisconnected
+                        self.pool.release(connection, broken=True)
+                        connection = None
+                        if attempt:
+                            failed[key] = str(e)
+                        continue
+                    self.send_log.mark_sent(
+                        key, message_id, email.recipients, email.subject
+                    )
+                    sent.append(key)
+                    break
+        finally:
+            if connection is not None:
+                self.pool.release(connection)
+        return sent, failed
+
+    def _send_one(self, connection: _PooledConnection, email: OutgoingEmail) -> str:
+        """Sends one message with the DATA streamed chunk by chunk; returns its Message-ID."""
+        smtp = connection.smtp
+        message_id = make_msgid(domain=self.sender.rpartition("@")[2] or None)
+        code, response = smtp.mail(self.sender)
+        if code != 250:
+            raise smtplib.SMTPSenderRefused(code, response, self.sender)
+        refused = {}
+        for recipient in email.recipients:
+            code, response = smtp.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, response)
+        if refused:
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, response = smtp.docmd("DATA")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, response)
+        # Small header and boundary pieces are joined so each write fills a packet
+        pending = bytearray()
+        for chunk in _message_chunks(email, self.sender, message_id):
+            pending += chunk
+            if len(pending) >= ATTACHMENT_READ_SIZE:
+                smtp.send(bytes(pending))
+                pending.clear()
+        smtp.send(bytes(pending + b".\r\n"))
+        code, response = smtp.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+        connection.messages += 1
+        return message_id
+
+
+def error_report_email(
+    errors: List[str], to: List[str], title: str = "Error Report"
+) -> OutgoingEmail:
+    """Builds a message with the HTML error report of reports.errors as its body."""
+    return OutgoingEmail(
+        to=to, subject=title, html_body=generate_error_email_body(errors, title)
+    )
+
+
+def department_bill_email(
+    to: List[str],
+    department: str,
+    year: int,
+    month: int,
+    attachments: List[str],
+    chart_paths: Optional[List[str]] = None,
+) -> OutgoingEmail:
+    """
+    Builds the monthly fuel bill message of one department, with the charts shown in the
+    body. Its key only depends on the department, month and recipients, so regenerating
+    the attachments does not cause a second send.
+    """
+    period = datetime(year, month, 1).strftime("%B %Y")
+    inline_images = {
+        f"chart{index}": path for index, path in enumerate(chart_paths or [], start=1)
+    }
+    charts = "".join(
+        f'<p><img src="cid:{content_id}" alt="Chart {content_id[5:]}"></p>'
+        for content_id in inline_images
+    )
+    return OutgoingEmail(
+        to=to,
+        subject=f"{department} Fuel Bill - {period}",
+        html_body=(
+            f"<html><body><p>Attached is the {department} fuel bill for {period}.</p>"
+            f"{charts}</body></html>"
+        ),
+        attachments=attachments,
+        inline_images=inline_images,
+        key=f"bill:{year}-{month:02d}:{department}:{','.join(sorted(to))}",
+    )
+
+
+def _message_chunks(
+    email: OutgoingEmail, sender: str, message_id: str
+) -> Iterator[bytes]:
+    """
+    Yields the message's DATA, dot-stuffed, without the final '.' line. Attachments are
+    read and base64 encoded one block at a time.
+    """
+    headers = EmailMessage(policy=SMTP)
+    headers["From"] = sender
+    headers["To"] = ", ".join(email.to)
+    if email.cc:
+        headers["Cc"] = ", ".join(email.cc)
+    headers["Subject"] = email.subject
+    headers["Date"] = formatdate(localtime=True)
+    headers["Message-ID"] = message_id
+    headers["MIME-Version"] = "1.0"
+    mixed = _boundary()
+    headers["Content-Type"] = f'multipart/mixed; boundary="{mixed}"'
+    yield _header_bytes(headers)
+
+    body = MIMEPart(policy=SMTP)
+    if email.text_body is not None:
+        body.set_content(email.text_body)
+        body.add_alternative(email.html_body, subtype="html")
+    else:
+        body.set_content(email.html_body, subtype="html")
+
+    yield f"--{mixed}\r\n".encode()
+    if email.inline_images:
+        related = _boundary()
+        yield (
+            f'Content-Type: multipart/related; boundary="{related}"\r\n\r\n'
+            f"--{related}\r\n"
+        ).encode()
+        yield _LINE_START_DOT.sub(b"..", body.as_bytes())
+        for content_id, path in email.inline_images.items():
+            yield f"\r\n--{related}\r\n".encode()
+            yield from _file_part(path, "inline", content_id)
+        yield f"\r\n--{related}--\r\n".encode()
+    else:
+        yield _LINE_START_DOT.sub(b"..", body.as_bytes())
+
+    for path in email.attachments:
+        yield f"\r\n--{mixed}\r\n".encode()
+        yield from _file_part(path, "attachment")
+    yield f"\r\n--{mixed}--\r\n".encode()
+
+
+def _file_part(path, disposition, content_id=None) -> Iterator[bytes]:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    part = MIMEPart(policy=SMTP)
+    part["Content-Type"] = content_type
+    part.add_header("Content-Disposition", disposition, filename=os.path.basename(path))
+    part["Content-Transfer-Encoding"] = "base64"
+    if content_id is not None:
+        part["Content-ID"] = f"<{content_id}>"
+    yield _header_bytes(part)
+    with open(path, "rb") as file:
+        while block := file.read(ATTACHMENT_READ_SIZE):
+            # Base64 has no '.', so the lines need no dot-stuffing
+            yield base64.encodebytes(block).replace(b"\n", b"\r\n")
+
+
+def _header_bytes(message) -> bytes:
+    """Folds and encodes the headers of a message, followed by the blank line."""
+    folded = b"".join(
+        message.policy.fold_binary(name, value) for name, value in message.items()
+    )
+    return _LINE_START_DOT.sub(b"..", folded) + b"\r\n"
+
+
+def _boundary() -> str:
+    return "=_" + base64.b32encode(os.urandom(15)).decode()
+
+
+def _reset(smtp):
+    try:
+        smtp.rset()
+    except OSError:
+        pass
+
+
+def _close(smtp):
+    try:
+        smtp.quit()
+    except OSError:
+        smtp.close()
@@ -0,0 +1,136 @@
+"""
+smtp_sink.py
+
+A local SMTP server that accepts and keeps every message, so the sender can run and be
+tested without a real mail server. It understands the commands smtplib sends without
+authentication or TLS, and can be told to refuse recipients or drop connections.
+"""
+
+import socketserver
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+
+@dataclass
+class SunkMessage:
+    mail_from: str
+    recipients: List[str]
+    data: bytes
+
+
+class SmtpSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0):
+        """
+        Serve SMTP on a background thread; port 0 picks a free port.
+
+        :param host: Address to listen on.
+        :param port: Port to listen on.
+        :param delay: Seconds to wait before accepting each message, like a slow server.
+        """
+        self.messages: List[SunkMessage] = []
+        self.connections = 0
+        self.delay = delay
+        self.refused_recipients: Set[str] = set()
+        # Close the connection instead of accepting this many of the next messages
+        self.drop_messages = 0
+        self._lock = threading.Lock()
+
+        sink = self
+
+        class Handler(_SmtpHandler):
+            smtp_sink = sink
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    smtp_sink: SmtpSink
+
+    def handle(self):
+        sink = self.smtp_sink
+        with sink._lock:
+            sink.connections += 1
+        self._reply("220 smtp-sink ready")
+        mail_from: Optional[str] = None
+        recipients: List[str] = []
+        while line := self.rfile.readline():
+            command, _, argument = line.decode("ascii").strip().partition(" ")
+            command = command.upper()
+            if command in ("EHLO", "HELO"):
+                self._reply("250-smtp-sink" if command == "EHLO" else "250 smtp-sink")
+                if command == "EHLO":
+                    self._reply("250 8BITMIME")
+            elif command == "MAIL":
+                mail_from, recipients = _address(argument), []
+                self._reply("250 OK")
+            elif command == "RCPT":
+                recipient = _address(argument)
+                if recipient in sink.refused_recipients:
+                    self._reply("550 No such user")
+                else:
+                    recipients.append(recipient)
+                    self._reply("250 OK")
+            elif command == "DATA":
+                if mail_from is None or not recipients:
+                    self._reply("503 Bad sequence of commands")
+                    continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data()
+                with sink._lock:
+                    drop = sink.drop_messages > 0
+                    sink.drop_messages -= drop
+                if drop:
+                    return
+                if sink.delay:
+                    threading.Event().wait(sink.delay)
+                with sink._lock:
+                    sink.messages.append(SunkMessage(mail_from, recipients, data))
+                mail_from, recipients = None, []
+                self._reply("250 OK queued")
+            elif command == "RSET":
+                mail_from, recipients = None, []
+                self._reply("250 OK")
+            elif command == "NOOP":
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while line := self.rfile.readline():
+            if line == b".\r\n":
+                break
+            # Undo the client's dot-stuffing
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        return b"".join(lines)
+
+    def _reply(self, text):
+        self.wfile.write(text.encode("ascii") + b"\r\n")
+
+
+def _address(argument: str) -> str:
+    """Returns the address of 'FROM:<a@b>' or 'TO:<a@b>'."""
+    return argument.partition(":")[2].strip().split(" ")[0].strip("<>")
@@ -0,0 +1,296 @@
+"""
+backfill.py
+
+A module to regenerate the fuel bills of a range of months at once. The labor report
+folder is scanned once and every labor workbook is parsed once, however many months it
+falls in, and the months run in a pool of worker processes, each writing to its own
+folder. A consolidated summary workbook is written at the end.
+"""
+
+import argparse
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from fuel_bill_automation.cli import parse_month
+from fuel_bill_automation.configs.constants import (
+    BACKFILL_REPORT_DIRECTORY,
+    LABOR_REPORT_DIRECTORY,
+)
+from fuel_bill_automation.helpers.file_loader import (
+    concatenate_labor_sheets,
+    modified_date_range,
+    prepare_labor_sheet,
+)
+from fuel_bill_automation.helpers.folder_index import FolderIndex
+from fuel_bill_automation.helpers.parse_cache import ParseCache
+from fuel_bill_automation.pipeline.monthly import month_input_paths, run_month
+from fuel_bill_automation.reports.excel import SummaryWorkbookWriter
+
+SUMMARY_FILE_NAME = "Backfill Summary {start} to {end}.xlsx"
+
+
+def month_range(start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """
+    List the months from start to end inclusive.
+
+    :param start: (year, month) of the first month
+    :param end: (year, month) of the last month
+    :return: List of (year, month) tuples
+    """
+    months = []
+    year, month = start
+    while (year, month) <= tuple(end):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def scan_xlsx_files(
+    folder_path: str,
+    index: Optional[FolderIndex] = None,
+    modified_after: Optional[datetime] = None,
+    modified_before: Optional[datetime] = None,
+) -> List[Tuple[str, datetime]]:
+    """
+    Walks a folder once and returns every .xlsx file with its modified time.
+
+    When an index is given, the folder is refreshed incrementally and searched in the
+    index instead, in path order like find_xlsx_files_by_modified_date.
+
+    :param folder_path: Folder to scan.
+    :param index: (Optional) FolderIndex to search.
+    :param modified_after: (Optional) With an index, only files modified at or after it.
+    :param modified_before: (Optional) With an index, only files modified at or before it.
+    """
+    if index is not None:
+        index.refresh(folder_path)
+        rows = index.query(
+            folder_path,
+            extension=".xlsx",
+            modified_after=modified_after,
+            modified_before=modified_before,
+        )
+        # The index matches extensions case-insensitively, os.walk below does not
+        return sorted(
+            (path, datetime.fromtimestamp(mtime))
+            for path, _, mtime in rows
+            if path.endswith(".xlsx")
+        )
+
+    scanned = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if file.endswith(".xlsx"):
+                file_path = os.path.join(root, file)
+                try:
+                    modified_time = datetime.fromtimestamp(os.path.getmtime(file_path))
+                except FileNotFoundError:
+                    continue
+                scanned.append((file_path, modified_time))
+    return scanned
+
+
+def files_for_month(
+    scanned: List[Tuple[str, datetime]], year: int, month: int
+) -> List[str]:
+    """
+    Select a month's files from a scan, with the same window and order as
+    find_xlsx_files_by_modified_date.
+    """
+    start_range, end_range = modified_date_range(year, month)
+    return [
+        file_path
+        for file_path, modified_time in scanned
+        if start_range <= modified_time <= end_range
+    ]
+
+
+def backfill(
+    start: Tuple[int, int],
+    end: Tuple[int, int],
+    output_directory: str = BACKFILL_REPORT_DIRECTORY,
+    labor_report_directory: str = LABOR_REPORT_DIRECTORY,
+    templates: Optional[Dict[str, str]] = None,
+    max_workers: Optional[int] = None,
+    index: Optional[FolderIndex] = None,
+    cache_directory: Optional[str] = None,
+    **stage_options,
+) -> pd.DataFrame:
+    """
+    Run the monthly pipeline for every month from start to end.
+
+    The months run in worker processes, so objects holding connections or caches are
+    not passed on: the index is only used for the scan in this process, and every
+    worker opens its own ParseCache on cache_directory.
+
+    :param start: (year, month) of the first month
+    :param end: (year, month) of the last month
+    :param output_directory: Folder receiving one 'YYYY-MM' folder per month and the summary
+    :param labor_report_directory: Folder scanned for labor reports
+    :param templates: (Optional) Input path templates, see monthly.month_input_paths
+    :param max_workers: (Optional) Number of months processed at once
+    :param index: (Optional) FolderIndex for the labor report scan
+    :param cache_directory: (Optional) Folder of a ParseCache shared by the workers
+    :param stage_options: Further keyword arguments of monthly.build_monthly_stages,
+                          other than cache and index; they must be picklable
+    :return: DataFrame with one summary row per month
+    """
+    months = month_range(start, end)
+    if not months:
+        raise ValueError("The month range is empty")
+    if "cache" in stage_options:
+        raise ValueError("Pass cache_directory instead of a cache to backfill")
+    try:
+        pickle.dumps(stage_options)
+    except Exception as e:
+        raise ValueError(
+            f"stage_options must be picklable to reach the workers: {e}"
+        ) from e
+
+    # One scan and one parse per labor workbook, shared by every month it falls in
+    scanned = scan_xlsx_files(
+        labor_report_directory,
+        index,
+        modified_date_range(*months[0])[0],
+        modified_date_range(*months[-1])[1],
+    )
+    labor_files = {month: files_for_month(scanned, *month) for month in months}
+    unique_files = list(
+        dict.fromkeys(f for files in labor_files.values() for f in files)
+    )
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        labor_sheets = dict(
+            zip(unique_files, executor.map(_load_labor_sheet, unique_files))
+        )
+
+        tasks = []
+        for year, month in months:
+            files = labor_files[(year, month)]
+            tasks.append(
+                {
+                    "year": year,
+                    "month": month,
+                    "input_paths": month_input_paths(year, month, templates),
+                    "output_directory": os.path.join(
+                        output_directory, f"{year}-{month:02d}"
+                    ),
+                    "labor_files": files,
+                    "labor_sheets": [labor_sheets[f] for f in files],
+                    "cache_directory": cache_directory,
+                    "stage_options": stage_options,
+                }
+            )
+        rows = list(executor.map(_run_backfill_month, tasks))
+
+    summary = pd.DataFrame(rows)
+    os.makedirs(output_directory, exist_ok=True)
+    summary_path = os.path.join(
+        output_directory,
+        SUMMARY_FILE_NAME.format(
+            start=f"{months[0][0]}-{months[0][1]:02d}",
+            end=f"{months[-1][0]}-{months[-1][1]:02d}",
+        ),
+    )
+    with SummaryWorkbookWriter(summary_path) as writer:
+        writer.add_frame("Backfill Summary", summary, index=False)
+    return summary
+
+
+def _load_labor_sheet(file_path):
+    """Process task: parses one labor workbook like load_and_concatenate_xlsx."""
+    try:
+        return prepare_labor_sheet(pd.read_excel(file_path, sheet_name=0))
+    except Exception as e:
+        return e
+
+
+def _run_backfill_month(task):
+    """Process task: runs one month's pipeline and returns its summary row."""
+    row = {"Month": f"{task['year']}-{task['month']:02d}"}
+    failed = [sheet for sheet in task["labor_sheets"] if isinstance(sheet, Exception)]
+    if failed:
+        row["Error"] = f"Labor report failed to load: {failed[0]}"
+        return row
+
+    memo = {
+        "labor_files": task["labor_files"],
+        "labor": concatenate_labor_sheets(task["labor_sheets"]),
+    }
+    cache = None
+    if task["cache_directory"] is not None:
+        cache = ParseCache(task["cache_directory"])
+    try:
+        run = run_month(
+            task["year"],
+            task["month"],
+            memo=memo,
+            input_paths=task["input_paths"],
+            output_directory=task["output_directory"],
+            cache=cache,
+            # This already is a worker process, one per month
+            **{"load_in_processes": False, **task["stage_options"]},
+        )
+    except Exception as e:
+        row["Error"] = str(e)
+        return row
+
+    results = run.results
+    row.update(
+        {
+            "Report": results["report"],
+            "Labor Reports": len(task["labor_files"]),
+            "Fuel Charge Rows": len(results["fuel_charges"]),
+            "Toll Rows": len(results["tolls"]),
+            "Financial Summary Rows": len(results["financial_summary"]),
+            "Purchase Activity Rows": len(results["purchase_activity"]),
+        }
+    )
+    for name, df in results["reconciliation"]._asdict().items():
+        row[f"Jobs {name.replace('_', ' ')}"] = len(df)
+    row["Seconds"] = round(run.wall_seconds, 2)
+    row["Error"] = None
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Regenerate the fuel bills of a range of months."
+    )
+    parser.add_argument("start", type=parse_month, help="First month, YYYY-MM")
+    parser.add_argument("end", type=parse_month, help="Last month, YYYY-MM")
+    parser.add_argument("--output", default=BACKFILL_REPORT_DIRECTORY)
+    parser.add_argument("--labor-reports", default=LABOR_REPORT_DIRECTORY)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--index", action="store_true", help="Scan through the persistent folder index"
+    )
+    parser.add_argument(
+        "--cache-directory", default=None, help="Folder of a parse cache to reuse"
+    )
+    args = parser.parse_args(argv)
+
+    index = FolderIndex() if args.index else None
+    try:
+        summary = backfill(
+            args.start,
+            args.end,
+            output_directory=args.output,
+            labor_report_directory=args.labor_reports,
+            max_workers=args.workers,
+            index=index,
+            cache_directory=args.cache_directory,
+        )
+    finally:
+        if index is not None:
+            index.close()
+    print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+monthly.py
+
+A module to run one month's fuel bill processing end to end: load the month's inputs,
+clean them, reconcile labor job numbers and write the report workbook, declared as a
+stage DAG so independent loads run concurrently, each in its own worker process.
+"""
+
+import calendar
+import os
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from fuel_bill_automation.configs.constants import (
+    BEST_PASS_FINANCIAL_SUMMARY_PDF_TEMPLATE,
+    BEST_PASS_PURCHASE_ACTIVITY_PDF_TEMPLATE,
+    BEST_PASS_TOLL_SHEET_TEMPLATE,
+    FUEL_CHARGES_SHEET_TEMPLATE,
+    LABOR_REPORT_DIRECTORY,
+    MAN_HOURS_LABOR_SHEET_TEMPLATE,
+    MONTHLY_REPORT_DIRECTORY_TEMPLATE,
+)
+from fuel_bill_automation.helpers.data_cleaner import (
+    filter_by_month,
+    reconcile_job_numbers,
+)
+from fuel_bill_automation.helpers.file_loader import (
+    extract_tables_from_pdf,
+    find_xlsx_files_by_modified_date,
+    load_and_concatenate_xlsx,
+)
+from fuel_bill_automation.helpers.folder_index import FolderIndex
+from fuel_bill_automation.helpers.parse_cache import ParseCache
+from fuel_bill_automation.pipeline.runner import PipelineRun, Stage, run_stages
+from fuel_bill_automation.reports.excel import (
+    DataFrameSummarizer,
+    SummarySpec,
+    SummaryWorkbookWriter,
+)
+
+# Bump when read_sheet's output changes so cached results are not reused
+SHEET_PARSER_VERSION = 1
+
+MONTH_INPUT_TEMPLATES = {
+    "fuel_charges": FUEL_CHARGES_SHEET_TEMPLATE,
+    "tolls": BEST_PASS_TOLL_SHEET_TEMPLATE,
+    "financial_summary": BEST_PASS_FINANCIAL_SUMMARY_PDF_TEMPLATE,
+    "purchase_activity": BEST_PASS_PURCHASE_ACTIVITY_PDF_TEMPLATE,
+    "man_hours": MAN_HOURS_LABOR_SHEET_TEMPLATE,
+}
+REPORT_FILE_NAME = "Fuel Bill Report {year}-{month:02d}.xlsx"
+
+
+def month_input_paths(
+    year: int, month: int, templates: Optional[Dict[str, str]] = None
+) -> Dict[str, str]:
+    """
+    Build the input file paths of a month from path templates.
+
+    :param year: Year of the fuel bill
+    :param month: Month of the fuel bill
+    :param templates: (Optional) Dictionary of input name to template, formatted with
+                      year, month and month_name. Defaults to MONTH_INPUT_TEMPLATES.
+    :return: Dictionary of input name to path
+    """
+    templates = MONTH_INPUT_TEMPLATES if templates is None else templates
+    fields = {"year": year, "month": month, "month_name": calendar.month_name[month]}
+    return {name: template.format(**fields) for name, template in templates.items()}
+
+
+def read_sheet(file_path: str, cache: Optional[ParseCache] = None) -> pd.DataFrame:
+    """Loads the first sheet of a workbook, through the parse cache if given."""
+    if cache is not None:
+        return cache.get_or_parse(
+            [file_path],
+            "read_sheet",
+            SHEET_PARSER_VERSION,
+            lambda: read_sheet(file_path),
+        )
+    return pd.read_excel(file_path, sheet_name=0)
+
+
+def _load_labor(labor_files: List[str], cache: Optional[ParseCache] = None):
+    """Loads the month's labor reports; a module-level function so it can be pickled."""
+    return load_and_concatenate_xlsx(labor_files, cache=cache)
+
+
+def build_monthly_stages(
+    year: int,
+    month: int,
+    output_directory: Optional[str] = None,
+    input_paths: Optional[Dict[str, str]] = None,
+    labor_report_directory: str = LABOR_REPORT_DIRECTORY,
+    date_column: str = "Date",
+    employee_column: str = "Employee",
+    job_number_column: str = "Job Number",
+    cache: Optional[ParseCache] = None,
+    index: Optional[FolderIndex] = None,
+    load_in_processes: bool = True,
+) -> List[Stage]:
+    """
+    Declare the load -> clean -> reconcile -> report stages of one month.
+
+    The loads do not depend on each other, so the runner starts them together. Parsing
+    workbooks and PDFs is CPU-bound and would be serialized by the GIL in threads, so
+    the loads run in worker processes unless load_in_processes is False.
+
+    :param year: Year of the fuel bill
+    :param month: Month of the fuel bill
+    :param output_directory: (Optional) Folder for the report workbook. Defaults to
+                             MONTHLY_REPORT_DIRECTORY_TEMPLATE.
+    :param input_paths: (Optional) Dictionary of input name to path. Defaults to
+                        month_input_paths(year, month).
+    :param labor_report_directory: Folder scanned for the month's labor reports
+    :param date_column: Date column of the labor reports and man hours sheet
+    :param employee_column: Employee column of the labor reports and man hours sheet
+    :param job_number_column: Job number column of the labor reports and man hours sheet
+    :param cache: (Optional) ParseCache for the workbook and PDF parses
+    :param index: (Optional) FolderIndex for the labor report scan
+    :param load_in_processes: (Optional) Run the loads in worker processes. Pass False
+                              when already running in a worker process.
+    :return: List of Stage
+    """
+    paths = input_paths or month_input_paths(year, month)
+    if output_directory is None:
+        output_directory = MONTHLY_REPORT_DIRECTORY_TEMPLATE.format(
+            year=year, month=month
+        )
+
+    def clean(df):
+        return filter_by_month(df, date_column, month, year)
+
+    def reconcile(clean_labor, clean_man_hours):
+        return reconcile_job_numbers(
+            clean_labor,
+            clean_man_hours,
+            employee_column,
+            date_column,
+            job_number_column,
+        )
+
+    def report(
+        fuel_charges, tolls, financial_summary, purchase_activity, reconciliation
+    ):
+        file_path = os.path.join(
+            output_directory, REPORT_FILE_NAME.format(year=year, month=month)
+        )
+        return write_monthly_report(
+            file_path,
+            {
+                "Fuel Charges": fuel_charges,
+                "Tolls": tolls,
+                "Financial Summary": financial_summary,
+                "Purchase Activity": purchase_activity,
+            },
+            reconciliation,
+        )
+
+    def load(name, func, *args, depends_on=(), **kwargs):
+        func = partial(func, *args, **kwargs)
+        return Stage(name, func, depends_on, in_process=load_in_processes)
+
+    return [
+        load("fuel_charges", read_sheet, paths["fuel_charges"], cache),
+        load("tolls", read_sheet, paths["tolls"], cache),
+        load(
+            "financial_summary",
+            extract_tables_from_pdf,
+            paths["financial_summary"],
+            cache,
+        ),
+        load(
+            "purchase_activity",
+            extract_tables_from_pdf,
+            paths["purchase_activity"],
+            cache,
+        ),
+        Stage(
+            "labor_files",
+            lambda: find_xlsx_files_by_modified_date(
+                labor_report_directory, year, month, index
+            ),
+        ),
+        load("labor", _load_labor, depends_on=("labor_files",), cache=cache),
+        load("man_hours", read_sheet, paths["man_hours"], cache),
+        Stage("clean_labor", lambda labor: clean(labor), ("labor",)),
+        Stage("clean_man_hours", lambda man_hours: clean(man_hours), ("man_hours",)),
+        Stage("reconciliation", reconcile, ("clean_labor", "clean_man_hours")),
+        Stage(
+            "report",
+            report,
+            (
+                "fuel_charges",
+                "tolls",
+                "financial_summary",
+                "purchase_activity",
+                "reconciliation",
+            ),
+        ),
+    ]
+
+
+def write_monthly_report(
+    file_path: str, inputs: Dict[str, pd.DataFrame], reconciliation
+) -> str:
+    """
+    Write the month's report workbook: a summary of every input followed by the
+    job number reconciliation results.
+
+    :param file_path: Path of the .xlsx file to create
+    :param inputs: Dictionary of input name to DataFrame
+    :param reconciliation: JobNumberReconciliation of the month
+    :return: file_path
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    # describe cannot summarize a frame without columns, e.g. a PDF without tables
+    inputs = {name: df for name, df in inputs.items() if len(df.columns)}
+    summaries = DataFrameSummarizer(
+        list(inputs.values()), list(inputs.keys())
+    ).summarize(
+        [
+            SummarySpec("describe", name="Summary"),
+            SummarySpec("missing_values_table", name="Missing"),
+        ]
+    )
+    with SummaryWorkbookWriter(file_path) as writer:
+        writer.add_summaries(summaries)
+        for name, df in reconciliation._asdict().items():
+            writer.add_frame(f"Jobs {name.replace('_', ' ')}", df, index=False)
+    return file_path
+
+
+def run_month(
+    year: int,
+    month: int,
+    max_workers: Optional[int] = None,
+    memo: Optional[Dict[str, Any]] = None,
+    **stage_options,
+) -> PipelineRun:
+    """
+    Run one month's pipeline. Its wall time is set by the slowest chain of dependent
+    stages rather than the sum of all stages.
+
+    :param year: Year of the fuel bill
+    :param month: Month of the fuel bill
+    :param max_workers: (Optional) Number of stages running at once
+    :param memo: (Optional) Dictionary of known stage results, reused and updated
+    :param stage_options: Keyword arguments of build_monthly_stages
+    :return: PipelineRun with every stage result and timing
+    """
+    stages = build_monthly_stages(year, month, **stage_options)
+    return run_stages(stages, max_workers=max_workers, memo=memo)
@@ -0,0 +1,185 @@
+"""
+runner.py
+
+A module to run a set of dependent stages as a DAG, starting every stage as soon as the
+stages it depends on have finished, so independent stages run concurrently. Stages are
+started from a thread pool; CPU-bound stages, such as parsing workbooks and PDFs, which
+would hold the GIL, can run in a process pool instead.
+"""
+
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fuel_bill_automation.helpers.instrumentation import count_rows, instrument_stage
+
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline.
+
+    :param name: Unique name of the stage; its result is stored under this name.
+    :param func: Function called with the results of depends_on as keyword arguments.
+    :param depends_on: Names of the stages whose results func needs.
+    :param in_process: Run func in a worker process; func, its arguments and its result
+                       must then be picklable, e.g. a functools.partial of a module-level
+                       function.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    depends_on: Tuple[str, ...] = ()
+    in_process: bool = False
+
+
+@dataclass
+class PipelineRun:
+    """Results and wall times of a pipeline run, by stage name."""
+
+    results: Dict[str, Any] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+
+
+class PipelineError(Exception):
+    def __init__(self, stage_name, error):
+        super().__init__(f"Stage '{stage_name}' failed: {error}")
+        self.stage_name = stage_name
+
+
+def order_stages(stages: List[Stage]) -> List[Stage]:
+    """
+    Sort stages so every stage comes after the stages it depends on.
+
+    :raises ValueError: On duplicate names, unknown dependencies or a cycle.
+    """
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage name: {stage.name}")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for dependency in stage.depends_on:
+            if dependency not in by_name:
+                raise ValueError(
+                    f"Stage '{stage.name}' depends on unknown '{dependency}'"
+                )
+
+    ordered = []
+    state = {}  # name -> "visiting" or "done"
+
+    def visit(stage):
+        if state.get(stage.name) == "done":
+            return
+        if state.get(stage.name) == "visiting":
+            raise ValueError(f"Stage dependency cycle through '{stage.name}'")
+        state[stage.name] = "visiting"
+        for dependency in stage.depends_on:
+            visit(by_name[dependency])
+        state[stage.name] = "done"
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+def run_stages(
+    stages: List[Stage],
+    max_workers: Optional[int] = None,
+    memo: Optional[Dict[str, Any]] = None,
+) -> PipelineRun:
+    """
+    Run the stages on a thread pool in dependency order, and the in_process stages in
+    a process pool of up to max_workers processes, started only when one is pending.
+
+    Stages whose results are already in memo are not run again, so a memo dictionary
+    shared between runs keeps results between them. When a stage fails, no new stages
+    are started, running ones are waited for and a PipelineError is raised.
+
+    :param stages: List of Stage.
+    :param max_workers: (Optional) Number of stages running at once.
+    :param memo: (Optional) Dictionary of already known stage results, updated in place.
+    :return: PipelineRun with every stage result and timing.
+    """
+    stages = order_stages(stages)
+    run = PipelineRun()
+    results = memo if memo is not None else {}
+    run.results = results
+    pending = [stage for stage in stages if stage.name not in results]
+    start = time.perf_counter()
+
+    process_executor = None
+    if any(stage.in_process for stage in pending):
+        process_executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        failure = _run_pending(pending, results, run, max_workers, process_executor)
+    finally:
+        if process_executor is not None:
+            process_executor.shutdown(cancel_futures=True)
+
+    run.wall_seconds = time.perf_counter() - start
+    if failure is not None:
+        raise failure
+    return run
+
+
+def _run_pending(pending, results, run, max_workers, process_executor):
+    """Runs the pending stages; returns the PipelineError of the first failure, if any."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        failure = None
+        while pending or running:
+            if failure is None:
+                ready = [
+                    stage
+                    for stage in pending
+                    if all(dependency in results for dependency in stage.depends_on)
+                ]
+                for stage in ready:
+                    pending.remove(stage)
+                    kwargs = {name: results[name] for name in stage.depends_on}
+                    func = stage.func
+                    if stage.in_process:
+                        func = _in_process(process_executor, stage.func)
+                    running[executor.submit(_timed_call, stage.name, func, kwargs)] = (
+                        stage
+                    )
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name], run.seconds[stage.name] = future.result()
+                except Exception as e:
+                    if failure is None:
+                        failure = PipelineError(stage.name, e)
+                        failure.__cause__ = e
+    return failure
+
+
+def _in_process(process_executor, func):
+    """Wraps func to run in the process pool, waited for by the stage's thread."""
+
+    def call(**kwargs):
+        return process_executor.submit(func, **kwargs).result()
+
+    return call
+
+
+def _timed_call(name, func, kwargs):
+    """Runs a stage, recording it in the run log, and returns its result and wall time."""
+    with instrument_stage(name) as record:
+        record.rows_in = count_rows(tuple(kwargs.values()))
+        result = func(**kwargs)
+        record.rows_out = count_rows(result)
+    return result, record.wall_seconds
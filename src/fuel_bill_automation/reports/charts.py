@@ -4,21 +4,63 @@ chart_generator.py
 A module to generate various types of charts from a pandas DataFrame and save them as images.
 """
 
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+import matplotlib
 import pandas as pd
 import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from fuel_bill_automation.helpers.instrumentation import instrumented
+
+CHART_KINDS = (
+    "line_chart",
+    "bar_chart",
+    "scatter_plot",
+    "histogram",
+    "box_plot",
+    "heatmap",
+)
+# Fixed seed for seaborn's confidence interval bootstrap, so charts are reproducible
+BOOTSTRAP_SEED = 0
+
+
+@dataclass
+class ChartSpec:
+    """
+    Describes one chart for ChartGenerator.render_batch.
+
+    :param kind: Name of the ChartGenerator method, e.g. 'bar_chart'.
+    :param filename: File path to save the image.
+    :param options: Keyword arguments of that method other than filename.
+    :param where: (Optional) Dictionary of column name to value; only matching rows are plotted.
+    """
+
+    kind: str
+    filename: str
+    options: dict = field(default_factory=dict)
+    where: Optional[dict] = None
 
 
 class ChartGenerator:
-    def __init__(self, dataframe):
+    def __init__(self, dataframe, preaggregate=False):
         """
         Initialize the ChartGenerator with a pandas DataFrame.
 
         :param dataframe: pandas DataFrame containing the data.
+        :param preaggregate: (Optional) Aggregate bar, line and box plot data in pandas
+                             and draw without confidence intervals, instead of passing
+                             every row to seaborn.
         """
         self.df = dataframe
+        self.preaggregate = preaggregate
 
-    def line_chart(self, x_col, y_col, filename, title=None, xlabel=None, ylabel=None):
+    def line_chart(
+        self, x_col, y_col, filename, title=None, xlabel=None, ylabel=None, freq=None
+    ):
         """
         Generate a line chart and save it as an image.
 
@@ -28,14 +70,16 @@ class ChartGenerator:
         :param title: (Optional) Title of the chart.
         :param xlabel: (Optional) Label for the x-axis.
         :param ylabel: (Optional) Label for the y-axis.
+        :param freq: (Optional) With preaggregate, resample a datetime x-axis to this
+                     frequency (e.g., 'D' or 'W') before averaging.
         """
-        plt.figure()
-        sns.lineplot(data=self.df, x=x_col, y=y_col)
-        plt.title(title or "")
-        plt.xlabel(xlabel or x_col)
-        plt.ylabel(ylabel or y_col)
-        plt.savefig(filename)
-        plt.close()
+        fig, ax = _new_figure()
+        if self.preaggregate:
+            points = aggregate_mean(self.df, x_col, y_col, freq=freq)
+            sns.lineplot(data=points, x=x_col, y=y_col, ax=ax, errorbar=None)
+        else:
+            sns.lineplot(data=self.df, x=x_col, y=y_col, ax=ax, seed=BOOTSTRAP_SEED)
+        _save_figure(fig, ax, filename, title or "", xlabel or x_col, ylabel or y_col)
 
     def bar_chart(self, x_col, y_col, filename, title=None, xlabel=None, ylabel=None):
         """
@@ -48,13 +92,13 @@ class ChartGenerator:
         :param xlabel: (Optional) Label for the x-axis.
         :param ylabel: (Optional) Label for the y-axis.
         """
-        plt.figure()
-        sns.barplot(data=self.df, x=x_col, y=y_col)
-        plt.title(title or "")
-        plt.xlabel(xlabel or x_col)
-        plt.ylabel(ylabel or y_col)
-        plt.savefig(filename)
-        plt.close()
+        fig, ax = _new_figure()
+        if self.preaggregate:
+            bars = aggregate_mean(self.df, x_col, y_col)
+            sns.barplot(data=bars, x=x_col, y=y_col, ax=ax, errorbar=None)
+        else:
+            sns.barplot(data=self.df, x=x_col, y=y_col, ax=ax, seed=BOOTSTRAP_SEED)
+        _save_figure(fig, ax, filename, title or "", xlabel or x_col, ylabel or y_col)
 
     def scatter_plot(
         self, x_col, y_col, filename, title=None, xlabel=None, ylabel=None, hue=None
@@ -70,13 +114,9 @@ class ChartGenerator:
         :param ylabel: (Optional) Label for the y-axis.
         :param hue: (Optional) Column name for color encoding.
         """
-        plt.figure()
-        sns.scatterplot(data=self.df, x=x_col, y=y_col, hue=hue)
-        plt.title(title or "")
-        plt.xlabel(xlabel or x_col)
-        plt.ylabel(ylabel or y_col)
-        plt.savefig(filename)
-        plt.close()
+        fig, ax = _new_figure()
+        sns.scatterplot(data=self.df, x=x_col, y=y_col, hue=hue, ax=ax)
+        _save_figure(fig, ax, filename, title or "", xlabel or x_col, ylabel or y_col)
 
     def histogram(
         self, col, filename, bins=10, title=None, xlabel=None, ylabel="Frequency"
@@ -91,13 +131,9 @@ class ChartGenerator:
         :param xlabel: (Optional) Label for the x-axis.
         :param ylabel: (Optional) Label for the y-axis.
         """
-        plt.figure()
-        sns.histplot(data=self.df, x=col, bins=bins)
-        plt.title(title or "")
-        plt.xlabel(xlabel or col)
-        plt.ylabel(ylabel)
-        plt.savefig(filename)
-        plt.close()
+        fig, ax = _new_figure()
+        sns.histplot(data=self.df, x=col, bins=bins, ax=ax)
+        _save_figure(fig, ax, filename, title or "", xlabel or col, ylabel)
 
     def box_plot(self, x_col, y_col, filename, title=None, xlabel=None, ylabel=None):
         """
@@ -110,13 +146,17 @@ class ChartGenerator:
         :param xlabel: (Optional) Label for the x-axis.
         :param ylabel: (Optional) Label for the y-axis.
         """
-        plt.figure()
-        sns.boxplot(data=self.df, x=x_col, y=y_col)
-        plt.title(title or "")
-        plt.xlabel(xlabel or x_col)
-        plt.ylabel(ylabel or y_col)
-        plt.savefig(filename)
-        plt.close()
+        fig, ax = _new_figure()
+        if self.preaggregate:
+            ax.bxp(
+                box_plot_stats(self.df, x_col, y_col),
+                patch_artist=True,
+                boxprops={"facecolor": "C0"},
+                medianprops={"color": "0.2"},
+            )
+        else:
+            sns.boxplot(data=self.df, x=x_col, y=y_col, ax=ax)
+        _save_figure(fig, ax, filename, title or "", xlabel or x_col, ylabel or y_col)
 
     def heatmap(self, filename, title=None, cmap="viridis"):
         """
@@ -126,9 +166,149 @@ class ChartGenerator:
         :param title: (Optional) Title of the chart.
         :param cmap: (Optional) Color map to use.
         """
-        plt.figure(figsize=(10, 8))
+        fig, ax = _new_figure(figsize=(10, 8))
         corr = self.df.corr()
-        sns.heatmap(corr, annot=True, cmap=cmap)
-        plt.title(title or "Correlation Heatmap")
-        plt.savefig(filename)
-        plt.close()
+        sns.heatmap(corr, annot=True, cmap=cmap, ax=ax)
+        _save_figure(fig, ax, filename, title or "Correlation Heatmap")
+
+    @instrumented(rows_in=lambda self, *args, **kwargs: len(self.df))
+    def render_batch(self, specs, max_workers=None):
+        """
+        Render a list of charts, in a pool of worker processes on the Agg backend.
+
+        Each worker receives the DataFrame once and renders whole charts, so the images
+        are byte-identical to rendering the same specs one after another.
+
+        :param specs: List of ChartSpec.
+        :param max_workers: (Optional) Number of worker processes. Defaults to the CPU count;
+                            1 renders in this process.
+        :return: List of the saved file paths, in the order of specs.
+        """
+        for spec in specs:
+            if spec.kind not in CHART_KINDS:
+                raise ValueError(f"Unknown chart kind: {spec.kind}")
+
+        if max_workers == 1 or len(specs) <= 1:
+            return [render_chart(self.df, spec, self.preaggregate) for spec in specs]
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_chart_worker,
+            initargs=(self.df, self.preaggregate),
+        ) as executor:
+            return list(executor.map(_render_chart_in_worker, specs))
+
+
+def aggregate_mean(dataframe, x_col, y_col, freq=None):
+    """
+    Average y_col per x_col value, the estimate seaborn draws for bar and line charts.
+
+    :param dataframe: pandas DataFrame containing the data.
+    :param x_col: Column name to group by.
+    :param y_col: Column name to average.
+    :param freq: (Optional) Resample a datetime x_col to this frequency first.
+    :return: DataFrame with one row per x value, in order of first appearance.
+    """
+    data = dataframe[[x_col, y_col]]
+    if freq is not None:
+        means = data.set_index(x_col)[y_col].resample(freq).mean().dropna()
+    else:
+        means = data.groupby(x_col, sort=False, observed=True)[y_col].mean()
+    return means.reset_index()
+
+
+def box_plot_stats(dataframe, x_col, y_col, whis=1.5):
+    """
+    Compute box plot statistics per category with vectorized quantiles, in the form
+    matplotlib's Axes.bxp draws. Whiskers reach the furthest points within whis times
+    the interquartile range, as in seaborn's box plot.
+
+    :param dataframe: pandas DataFrame containing the data.
+    :param x_col: Column name for the categories.
+    :param y_col: Column name for the data.
+    :param whis: (Optional) Whisker length in interquartile ranges.
+    :return: List of dictionaries, one per category in order of first appearance.
+    """
+    data = dataframe[[x_col, y_col]].dropna()
+    grouped = data.groupby(x_col, sort=False, observed=True)[y_col]
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    if pd.api.types.is_numeric_dtype(data[x_col]):
+        # seaborn sorts numeric categories
+        quartiles = quartiles.sort_index()
+    iqr = quartiles[0.75] - quartiles[0.25]
+    low_fence = (quartiles[0.25] - whis * iqr).rename("low")
+    high_fence = (quartiles[0.75] + whis * iqr).rename("high")
+
+    fences = data.join(pd.concat([low_fence, high_fence], axis=1), on=x_col)
+    inside = fences[y_col].between(fences["low"], fences["high"])
+    whisker_low = fences[inside].groupby(x_col, sort=False, observed=True)[y_col].min()
+    whisker_high = fences[inside].groupby(x_col, sort=False, observed=True)[y_col].max()
+    fliers = fences[~inside].groupby(x_col, sort=False, observed=True)[y_col]
+    fliers = {key: values.to_numpy() for key, values in fliers}
+
+    return [
+        {
+            "label": str(key),
+            "q1": quartiles.at[key, 0.25],
+            "med": quartiles.at[key, 0.5],
+            "q3": quartiles.at[key, 0.75],
+            "whislo": whisker_low.get(key, quartiles.at[key, 0.25]),
+            "whishi": whisker_high.get(key, quartiles.at[key, 0.75]),
+            "fliers": fliers.get(key, []),
+        }
+        for key in quartiles.index
+    ]
+
+
+@instrumented()
+def render_chart(dataframe, spec, preaggregate=False):
+    """
+    Render a single ChartSpec from a DataFrame.
+
+    :param dataframe: pandas DataFrame containing the data.
+    :param spec: ChartSpec to render.
+    :param preaggregate: (Optional) Render with ChartGenerator's preaggregate mode.
+    :return: The saved file path.
+    """
+    if spec.where:
+        mask = pd.Series(True, index=dataframe.index)
+        for column, value in spec.where.items():
+            mask &= dataframe[column] == value
+        dataframe = dataframe[mask]
+    generator = ChartGenerator(dataframe, preaggregate)
+    getattr(generator, spec.kind)(filename=spec.filename, **spec.options)
+    return spec.filename
+
+
+_worker_dataframe = None
+_worker_preaggregate = False
+
+
+def _init_chart_worker(dataframe, preaggregate):
+    """Process pool initializer: keeps the DataFrame for every chart of the worker."""
+    global _worker_dataframe, _worker_preaggregate
+    matplotlib.use("Agg")
+    _worker_dataframe = dataframe
+    _worker_preaggregate = preaggregate
+
+
+def _render_chart_in_worker(spec):
+    return render_chart(_worker_dataframe, spec, _worker_preaggregate)
+
+
+def _new_figure(figsize=None):
+    """Creates a Figure with one Axes on an Agg canvas, without pyplot global state."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    return fig, ax
+
+
+def _save_figure(fig, ax, filename, title, xlabel=None, ylabel=None):
+    """Sets the title and axis labels and saves the figure."""
+    ax.set_title(title)
+    if xlabel is not None:
+        ax.set_xlabel(xlabel)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel)
+    fig.savefig(filename)
@@ -5,58 +5,34 @@ A module to generate an HTML document from a list of traceback information or cu
 This HTML document can be used as the body of an email to report errors.
 """
 
-import html
+from typing import Iterable, TextIO
 
+from fuel_bill_automation.reports.html import HtmlReportWriter, render_report
 
-def generate_error_email_body(errors, title="Error Report"):
+
+def generate_error_email_body(errors, title="Error Report", collapse=True):
     """
     Generate an HTML document from a list of errors.
 
     :param errors: List of error messages or traceback strings.
     :param title: (Optional) Title of the error report.
+    :param collapse: (Optional) Show identical errors once, with the number of times they occurred.
     :return: A string containing the HTML document.
     """
-    # Start the HTML document
-    html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>{html.escape(title)}</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            margin: 20px;
-        }}
-        h1 {{
-            color: #d9534f;
-        }}
-        pre {{
-            background-color: #f9f9f9;
-            border: 1px solid #e1e1e8;
-            padding: 10px;
-            overflow-x: auto;
-        }}
-        .error {{
-            margin-bottom: 20px;
-        }}
-    </style>
-</head>
-<body>
-    <h1>{html.escape(title)}</h1>
-"""
+    return render_report(title, lambda writer: writer.errors(errors, collapse))
 
-    # Add each error to the HTML body
-    for idx, error in enumerate(errors, 1):
-        escaped_error = html.escape(error)
-        html_content += f"""
-    <div class="error">
-        <h2>Error {idx}</h2>
-        <pre>{escaped_error}</pre>
-    </div>
-"""
-    # Close the HTML document
-    html_content += """
-</body>
-</html>
-"""
-    return html_content
+
+def write_error_report(
+    errors: Iterable[str], file: TextIO, title="Error Report", collapse=True
+):
+    """
+    Write the same document as generate_error_email_body to a text file object, for
+    reports too large to build as one string.
+
+    :param errors: Error messages or traceback strings.
+    :param file: Text file object to write to.
+    :param title: (Optional) Title of the error report.
+    :param collapse: (Optional) Show identical errors once, with the number of times they occurred.
+    """
+    with HtmlReportWriter(file, title) as writer:
+        writer.errors(errors, collapse)
@@ -2,10 +2,58 @@
 data_summary.py
 
 A module to process a list of pandas DataFrames and generate summary tables,
-grouped data, and other useful summaries for end users.
+grouped data, and other useful summaries for end users, and to write them to an
+Excel workbook.
 """
 
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+# Excel number formats applied by dtype unless a column format is given
+DEFAULT_NUMBER_FORMATS = {
+    "integer": "#,##0",
+    "float": "#,##0.00",
+    "datetime": "yyyy-mm-dd hh:mm",
+}
+MAX_SHEET_NAME_LENGTH = 31
+INVALID_SHEET_NAME_CHARACTERS = re.compile(r"[\\/*?:\[\]]")
+
+SUMMARY_KINDS = (
+    "describe",
+    "group_by",
+    "value_counts",
+    "correlation_matrix",
+    "missing_values_table",
+    "pivot_table",
+)
+
+
+@dataclass
+class SummarySpec:
+    """
+    Describes one summary for DataFrameSummarizer.summarize.
+
+    :param kind: Name of the DataFrameSummarizer method, e.g. 'group_by'.
+    :param options: Keyword arguments of that method.
+    :param name: (Optional) Key of the result; defaults to kind.
+    """
+
+    kind: str
+    options: dict = field(default_factory=dict)
+    name: Optional[str] = None
+
+    @property
+    def key(self):
+        return self.name or self.kind
 
 
 class DataFrameSummarizer:
@@ -80,10 +128,7 @@ class DataFrameSummarizer:
         """
         missing_values = {}
         for name, df in zip(self.names, self.dataframes):
-            total = df.isnull().sum()
-            percent = (df.isnull().sum() / len(df)) * 100
-            missing = pd.concat([total, percent], axis=1, keys=["Total", "Percent"])
-            missing_values[name] = missing
+            missing_values[name] = _missing_values(df.isnull().sum(), len(df))
         return missing_values
 
     def pivot_table(self, index, columns, values, aggfunc="mean"):
@@ -103,3 +148,360 @@ class DataFrameSummarizer:
             )
             pivot_tables[name] = pivot
         return pivot_tables
+
+    def summarize(self, specs, max_workers=1):
+        """
+        Compute several summaries of every DataFrame, visiting each DataFrame once.
+
+        Summaries of one DataFrame share work: the non-null counts of describe feed the
+        missing values table (or are counted once without describe), group_by summaries
+        with the same group columns and dictionaries of named functions are aggregated
+        in one agg call and split afterwards, and each value_counts column is counted
+        once. Correlation matrices and pivot tables are computed on their own. The
+        results are the same as calling the individual methods.
+
+        :param specs: List of SummarySpec.
+        :param max_workers: (Optional) Number of threads summarizing DataFrames concurrently.
+        :return: Dictionary with spec keys as keys and, as values, what the matching
+                 method returns for that spec.
+        """
+        keys = [spec.key for spec in specs]
+        if len(set(keys)) != len(keys):
+            raise ValueError("Summary names must be unique")
+        for spec in specs:
+            if spec.kind not in SUMMARY_KINDS:
+                raise ValueError(f"Unknown summary kind: {spec.kind}")
+
+        if max_workers == 1:
+            frame_results = [_summarize_frame(df, specs) for df in self.dataframes]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                frame_results = list(
+                    executor.map(
+                        lambda df: _summarize_frame(df, specs), self.dataframes
+                    )
+                )
+
+        summaries = {key: {} for key in keys}
+        for name, results in zip(self.names, frame_results):
+            for key in keys:
+                summaries[key][name] = results[key]
+        return summaries
+
+
+def _summarize_frame(df, specs):
+    """Computes every spec for one DataFrame, sharing counts and aggregations."""
+    description = None
+    if any(spec.kind == "describe" for spec in specs):
+        description = df.describe(include="all")
+    null_counts = None
+    if any(spec.kind == "missing_values_table" for spec in specs):
+        if description is not None:
+            # describe counts the non-null values of every column
+            non_null = description.loc["count"].astype("int64").rename(None)
+        else:
+            non_null = df.notna().sum()
+        null_counts = len(df) - non_null
+    aggregated = _aggregate_group_by_specs(df, specs)
+    value_counts = {}
+    results = {}
+
+    for spec in specs:
+        options = spec.options
+        if spec.kind == "describe":
+            result = description
+        elif spec.kind == "group_by":
+            result = aggregated[spec.key]
+        elif spec.kind == "value_counts":
+            result = {}
+            for col in options["columns"]:
+                if col not in value_counts:
+                    value_counts[col] = df[col].value_counts()
+                result[col] = value_counts[col]
+        elif spec.kind == "correlation_matrix":
+            result = df.corr()
+        elif spec.kind == "missing_values_table":
+            result = _missing_values(null_counts, len(df))
+        else:
+            result = pd.pivot_table(
+                df,
+                index=options["index"],
+                columns=options["columns"],
+                values=options["values"],
+                aggfunc=options.get("aggfunc", "mean"),
+            )
+        results[spec.key] = result
+
+    return results
+
+
+def _aggregate_group_by_specs(df, specs):
+    """
+    Computes the group_by specs of one DataFrame, keyed by spec key. Specs grouping by the
+    same columns share one groupby object, and those whose agg_funcs map columns to
+    function names are merged into one agg call whose columns are split between them.
+    """
+    by_grouper = {}
+    for spec in specs:
+        if spec.kind != "group_by":
+            continue
+        group_columns = spec.options["group_columns"]
+        grouper_key = (
+            tuple(group_columns)
+            if isinstance(group_columns, list)
+            else (group_columns,)
+        )
+        by_grouper.setdefault(grouper_key, (group_columns, []))[1].append(spec)
+
+    results = {}
+    for group_columns, grouper_specs in by_grouper.values():
+        grouper = df.groupby(group_columns)
+        mergeable = [
+            spec
+            for spec in grouper_specs
+            if _named_aggregations(spec.options["agg_funcs"]) is not None
+        ]
+        if len(mergeable) > 1:
+            merged_funcs = {}
+            for spec in mergeable:
+                for col, func in _named_aggregations(spec.options["agg_funcs"]):
+                    funcs = merged_funcs.setdefault(col, [])
+                    if func not in funcs:
+                        funcs.append(func)
+            merged = grouper.agg(merged_funcs)
+            for spec in mergeable:
+                results[spec.key] = _split_aggregation(
+                    merged, spec.options["agg_funcs"]
+                )
+        else:
+            mergeable = []
+        for spec in grouper_specs:
+            if spec not in mergeable:
+                results[spec.key] = grouper.agg(spec.options["agg_funcs"]).reset_index()
+    return results
+
+
+def _named_aggregations(agg_funcs):
+    """
+    (column, function name) pairs of a dictionary of function names or lists of them,
+    or None for other agg_funcs, e.g. callables, which are not merged.
+    """
+    if not isinstance(agg_funcs, dict):
+        return None
+    pairs = []
+    for col, funcs in agg_funcs.items():
+        names = [funcs] if isinstance(funcs, str) else funcs
+        if (
+            not isinstance(names, list)
+            or not names
+            or not all(isinstance(name, str) for name in names)
+            or len(set(names)) != len(names)
+        ):
+            return None
+        pairs.extend((col, name) for name in names)
+    return pairs
+
+
+def _split_aggregation(merged, agg_funcs):
+    """Selects the columns of one spec from a merged agg result, as its own agg returns."""
+    part = merged[_named_aggregations(agg_funcs)]
+    if all(isinstance(funcs, str) for funcs in agg_funcs.values()):
+        # A dictionary of single functions gives one column level
+        part = part.set_axis(list(agg_funcs), axis=1)
+    return part.reset_index()
+
+
+def _missing_values(total, row_count):
+    """Builds the missing values summary from per-column null counts."""
+    percent = (total / row_count) * 100
+    return pd.concat([total, percent], axis=1, keys=["Total", "Percent"])
+
+
+class SummaryWorkbookWriter:
+    def __init__(self, file_path, background=False, queue_size=4, chunk_size=10_000):
+        """
+        Initialize a writer streaming DataFrames to the sheets of one workbook with
+        openpyxl's write-only mode, so rows are flushed to disk as they are written
+        instead of the whole workbook being held in memory.
+
+        :param file_path: Path of the .xlsx file to create.
+        :param background: (Optional) Write sheets on a background thread; add_frame
+                           then only queues the DataFrame.
+        :param queue_size: (Optional) Maximum number of queued DataFrames in background mode.
+        :param chunk_size: (Optional) Number of rows converted to Python values at a time.
+        """
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.workbook = Workbook(write_only=True)
+        self.sheet_names = set()
+        self._header_font = Font(bold=True)
+        self._queue = None
+        self._thread = None
+        self._error = None
+        if background:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._write_queued, daemon=True)
+            self._thread.start()
+
+    def add_frame(self, sheet_name, df, index=True, number_formats=None):
+        """
+        Write a DataFrame or Series to a new sheet.
+
+        :param sheet_name: Name of the sheet; shortened and made unique as Excel requires.
+        :param df: pandas DataFrame or Series.
+        :param index: (Optional) Write the index as the leading columns.
+        :param number_formats: (Optional) Dictionary of column name to Excel number format,
+                               overriding DEFAULT_NUMBER_FORMATS.
+        :return: The sheet name used.
+        """
+        sheet_name = self._unique_sheet_name(sheet_name)
+        if self._queue is not None:
+            self._raise_background_error()
+            self._queue.put((sheet_name, df, index, number_formats))
+        else:
+            self._write_frame(sheet_name, df, index, number_formats)
+        return sheet_name
+
+    def add_summaries(self, summaries, number_formats=None):
+        """
+        Write a summaries dictionary, as returned by DataFrameSummarizer methods or
+        summarize, with one sheet per DataFrame. Nested keys are joined into the sheet name.
+
+        :param summaries: Dictionary whose values are DataFrames, Series or dictionaries of them.
+        :param number_formats: (Optional) Dictionary of column name to Excel number format.
+        :return: List of the sheet names used.
+        """
+        sheet_names = []
+        for name, value in summaries.items():
+            if isinstance(value, dict):
+                for sub_name, sub_value in value.items():
+                    sheet_names.extend(
+                        self.add_summaries(
+                            {f"{name} {sub_name}": sub_value}, number_formats
+                        )
+                    )
+            else:
+                sheet_names.append(
+                    self.add_frame(str(name), value, number_formats=number_formats)
+                )
+        return sheet_names
+
+    def save(self):
+        """Finish writing, waiting for queued sheets in background mode, and save the file."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._raise_background_error()
+        self.workbook.save(self.file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.save()
+        elif self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+    def _write_queued(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if self._error is not None:
+                # Keep draining so add_frame never blocks on a full queue
+                continue
+            try:
+                self._write_frame(*job)
+            except Exception as e:
+                self._error = e
+
+    def _raise_background_error(self):
+        if self._error is not None:
+            raise RuntimeError("Writing a sheet failed") from self._error
+
+    def _write_frame(self, sheet_name, df, index, number_formats):
+        if isinstance(df, pd.Series):
+            df = df.to_frame()
+        if index:
+            df = df.reset_index()
+        worksheet = self.workbook.create_sheet(sheet_name)
+
+        header = []
+        for column in df.columns:
+            if isinstance(column, tuple):
+                column = " ".join(str(part) for part in column if part != "")
+            cell = WriteOnlyCell(worksheet, value=str(column))
+            cell.font = self._header_font
+            header.append(cell)
+        worksheet.append(header)
+
+        formats = [
+            _column_number_format(df, position, number_formats)
+            for position in range(len(df.columns))
+        ]
+        for start in range(0, len(df), self.chunk_size):
+            chunk = df.iloc[start : start + self.chunk_size]
+            # Build cells only for formatted columns, plain values are cheaper
+            for row in chunk.astype(object).itertuples(index=False, name=None):
+                values = []
+                for value, number_format in zip(row, formats):
+                    value = _excel_value(value)
+                    if number_format is not None and value is not None:
+                        cell = WriteOnlyCell(worksheet, value=value)
+                        cell.number_format = number_format
+                        value = cell
+                    values.append(value)
+                worksheet.append(values)
+
+    def _unique_sheet_name(self, sheet_name):
+        base = INVALID_SHEET_NAME_CHARACTERS.sub("_", sheet_name)[
+            :MAX_SHEET_NAME_LENGTH
+        ]
+        candidate = base or "Sheet"
+        counter = 1
+        while candidate.lower() in self.sheet_names:
+            suffix = f" ({counter})"
+            candidate = base[: MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+            counter += 1
+        self.sheet_names.add(candidate.lower())
+        return candidate
+
+
+def _column_number_format(df, position, number_formats):
+    """Returns the Excel number format of a column, or None for the default."""
+    column = df.columns[position]
+    if number_formats and column in number_formats:
+        return number_formats[column]
+    dtype = df.dtypes.iloc[position]
+    if pd.api.types.is_bool_dtype(dtype):
+        return None
+    if pd.api.types.is_integer_dtype(dtype):
+        return DEFAULT_NUMBER_FORMATS["integer"]
+    if pd.api.types.is_float_dtype(dtype):
+        return DEFAULT_NUMBER_FORMATS["float"]
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return DEFAULT_NUMBER_FORMATS["datetime"]
+    return None
+
+
+def _excel_value(value):
+    """Converts a pandas value to one openpyxl can write."""
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        # Excel has no time zones
+        return value.tz_localize(None) if value.tz else value
+    if isinstance(value, pd.Period):
+        return str(value)
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, "item"):
+        # NumPy scalars
+        return value.item()
+    return value
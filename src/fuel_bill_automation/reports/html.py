@@ -0,0 +1,297 @@
+"""
+html.py
+
+A module to render HTML reports: the error report emails and summaries with tables and
+charts. Templates are compiled once into literal and field parts, and the document is
+written piece by piece to a file object, so output grows linearly with the report and
+large tables never exist as one string. DataFrames are rendered a chunk of rows at a
+time, chart images are inlined, and identical errors are shown once with their count.
+"""
+
+import base64
+import html
+import io
+import mimetypes
+import os
+import re
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Rows of a DataFrame converted to HTML at once
+TABLE_CHUNK_SIZE = 5_000
+# Bytes read at once when inlining an image; a multiple of 3 so base64 has no padding
+IMAGE_READ_SIZE = 3 * 64 * 1024
+
+_FIELD = re.compile(r"\{\{\s*(\w+)(\s*\|\s*raw)?\s*\}\}")
+
+DEFAULT_STYLE = """
+        body {
+            font-family: Arial, sans-serif;
+            margin: 20px;
+        }
+        h1 {
+            color: #d9534f;
+        }
+        pre {
+            background-color: #f9f9f9;
+            border: 1px solid #e1e1e8;
+            padding: 10px;
+            overflow-x: auto;
+        }
+        .error {
+            margin-bottom: 20px;
+        }
+        table {
+            border-collapse: collapse;
+            margin-bottom: 20px;
+        }
+        th, td {
+            border: 1px solid #ddd;
+            padding: 4px 8px;
+        }
+        th {
+            background-color: #f2f2f2;
+        }
+        td.number {
+            text-align: right;
+        }
+"""
+
+
+class HtmlTemplate:
+    def __init__(self, source: str):
+        """
+        Compile a template once. Fields are written {{ name }}, escaped when rendered,
+        or {{ name | raw }} for HTML that is inserted as is.
+
+        :param source: Template text.
+        """
+        self.parts: List[Tuple[str, Optional[str], bool]] = []
+        position = 0
+        for match in _FIELD.finditer(source):
+            self.parts.append(
+                (source[position : match.start()], match.group(1), bool(match.group(2)))
+            )
+            position = match.end()
+        self.parts.append((source[position:], None, False))
+
+    def render_to(self, write: Callable[[str], object], **values):
+        """Writes the template with values through write, e.g. a file's write method."""
+        for literal, name, raw in self.parts:
+            write(literal)
+            if name is not None:
+                value = values[name]
+                write(value if raw else html.escape(str(value)))
+
+    def render(self, **values) -> str:
+        pieces = []
+        self.render_to(pieces.append, **values)
+        return "".join(pieces)
+
+
+DOCUMENT_START = HtmlTemplate("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{{ title }}</title>
+    <style>{{ style | raw }}    </style>
+</head>
+<body>
+    <h1>{{ title }}</h1>
+""")
+DOCUMENT_END = HtmlTemplate("""
+</body>
+</html>
+""")
+HEADING = HtmlTemplate("""    <h{{ level }}>{{ text }}</h{{ level }}>\n""")
+PARAGRAPH = HtmlTemplate("""    <p>{{ text }}</p>\n""")
+ERROR = HtmlTemplate("""
+    <div class="error">
+        <h2>Error {{ number }}{{ repeated }}</h2>
+        <pre>{{ text }}</pre>
+    </div>
+""")
+TABLE_START = HtmlTemplate(
+    """    <table>\n        <thead><tr>{{ header | raw }}</tr></thead>\n        <tbody>\n"""
+)
+TABLE_END = HtmlTemplate("""        </tbody>\n    </table>\n{{ note | raw }}""")
+IMAGE = HtmlTemplate("""    <p><img src="{{ source | raw }}" alt="{{ alt }}"></p>\n""")
+
+
+class HtmlReportWriter:
+    def __init__(self, file: TextIO, title: str = "Report", style: str = DEFAULT_STYLE):
+        """
+        Stream an HTML document to a text file object; the head is written right away.
+
+        :param file: Text file object, e.g. an open file or io.StringIO.
+        :param title: Title of the document, also shown as its heading.
+        :param style: (Optional) CSS of the document.
+        """
+        self.file = file
+        self.write = file.write
+        # Content-ID -> image path of images referenced with cid: URLs
+        self.inline_images: Dict[str, str] = {}
+        self._closed = False
+        DOCUMENT_START.render_to(self.write, title=title, style=style)
+
+    def close(self):
+        """Writes the end of the document; the file object is left open."""
+        if not self._closed:
+            DOCUMENT_END.render_to(self.write)
+            self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def heading(self, text: str, level: int = 2):
+        HEADING.render_to(self.write, level=int(level), text=text)
+
+    def paragraph(self, text: str):
+        PARAGRAPH.render_to(self.write, text=text)
+
+    def errors(self, errors: Iterable[str], collapse: bool = True):
+        """
+        Write error messages or tracebacks, numbered in order of first appearance.
+
+        :param errors: Error messages or traceback strings.
+        :param collapse: Show identical errors once, with the number of times they occurred.
+        """
+        if collapse:
+            counts = {}
+            for error in errors:
+                counts[error] = counts.get(error, 0) + 1
+            entries = counts.items()
+        else:
+            entries = ((error, 1) for error in errors)
+        for number, (error, count) in enumerate(entries, 1):
+            repeated = f" (occurred {count} times)" if count > 1 else ""
+            ERROR.render_to(self.write, number=number, repeated=repeated, text=error)
+
+    def table(
+        self,
+        df: "pd.DataFrame",
+        index: bool = False,
+        float_format: str = "{:,.2f}",
+        chunk_size: int = TABLE_CHUNK_SIZE,
+        max_rows: Optional[int] = None,
+    ):
+        """
+        Write a DataFrame as an HTML table, converting chunk_size rows at a time.
+
+        :param df: The DataFrame.
+        :param index: Include the index as the first column.
+        :param float_format: Format of float values; missing values are left blank.
+        :param chunk_size: Rows converted and written at once.
+        :param max_rows: (Optional) Write at most this many rows, with a note of how many
+                         were left out, to keep emails small.
+        """
+        import pandas as pd
+
+        if index:
+            df = df.reset_index()
+        shown = df if max_rows is None else df.iloc[:max_rows]
+        header = "".join(
+            f"<th>{html.escape(str(column))}</th>" for column in df.columns
+        )
+        TABLE_START.render_to(self.write, header=header)
+
+        numeric = [pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes]
+        for start in range(0, len(shown), chunk_size):
+            chunk = shown.iloc[start : start + chunk_size]
+            cells = [
+                _html_cells(chunk.iloc[:, position], float_format, numeric[position])
+                for position in range(chunk.shape[1])
+            ]
+            rows = ["<tr>" + "".join(row) + "</tr>\n" for row in zip(*cells)]
+            self.write("".join(rows))
+
+        note = ""
+        if len(shown) < len(df):
+            note = PARAGRAPH.render(
+                text=f"{len(df) - len(shown):,} more rows not shown."
+            )
+        TABLE_END.render_to(self.write, note=note)
+
+    def image(self, path: str, alt: str = "", content_id: Optional[str] = None):
+        """
+        Write an image. Without content_id it is inlined as a base64 data URL, read in
+        blocks; with content_id it is referenced as cid:content_id and added to
+        inline_images for the email to attach.
+
+        :param path: Path of the image file.
+        :param alt: (Optional) Alternative text.
+        :param content_id: (Optional) Content-ID of an image attached to the email.
+        """
+        if content_id is not None:
+            self.inline_images[content_id] = path
+            IMAGE.render_to(self.write, source=f"cid:{content_id}", alt=alt)
+            return
+        content_type = mimetypes.guess_type(path)[0] or "image/png"
+        self.write(
+            f'    <p><img alt="{html.escape(alt)}" src="data:{content_type};base64,'
+        )
+        with open(path, "rb") as file:
+            while block := file.read(IMAGE_READ_SIZE):
+                self.write(base64.b64encode(block).decode("ascii"))
+        self.write('"></p>\n')
+
+    def charts(self, generator, specs, max_workers=None, as_cid: bool = False):
+        """
+        Render charts with a ChartGenerator and write them as images.
+
+        :param generator: reports.charts.ChartGenerator holding the data.
+        :param specs: List of ChartSpec.
+        :param max_workers: (Optional) Worker processes of ChartGenerator.render_batch.
+        :param as_cid: Reference the images by Content-ID instead of inlining them.
+        """
+        for spec, path in zip(specs, generator.render_batch(specs, max_workers)):
+            alt = spec.options.get("title") or spec.kind.replace("_", " ")
+            content_id = os.path.splitext(os.path.basename(path))[0] if as_cid else None
+            self.image(path, alt, content_id)
+
+
+def render_report(title: str, build: Callable[[HtmlReportWriter], None]) -> str:
+    """
+    Render a whole document to a string.
+
+    :param title: Title of the document.
+    :param build: Called with the HtmlReportWriter to write the body.
+    :return: The HTML document.
+    """
+    buffer = io.StringIO()
+    with HtmlReportWriter(buffer, title) as writer:
+        build(writer)
+    return buffer.getvalue()
+
+
+def _html_cells(values: "pd.Series", float_format: str, numeric: bool) -> List[str]:
+    """Converts one column of a chunk to escaped <td> cells."""
+    import pandas as pd
+
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_float_dtype(values.dtype):
+        text = [
+            float_format.format(value)
+            for value in values.to_numpy(dtype=float, na_value=float("nan"))
+        ]
+    else:
+        text = [html.escape(str(value)) for value in values.to_numpy(dtype=object)]
+    opening = '<td class="number">' if numeric else "<td>"
+    return [
+        "<td></td>" if is_missing else f"{opening}{value}</td>"
+        for value, is_missing in zip(text, missing)
+    ]
@@ -0,0 +1,496 @@
+"""
+core.py
+
+The shared asyncio core of the statement scrapers: an HTTP client with a keep-alive
+connection pool and a concurrency limit per host, retries with backoff, conditional
+requests with ETag and Last-Modified, and streaming downloads to disk. Scrapers yield
+their records in batches and run_scrapers runs several of them at the same time.
+
+Requests go through the standard library's http.client on worker threads, so the
+package needs no extra HTTP dependency; asyncio only schedules them.
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+from fuel_bill_automation.configs.constants import SCRAPER_VALIDATORS_FILE
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+USER_AGENT = "fuel-bill-automation"
+
+
+class HttpError(Exception):
+    def __init__(self, url, status, reason=""):
+        super().__init__(f"GET {url} returned {status} {reason}".rstrip())
+        self.url = url
+        self.status = status
+
+
+@dataclass
+class HttpResponse:
+    """A fully read response. not_modified is True for a 304 to a conditional request."""
+
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes = b""
+    not_modified: bool = False
+
+    def json(self):
+        return json.loads(self.body)
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of AsyncHttpClient.download."""
+
+    url: str
+    file_path: str
+    status: int
+    bytes_written: int = 0
+    not_modified: bool = False
+
+
+class ValidatorStore:
+    def __init__(self, file_path: Optional[str] = SCRAPER_VALIDATORS_FILE):
+        """
+        Remembers the ETag and Last-Modified of every fetched URL in a JSON file, for
+        conditional requests on the next run.
+
+        :param file_path: (Optional) Path of the JSON file; None keeps them in memory only.
+        """
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self.validators = {}
+        if file_path is not None and os.path.exists(file_path):
+            with open(file_path, encoding="utf-8") as file:
+                self.validators = json.load(file)
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        validators = self.validators.get(url, {})
+        headers = {}
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last_modified" in validators:
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def update(self, url: str, headers: Dict[str, str]):
+        validators = {}
+        if "etag" in headers:
+            validators["etag"] = headers["etag"]
+        if "last-modified" in headers:
+            validators["last_modified"] = headers["last-modified"]
+        with self._lock:
+            if validators:
+                self.validators[url] = validators
+            else:
+                self.validators.pop(url, None)
+
+    def save(self):
+        if self.file_path is None:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            temp_path = f"{self.file_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(self.validators, file, indent=2)
+            os.replace(temp_path, self.file_path)
+
+
+class _HostPool:
+    """Idle keep-alive connections of one host, and the semaphore limiting its requests."""
+
+    def __init__(self, scheme, host, port, limit, timeout):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self) -> http.client.HTTPConnection:
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        connection_class = (
+            http.client.HTTPSConnection
+            if self.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def release(self, connection: http.client.HTTPConnection):
+        with self.lock:
+            self.idle.append(connection)
+
+    def close(self):
+        with self.lock:
+            for connection in self.idle:
+                connection.close()
+            self.idle.clear()
+
+
+class AsyncHttpClient:
+    def __init__(
+        self,
+        per_host_limit: int = 4,
+        timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        headers: Optional[Dict[str, str]] = None,
+        validators: Optional[ValidatorStore] = None,
+    ):
+        """
+        An asyncio HTTP client reusing keep-alive connections per host.
+
+        :param per_host_limit: Number of requests to one host at once.
+        :param timeout: Socket timeout in seconds.
+        :param retries: Number of retries after a connection error or a 429/5xx status.
+        :param backoff: Delay before the first retry in seconds, doubled for every retry.
+        :param max_backoff: Longest delay between retries in seconds.
+        :param headers: (Optional) Headers sent with every request, e.g. authorization.
+        :param validators: (Optional) ValidatorStore for conditional requests; defaults
+                           to one kept in memory.
+        """
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        self.validators = validators or ValidatorStore(None)
+        self._pools = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Closes the idle connections and saves the validators."""
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
+        await asyncio.to_thread(self.validators.save)
+
+    async def get(
+        self, url: str, headers: Optional[Dict[str, str]] = None, conditional=False
+    ) -> HttpResponse:
+        """
+        GET a URL and read the whole body, e.g. a JSON listing.
+
+        :param url: Absolute URL.
+        :param headers: (Optional) Extra request headers.
+        :param conditional: Send the URL's stored validators; a 304 comes back with
+                            not_modified set and an empty body.
+        :return: HttpResponse
+        """
+
+        def read(response):
+            return response.read()
+
+        status, response_headers, body = await self._request(
+            url, headers, conditional, read
+        )
+        return HttpResponse(url, status, response_headers, body or b"", status == 304)
+
+    async def download(
+        self,
+        url: str,
+        file_path: str,
+        headers: Optional[Dict[str, str]] = None,
+        conditional: bool = True,
+    ) -> DownloadResult:
+        """
+        Stream a URL to a file in chunks. The file is written under a temporary name and
+        moved into place when complete, so an interrupted download leaves no partial file.
+
+        :param url: Absolute URL.
+        :param file_path: Path of the file to write.
+        :param headers: (Optional) Extra request headers.
+        :param conditional: Skip the download when the server reports the stored ETag or
+                            Last-Modified unchanged and the file still exists.
+        :return: DownloadResult
+        """
+        conditional = conditional and os.path.exists(file_path)
+        temp_path = f"{file_path}.part"
+
+        def stream(response):
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            written = 0
+            try:
+                with open(temp_path, "wb") as file:
+                    while chunk := response.read(DOWNLOAD_CHUNK_SIZE):
+                        file.write(chunk)
+                        written += len(chunk)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            os.replace(temp_path, file_path)
+            return written
+
+        status, _, written = await self._request(url, headers, conditional, stream)
+        return DownloadResult(url, file_path, status, written or 0, status == 304)
+
+    async def _request(self, url, headers, conditional, handle_body):
+        """
+        Sends a GET with retries; handle_body runs on the worker thread with the
+        response of a 2xx status. Returns (status, lower-cased headers, handle_body result).
+        """
+        parts = urlsplit(url)
+        pool_key = (parts.scheme, parts.hostname, parts.port)
+        pool = self._pools.get(pool_key)
+        if pool is None:
+            pool = self._pools[pool_key] = _HostPool(
+                parts.scheme,
+                parts.hostname,
+                parts.port,
+                self.per_host_limit,
+                self.timeout,
+            )
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        request_headers = {**self.headers, **(headers or {})}
+        if conditional:
+            request_headers.update(self.validators.request_headers(url))
+
+        attempt = 0
+        while True:
+            async with pool.semaphore:
+                try:
+                    status, response_headers, result = await asyncio.to_thread(
+                        self._send, pool, target, request_headers, handle_body
+                    )
+                    error = None
+                except (OSError, http.client.HTTPException) as e:
+                    status, response_headers, error = None, {}, e
+
+            if status is not None and status not in RETRY_STATUSES:
+                break
+            if attempt >= self.retries:
+                if error is not None:
+                    raise error
+                break
+            await asyncio.sleep(self._retry_delay(attempt, response_headers))
+            attempt += 1
+
+        if status == 304:
+            return status, response_headers, None
+        if not 200 <= status < 300:
+            raise HttpError(url, status)
+        self.validators.update(url, response_headers)
+        return status, response_headers, result
+
+    def _send(self, pool, target, headers, handle_body):
+        """Worker thread: one request on a pooled connection."""
+        connection = pool.acquire()
+        try:
+            connection.request("GET", target, headers=headers)
+            response = connection.getresponse()
+            status = response.status
+            response_headers = {
+                name.lower(): value for name, value in response.getheaders()
+            }
+            if 200 <= status < 300:
+                result = handle_body(response)
+            else:
+                result = None
+            # The body must be consumed before the connection can be reused
+            response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            pool.release(connection)
+        return status, response_headers, result
+
+    def _retry_delay(self, attempt, headers):
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    return min(max(delay, 0.0), self.max_backoff)
+                except (TypeError, ValueError):
+                    pass
+        delay = min(self.backoff * 2**attempt, self.max_backoff)
+        # Jitter keeps concurrent retries from hitting the host together
+        return delay * random.uniform(0.5, 1.0)
+
+
+@dataclass
+class ScrapeResult:
+    """Records and errors of one scraper run."""
+
+    scraper: str
+    records: List[dict] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    batches: int = 0
+
+
+class Scraper:
+    """
+    Base class of the statement scrapers. Subclasses implement iter_batches, yielding
+    lists of record dictionaries as soon as each page or download is done.
+    """
+
+    name = "scraper"
+
+    def __init__(self, client: AsyncHttpClient, base_url: str, output_directory: str):
+        """
+        :param client: Shared AsyncHttpClient.
+        :param base_url: Root URL of the portal.
+        :param output_directory: Folder the downloaded files are saved in.
+        """
+        self.client = client
+        self.base_url = base_url.rstrip("/") + "/"
+        self.output_directory = output_directory
+
+    def url(self, path: str) -> str:
+        return urljoin(self.base_url, path.lstrip("/"))
+
+    def server_url(self, url: str) -> str:
+        """
+        Resolve a URL from a server response, e.g. a file link or a next page link,
+        against base_url.
+
+        :raises ValueError: If it points at another scheme, host or port than base_url,
+                            where the client's authorization headers must not be sent.
+        """
+        parts = urlsplit(url)
+        # Relative links resolve like url(), under base_url's path
+        resolved = urljoin(self.base_url, url) if parts.netloc else self.url(url)
+        if _origin(resolved) != _origin(self.base_url):
+            raise ValueError(f"URL from the server leaves {self.base_url}: {url!r}")
+        return resolved
+
+    def iter_batches(self) -> AsyncIterator[List[dict]]:
+        raise NotImplementedError
+
+    async def run(
+        self, on_batch: Optional[Callable[[str, List[dict]], None]] = None
+    ) -> ScrapeResult:
+        """
+        Collect every batch of the scraper. A failure stops this scraper only and is
+        recorded in the result.
+
+        :param on_batch: (Optional) Called with the scraper name and each batch as it arrives.
+        :return: ScrapeResult
+        """
+        result = ScrapeResult(self.name)
+        try:
+            async for batch in self.iter_batches():
+                result.batches += 1
+                result.records.extend(batch)
+                if on_batch is not None:
+                    on_batch(self.name, batch)
+        except (HttpError, OSError, http.client.HTTPException, ValueError) as e:
+            result.errors.append(f"{self.name}: {e}")
+        return result
+
+    async def download_batches(
+        self, files: List[dict], batch_size: int = 10
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Download the files of a listing concurrently, within the client's per-host limit,
+        and yield them in batches as they finish.
+
+        :param files: Dictionaries with 'url' and 'file_name'; they are yielded with
+                      'file_path', 'bytes' and 'not_modified' added.
+        :param batch_size: Number of finished downloads per batch.
+        :raises ValueError: Before downloading anything, if a file name is not a plain
+                            name inside output_directory, e.g. '../x' or an absolute path,
+                            or a URL is on another host than base_url.
+        """
+        file_paths = [
+            safe_file_path(self.output_directory, record["file_name"])
+            for record in files
+        ]
+        for record in files:
+            self.server_url(record["url"])
+
+        async def download(record, file_path):
+            result = await self.client.download(record["url"], file_path)
+            return {
+                **record,
+                "file_path": file_path,
+                "bytes": result.bytes_written,
+                "not_modified": result.not_modified,
+            }
+
+        tasks = [
+            asyncio.create_task(download(record, file_path))
+            for record, file_path in zip(files, file_paths)
+        ]
+        batch = []
+        try:
+            for finished in asyncio.as_completed(tasks):
+                batch.append(await finished)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        finally:
+            for task in tasks:
+                task.cancel()
+        if batch:
+            yield batch
+
+
+def safe_file_path(directory: str, file_name: str) -> str:
+    """
+    Path of a file named by a server inside directory.
+
+    :param directory: Folder the file must be saved in.
+    :param file_name: File name from a listing.
+    :raises ValueError: If file_name has a directory part or is empty, '.' or '..'.
+    """
+    name = os.path.basename(file_name or "")
+    if name != file_name or name in ("", ".", ".."):
+        raise ValueError(f"Unsafe file name from the server: {file_name!r}")
+    file_path = os.path.join(directory, name)
+    root = os.path.realpath(directory)
+    if os.path.dirname(os.path.realpath(file_path)) != root:
+        raise ValueError(f"Unsafe file name from the server: {file_name!r}")
+    return file_path
+
+
+def _origin(url: str):
+    """(scheme, host, port) of a URL, with the scheme's default port filled in."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    port = parts.port or {"http": 80, "https": 443}.get(scheme)
+    return scheme, (parts.hostname or "").lower(), port
+
+
+async def run_scrapers(
+    scrapers: List[Scraper],
+    on_batch: Optional[Callable[[str, List[dict]], None]] = None,
+) -> Dict[str, ScrapeResult]:
+    """
+    Run several scrapers at the same time.
+
+    :param scrapers: List of Scraper, usually sharing one AsyncHttpClient.
+    :param on_batch: (Optional) Called with the scraper name and each batch as it arrives.
+    :return: Dictionary of scraper name to ScrapeResult
+    """
+    results = await asyncio.gather(*(scraper.run(on_batch) for scraper in scrapers))
+    return {result.scraper: result for result in results}
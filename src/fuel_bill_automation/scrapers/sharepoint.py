@@ -0,0 +1,73 @@
+"""
+sharepoint.py
+
+A scraper of the files of a SharePoint document library folder through the SharePoint
+REST API.
+"""
+
+from typing import AsyncIterator, List, Optional
+from urllib.parse import quote
+
+from fuel_bill_automation.scrapers.core import AsyncHttpClient, Scraper
+
+ODATA_HEADERS = {"Accept": "application/json;odata=nometadata"}
+
+
+class SharePointFolderScraper(Scraper):
+    name = "sharepoint"
+
+    def __init__(
+        self,
+        client: AsyncHttpClient,
+        base_url: str,
+        output_directory: str,
+        folder: str,
+        name_filter: Optional[str] = None,
+        batch_size: int = 10,
+    ):
+        """
+        Download the files of a folder, one listing page at a time; unchanged files are
+        not downloaded again.
+
+        :param client: Shared AsyncHttpClient, carrying the site's authorization headers.
+        :param base_url: URL of the SharePoint site.
+        :param output_directory: Folder the files are saved in.
+        :param folder: Server-relative path of the folder, e.g. '/sites/Fleet/Shared Documents/2024'.
+        :param name_filter: (Optional) Text the file names must contain.
+        :param batch_size: Number of finished downloads per batch.
+        """
+        super().__init__(client, base_url, output_directory)
+        self.folder = folder
+        self.name_filter = name_filter
+        self.batch_size = batch_size
+
+    async def iter_batches(self) -> AsyncIterator[List[dict]]:
+        url = self.url(
+            f"_api/web/GetFolderByServerRelativeUrl('{_odata_path(self.folder)}')/Files"
+            "?$select=Name,ServerRelativeUrl,TimeLastModified,Length"
+        )
+        while url:
+            response = await self.client.get(url, ODATA_HEADERS)
+            listing = response.json()
+            files = [
+                {
+                    "file_name": item["Name"],
+                    "server_relative_url": item["ServerRelativeUrl"],
+                    "modified": item.get("TimeLastModified"),
+                    "url": self.url(
+                        "_api/web/GetFileByServerRelativeUrl"
+                        f"('{_odata_path(item['ServerRelativeUrl'])}')/$value"
+                    ),
+                }
+                for item in listing.get("value", [])
+                if self.name_filter is None or self.name_filter in item["Name"]
+            ]
+            async for batch in self.download_batches(files, self.batch_size):
+                yield batch
+            next_link = listing.get("odata.nextLink")
+            url = self.server_url(next_link) if next_link else None
+
+
+def _odata_path(path: str) -> str:
+    """Quotes a path for an OData string literal: single quotes doubled, then URL-encoded."""
+    return quote(path.replace("'", "''"), safe="/")
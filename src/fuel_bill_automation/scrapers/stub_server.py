@@ -0,0 +1,242 @@
+"""
+stub_server.py
+
+A local HTTP server standing in for the WEX, Trust and SharePoint endpoints used by the
+scrapers, so they can run and be tested without the real portals. It speaks HTTP/1.1
+with keep-alive, answers conditional requests with 304, and can be told to fail or
+slow down.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+_SHAREPOINT_FOLDER = re.compile(
+    r"^/_api/web/GetFolderByServerRelativeUrl\('(.*)'\)/Files$"
+)
+_SHAREPOINT_FILE = re.compile(
+    r"^/_api/web/GetFileByServerRelativeUrl\('(.*)'\)/\$value$"
+)
+
+
+class StubFile:
+    def __init__(self, content: bytes, modified: float):
+        """
+        :param content: Bytes served for the file.
+        :param modified: Modification time as a POSIX timestamp, sent as Last-Modified.
+        """
+        self.content = content
+        self.modified = modified
+        self.etag = '"' + hashlib.sha1(content).hexdigest() + '"'
+
+
+class StubPortalServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Serve the stub portals on a background thread; port 0 picks a free port.
+
+        Load data with add_transactions, add_statement and add_sharepoint_file, then
+        point the scrapers at base_url. requests counts the requests per path and
+        connections the TCP connections accepted.
+        """
+        self.transactions: List[dict] = []
+        self.statements: Dict[str, List[str]] = {}
+        self.files: Dict[str, StubFile] = {}
+        self.sharepoint_folders: Dict[str, List[str]] = {}
+        self.sharepoint_page_size = 100
+        self.failures: Dict[str, List[int]] = {}
+        self.delay = 0.0
+        self.requests: Dict[str, int] = {}
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(_StubHandler):
+            server_stub = stub
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def add_transactions(self, records: List[dict]):
+        """Adds WEX transactions; each needs a 'transaction_date' as 'YYYY-MM-DD...'."""
+        self.transactions.extend(records)
+
+    def add_statement(self, period: str, name: str, content: bytes, modified: float):
+        """Adds a Trust statement for a 'YYYY-MM' period."""
+        self.statements.setdefault(period, []).append(name)
+        self.files[f"/statements/files/{name}"] = StubFile(content, modified)
+
+    def add_sharepoint_file(
+        self, folder: str, name: str, content: bytes, modified: float
+    ):
+        """Adds a file to a SharePoint folder, e.g. '/sites/Fleet/Shared Documents'."""
+        server_relative_url = f"{folder.rstrip('/')}/{name}"
+        self.sharepoint_folders.setdefault(folder.rstrip("/"), []).append(name)
+        self.files[server_relative_url] = StubFile(content, modified)
+
+    def fail(self, path: str, statuses: List[int]):
+        """Answers the next requests of a path with the given statuses, e.g. [503, 503]."""
+        with self._lock:
+            self.failures.setdefault(path, []).extend(statuses)
+
+    def _count(self, path: str) -> Optional[int]:
+        """Counts a request and returns the injected failure status, if any."""
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            pending = self.failures.get(path)
+            return pending.pop(0) if pending else None
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_stub: StubPortalServer
+
+    def setup(self):
+        super().setup()
+        with self.server_stub._lock:
+            self.server_stub.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server_stub
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+
+        failure = stub._count(path)
+        if stub.delay:
+            threading.Event().wait(stub.delay)
+        if failure is not None:
+            self._send(failure, b"", {"Retry-After": "0"})
+            return
+
+        if path == "/transactions":
+            self._transactions(query)
+        elif path == "/statements":
+            names = stub.statements.get(query.get("period"), [])
+            listing = [
+                {"id": index, "name": name, "url": f"statements/files/{name}"}
+                for index, name in enumerate(names, start=1)
+            ]
+            self._send_json({"statements": listing})
+        elif match := _SHAREPOINT_FOLDER.match(path):
+            self._sharepoint_folder(match.group(1).replace("''", "'"), query)
+        elif match := _SHAREPOINT_FILE.match(path):
+            self._file(match.group(1).replace("''", "'"))
+        elif path.startswith("/statements/files/"):
+            self._file(path)
+        else:
+            self._send(404, b"")
+
+    def _transactions(self, query):
+        start, end = query.get("from", ""), query.get("to", "9999")
+        page = int(query.get("page", 1))
+        page_size = int(query.get("page_size", 100))
+        selected = [
+            record
+            for record in self.server_stub.transactions
+            if start <= record["transaction_date"][:10] <= end
+        ]
+        rows = selected[(page - 1) * page_size : page * page_size]
+        next_page = page + 1 if page * page_size < len(selected) else None
+        self._send_json({"transactions": rows, "next_page": next_page})
+
+    def _sharepoint_folder(self, folder, query):
+        stub = self.server_stub
+        names = stub.sharepoint_folders.get(folder.rstrip("/"))
+        if names is None:
+            self._send(404, b"")
+            return
+        skip = int(query.get("$skiptoken", 0))
+        page = names[skip : skip + stub.sharepoint_page_size]
+        items = []
+        for name in page:
+            server_relative_url = f"{folder.rstrip('/')}/{name}"
+            stub_file = stub.files[server_relative_url]
+            items.append(
+                {
+                    "Name": name,
+                    "ServerRelativeUrl": server_relative_url,
+                    "TimeLastModified": formatdate(stub_file.modified, usegmt=True),
+                    "Length": str(len(stub_file.content)),
+                }
+            )
+        listing = {"value": items}
+        if skip + len(page) < len(names):
+            listing["odata.nextLink"] = (
+                f"{stub.base_url}{self.path.lstrip('/').split('&$skiptoken')[0]}"
+                f"&$skiptoken={skip + len(page)}"
+            )
+        self._send_json(listing)
+
+    def _file(self, key):
+        stub_file = self.server_stub.files.get(key)
+        if stub_file is None:
+            self._send(404, b"")
+            return
+        headers = {
+            "ETag": stub_file.etag,
+            "Last-Modified": formatdate(stub_file.modified, usegmt=True),
+            "Content-Type": "application/octet-stream",
+        }
+        if self._not_modified(stub_file):
+            self._send(304, b"", headers)
+        else:
+            self._send(200, stub_file.content, headers)
+
+    def _not_modified(self, stub_file) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return stub_file.etag in (tag.strip() for tag in if_none_match.split(","))
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(stub_file.modified) <= since
+        return False
+
+    def _send_json(self, payload):
+        self._send(
+            200, json.dumps(payload).encode(), {"Content-Type": "application/json"}
+        )
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
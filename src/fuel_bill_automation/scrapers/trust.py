@@ -0,0 +1,52 @@
+"""
+trust.py
+
+A scraper of the month's statement files from the Trust portal.
+"""
+
+from typing import AsyncIterator, List
+
+from fuel_bill_automation.scrapers.core import AsyncHttpClient, Scraper
+
+
+class TrustStatementScraper(Scraper):
+    name = "trust"
+
+    def __init__(
+        self,
+        client: AsyncHttpClient,
+        base_url: str,
+        output_directory: str,
+        year: int,
+        month: int,
+        batch_size: int = 10,
+    ):
+        """
+        Download the statements of a month; unchanged statements are not downloaded again.
+
+        :param client: Shared AsyncHttpClient, carrying the portal's authorization headers.
+        :param base_url: Root URL of the Trust API.
+        :param output_directory: Folder the statements are saved in.
+        :param year: Year of the statements.
+        :param month: Month of the statements.
+        :param batch_size: Number of finished downloads per batch.
+        """
+        super().__init__(client, base_url, output_directory)
+        self.year = year
+        self.month = month
+        self.batch_size = batch_size
+
+    async def iter_batches(self) -> AsyncIterator[List[dict]]:
+        response = await self.client.get(
+            self.url(f"statements?period={self.year}-{self.month:02d}")
+        )
+        files = [
+            {
+                "id": statement["id"],
+                "file_name": statement["name"],
+                "url": self.server_url(statement["url"]),
+            }
+            for statement in response.json()["statements"]
+        ]
+        async for batch in self.download_batches(files, self.batch_size):
+            yield batch
@@ -0,0 +1,78 @@
+"""
+wex.py
+
+A scraper of the month's fuel card transactions from the WEX portal's paged
+transaction listing.
+"""
+
+import calendar
+from typing import TYPE_CHECKING, AsyncIterator, List
+
+from fuel_bill_automation.scrapers.core import AsyncHttpClient, Scraper
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# WEX transaction field -> fuel charges sheet column
+TRANSACTION_COLUMNS = {
+    "transaction_date": "Transaction Date",
+    "vehicle": "Vehicle",
+    "department": "Department",
+    "product": "Product",
+    "units": "Units",
+    "unit_cost": "Unit Cost",
+    "total_fuel_cost": "Total Fuel Cost",
+    "card_number": "Card Number",
+}
+
+
+class WexTransactionScraper(Scraper):
+    name = "wex"
+
+    def __init__(
+        self,
+        client: AsyncHttpClient,
+        base_url: str,
+        output_directory: str,
+        year: int,
+        month: int,
+        page_size: int = 500,
+    ):
+        """
+        Pull a month of fuel card transactions, one batch per listing page.
+
+        :param client: Shared AsyncHttpClient, carrying the portal's authorization headers.
+        :param base_url: Root URL of the WEX API.
+        :param output_directory: Folder for downloads; transactions are only yielded.
+        :param year: Year of the transactions.
+        :param month: Month of the transactions.
+        :param page_size: Transactions per page.
+        """
+        super().__init__(client, base_url, output_directory)
+        self.year = year
+        self.month = month
+        self.page_size = page_size
+
+    async def iter_batches(self) -> AsyncIterator[List[dict]]:
+        last_day = calendar.monthrange(self.year, self.month)[1]
+        page = 1
+        while page is not None:
+            response = await self.client.get(
+                self.url(
+                    f"transactions?from={self.year}-{self.month:02d}-01"
+                    f"&to={self.year}-{self.month:02d}-{last_day:02d}"
+                    f"&page={page}&page_size={self.page_size}"
+                )
+            )
+            listing = response.json()
+            if listing["transactions"]:
+                yield listing["transactions"]
+            page = listing.get("next_page")
+
+
+def transactions_frame(records: List[dict]) -> "pd.DataFrame":
+    """Builds a DataFrame with the fuel charges sheet columns from WEX transaction records."""
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(records, columns=list(TRANSACTION_COLUMNS))
+    return df.rename(columns=TRANSACTION_COLUMNS)
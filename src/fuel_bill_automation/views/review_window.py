@@ -0,0 +1,135 @@
+"""
+review_window.py
+
+A window for reviewing a DataFrame in place of exporting it to CSV and opening it in
+Excel: a virtualized table that sorts on a header click, with a filter box over all
+columns or a chosen one.
+"""
+
+import sys
+from typing import Optional
+
+import pandas as pd
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QApplication,
+    QComboBox,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QMainWindow,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
+
+from fuel_bill_automation.views.table_model import DataFrameTableModel
+
+# Milliseconds after the last keystroke before the filter is applied
+FILTER_DELAY_MS = 250
+ROW_HEIGHT = 22
+ALL_COLUMNS = "All columns"
+
+
+class ReviewWindow(QMainWindow):
+    def __init__(self, df: pd.DataFrame, title: str = "Review", parent=None):
+        """
+        Show a DataFrame for review.
+
+        :param df: The DataFrame, e.g. the bad rows of check_job_number.
+        :param title: Window title.
+        :param parent: (Optional) Parent widget.
+        """
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.model = DataFrameTableModel(df, parent=self)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter rows")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.column_box = QComboBox()
+        self.column_box.addItems([ALL_COLUMNS, *self.model.column_names])
+        self.status_label = QLabel()
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        self.table.setWordWrap(False)
+        # Fixed row heights and interactive column widths, so Qt never measures
+        # every row's contents
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(ROW_HEIGHT)
+        horizontal_header = self.table.horizontalHeader()
+        horizontal_header.setSectionResizeMode(QHeaderView.Interactive)
+        # Start unsorted; enabling sorting would otherwise sort by the first column
+        horizontal_header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_edit.textChanged.connect(self.filter_timer.start)
+        self.column_box.currentIndexChanged.connect(self.apply_filter)
+        self.model.busy_changed.connect(self._show_busy)
+        self.model.view_changed.connect(self._show_counts)
+        self.model.error.connect(self._show_error)
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.filter_edit, 1)
+        controls.addWidget(self.column_box)
+        controls.addWidget(self.status_label)
+        layout = QVBoxLayout()
+        layout.addLayout(controls)
+        layout.addWidget(self.table)
+        central = QWidget()
+        central.setLayout(layout)
+        self.setCentralWidget(central)
+        self._show_counts(self.model.shown_rows(), len(df))
+
+    def apply_filter(self):
+        position = self.column_box.currentIndex()
+        self.model.set_filter(
+            self.filter_edit.text(), position - 1 if position > 0 else None
+        )
+
+    def closeEvent(self, event):
+        self.model.close()
+        super().closeEvent(event)
+
+    def _show_busy(self, busy: bool):
+        if busy:
+            self.status_label.setText("Working...")
+
+    def _show_counts(self, shown: int, total: int):
+        self.status_label.setText(f"{shown:,} of {total:,} rows")
+
+    def _show_error(self, message: str):
+        shown = self.model.shown_rows()
+        self.status_label.setText(f"{shown:,} rows; sort or filter failed: {message}")
+
+
+def show_dataframe(df: pd.DataFrame, title: str = "Review") -> int:
+    """
+    Open a ReviewWindow and run the Qt event loop until it is closed.
+
+    :param df: The DataFrame to review.
+    :param title: Window title.
+    :return: Exit code of the event loop.
+    """
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = ReviewWindow(df, title)
+    window.resize(1200, 800)
+    window.show()
+    return app.exec()
+
+
+def read_for_review(file_path: str, sheet_name: Optional[str] = None) -> pd.DataFrame:
+    """Reads a CSV or Excel file to review; sheet_name defaults to the first sheet."""
+    if file_path.lower().endswith(".csv"):
+        return pd.read_csv(file_path)
+    return pd.read_excel(file_path, sheet_name=sheet_name or 0)
@@ -0,0 +1,335 @@
+"""
+table_model.py
+
+A Qt table model over a DataFrame for reviewing large results, such as the bad rows of
+check_job_number or a month of fuel charges. Columns are kept as NumPy arrays, rows are
+handed to the view in blocks as it scrolls, only the cells Qt asks for are formatted,
+and sorting and filtering run on a background thread, so a million rows stay responsive.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PySide6.QtCore import (
+    QAbstractTableModel,
+    QEventLoop,
+    QModelIndex,
+    Qt,
+    QTimer,
+    Signal,
+)
+
+# Rows added to the view each time it scrolls to the end of the fetched rows
+FETCH_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
+
+
+class _Column:
+    """One DataFrame column as a NumPy array, with what formatting and sorting need."""
+
+    def __init__(self, series: pd.Series):
+        self.missing = series.isna().to_numpy()
+        self.date_only = False
+        if pd.api.types.is_bool_dtype(series.dtype):
+            self.kind = "object"
+            self.values = series.to_numpy(dtype=object)
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            # Kept as integers, since float64 rounds card numbers above 2**53; missing
+            # rows hold 0 and are told apart by the missing mask
+            self.kind = "int"
+            dtype = (
+                "uint64"
+                if pd.api.types.is_unsigned_integer_dtype(series.dtype)
+                else "int64"
+            )
+            self.values = series.to_numpy(dtype=dtype, na_value=0)
+        elif pd.api.types.is_float_dtype(series.dtype):
+            self.kind = "float"
+            self.values = series.to_numpy(dtype="float64", na_value=np.nan)
+        elif pd.api.types.is_datetime64_dtype(series.dtype):
+            self.kind = "datetime"
+            self.values = series.to_numpy(dtype="datetime64[ns]")
+            present = self.values[~self.missing]
+            self.date_only = bool((present == present.astype("datetime64[D]")).all())
+        else:
+            self.kind = "object"
+            self.values = series.to_numpy(dtype=object)
+        # Built on the worker thread the first time they are needed
+        self.sort_key: Optional[np.ndarray] = None
+        self.search_index: Optional[Tuple[np.ndarray, pd.Series]] = None
+
+    @property
+    def numeric(self) -> bool:
+        return self.kind in ("int", "float")
+
+    def format(self, row: int, float_format: str) -> str:
+        if self.missing[row]:
+            return ""
+        return self._format_value(self.values[row], float_format)
+
+    def _format_value(self, value, float_format: str) -> str:
+        if self.kind == "float":
+            return float_format.format(value)
+        if self.kind == "int":
+            return str(int(value))
+        if self.kind == "datetime":
+            text = str(value.astype("datetime64[s]")).replace("T", " ")
+            return text[:10] if self.date_only else text
+        return str(value)
+
+    def build_sort_key(self) -> np.ndarray:
+        """Numbers ordering the column; missing rows are handled by the caller."""
+        if self.sort_key is None:
+            if self.numeric:
+                self.sort_key = self.values
+            elif self.kind == "datetime":
+                self.sort_key = self.values.view("int64")
+            else:
+                try:
+                    codes, _ = pd.factorize(self.values, sort=True)
+                except TypeError:
+                    # Mixed types that cannot be compared sort by their text
+                    codes, _ = pd.factorize(self.values.astype(str), sort=True)
+                self.sort_key = codes
+        return self.sort_key
+
+    def build_search_index(self, float_format: str) -> Tuple[np.ndarray, pd.Series]:
+        """
+        Lower-case display text of each distinct value and the value code of every row
+        (-1 where missing), so a filter formats and matches each value only once.
+        """
+        if self.search_index is None:
+            codes, uniques = pd.factorize(self.values)
+            codes = np.where(self.missing, -1, codes)
+            texts = pd.Series(
+                [self._format_value(value, float_format) for value in uniques],
+                dtype=object,
+            ).str.lower()
+            self.search_index = (codes, texts)
+        return self.search_index
+
+
+class DataFrameTableModel(QAbstractTableModel):
+    # True while a sort or filter is computed in the background
+    busy_changed = Signal(bool)
+    # Rows in the current view and rows of the DataFrame
+    view_changed = Signal(int, int)
+    # Message of a sort or filter that failed; the previous view stays shown
+    error = Signal(str)
+    _view_ready = Signal(int, object, str)
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        float_format: str = "{:,.2f}",
+        fetch_size: int = FETCH_SIZE,
+        parent=None,
+    ):
+        """
+        Show a DataFrame in a QTableView without copying it into Qt.
+
+        :param df: The DataFrame; it must not be modified while the model uses it.
+        :param float_format: Format of float values; missing values are shown blank.
+        :param fetch_size: Rows handed to the view at a time as it scrolls.
+        :param parent: (Optional) Parent QObject.
+        """
+        super().__init__(parent)
+        self.df = df
+        self.float_format = float_format
+        self.fetch_size = fetch_size
+        self.column_names = [str(column) for column in df.columns]
+        self._columns = [
+            _Column(df.iloc[:, position]) for position in range(df.shape[1])
+        ]
+        self._index_labels = df.index.to_numpy()
+        # Row positions of the DataFrame in view order, after filtering and sorting
+        self._order = np.arange(len(df))
+        self._fetched = min(fetch_size, len(df))
+        self._sort_column: Optional[int] = None
+        self._sort_descending = False
+        self._filter_text = ""
+        self._filter_column: Optional[int] = None
+        # Requests made and shown; a result of an older request is dropped
+        self._generation = 0
+        self._applied_generation = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._view_ready.connect(self._apply_view)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._columns)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self._fetched < len(self._order)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.fetch_size, len(self._order) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = self._columns[index.column()]
+        if role == Qt.DisplayRole:
+            return column.format(self._order[index.row()], self.float_format)
+        if role == Qt.TextAlignmentRole and column.numeric:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.column_names[section]
+        return str(self._index_labels[self._order[section]])
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        """Called by the view's header; the new order is computed in the background."""
+        column = column if column >= 0 else None
+        if column is None and self._sort_column is None:
+            return
+        self._sort_column = column
+        # The worker thread gets a bool; PySide's enums are not safe to use off the
+        # main thread
+        self._sort_descending = order == Qt.DescendingOrder
+        self._refresh()
+
+    def set_filter(self, text: str, column: Optional[int] = None):
+        """
+        Show only rows whose displayed text contains text, ignoring case.
+
+        :param text: Text to find; empty shows every row.
+        :param column: (Optional) Position of the column to search; defaults to all.
+        """
+        self._filter_text = text.strip().lower()
+        self._filter_column = column
+        self._refresh()
+
+    @property
+    def busy(self) -> bool:
+        return not self._closed and self._generation != self._applied_generation
+
+    def wait_until_idle(self, timeout_ms: int = 30_000) -> bool:
+        """Runs a local event loop until the pending sort or filter is shown, e.g. in tests."""
+        if self.busy:
+            loop = QEventLoop()
+            timer = QTimer()
+            timer.setSingleShot(True)
+            timer.timeout.connect(loop.quit)
+            self.view_changed.connect(loop.quit)
+            timer.start(timeout_ms)
+            while self.busy and timer.isActive():
+                loop.exec()
+            timer.stop()
+            self.view_changed.disconnect(loop.quit)
+        return not self.busy
+
+    def shown_rows(self) -> int:
+        """Rows in the current view, fetched or not."""
+        return len(self._order)
+
+    def view_positions(self) -> np.ndarray:
+        """Row positions of the DataFrame in the current view order."""
+        return self._order
+
+    def view_frame(self) -> pd.DataFrame:
+        """The filtered and sorted rows as a DataFrame, e.g. to export them."""
+        return self.df.iloc[self._order]
+
+    def close(self):
+        """
+        Stops the background thread; a pending sort or filter is dropped, and later
+        sorts and filters are ignored.
+        """
+        self._closed = True
+        self._generation += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _refresh(self):
+        if self._closed:
+            return
+        was_busy = self.busy
+        self._generation += 1
+        if not was_busy:
+            self.busy_changed.emit(True)
+        self._executor.submit(
+            self._compute_view,
+            self._generation,
+            self._filter_text,
+            self._filter_column,
+            self._sort_column,
+            self._sort_descending,
+        )
+
+    def _compute_view(self, generation, text, filter_column, sort_column, descending):
+        """Worker thread: the row order of a filter and sort."""
+        if generation != self._generation:
+            # A newer request replaces this one
+            return
+        message = ""
+        try:
+            positions = self._filtered_positions(text, filter_column)
+            if sort_column is not None:
+                positions = self._sorted_positions(positions, sort_column, descending)
+        except Exception as e:
+            logger.exception("Computing the view failed")
+            message = f"{type(e).__name__}: {e}"
+            positions = None
+        self._view_ready.emit(generation, positions, message)
+
+    def _filtered_positions(self, text, filter_column) -> np.ndarray:
+        if not text:
+            return np.arange(len(self.df))
+        columns = (
+            self._columns if filter_column is None else [self._columns[filter_column]]
+        )
+        matches = np.zeros(len(self.df), dtype=bool)
+        for column in columns:
+            codes, texts = column.build_search_index(self.float_format)
+            found = texts.str.contains(text, regex=False).to_numpy(dtype=bool)
+            # The appended False is picked by the code -1 of missing values
+            matches |= np.append(found, False)[codes]
+        return np.flatnonzero(matches)
+
+    def _sorted_positions(self, positions, sort_column, descending) -> np.ndarray:
+        column = self._columns[sort_column]
+        key = column.build_sort_key()[positions]
+        missing = column.missing[positions]
+        present = positions[~missing]
+        key = key[~missing]
+        if descending:
+            # Stable ascending order of the reversed keys, reversed back, so ties keep
+            # their order; negating the keys would overflow integers
+            order = len(key) - 1 - np.argsort(key[::-1], kind="stable")[::-1]
+        else:
+            order = np.argsort(key, kind="stable")
+        # Missing values go last in both directions, like pandas
+        return np.concatenate([present[order], positions[missing]])
+
+    def _apply_view(self, generation, positions, message):
+        """Main thread: shows a computed view unless a newer one was requested."""
+        if generation != self._generation:
+            return
+        self._applied_generation = generation
+        if positions is not None:
+            self.beginResetModel()
+            self._order = positions
+            self._fetched = min(self.fetch_size, len(positions))
+            self.endResetModel()
+        self.busy_changed.emit(False)
+        self.view_changed.emit(len(self._order), len(self.df))
+        if message:
+            self.error.emit(message)
@@ -1,3 +1,6 @@
-from fuel_bill_automation.reports.charts import ChartGenerator
+import sys
 
-print(ChartGenerator)
+from fuel_bill_automation.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import pytest
+
+from fuel_bill_automation.outlook.sender import (
+    EmailSender,
+    OutgoingEmail,
+    SendLog,
+    SmtpConnectionPool,
+)
+from fuel_bill_automation.outlook.smtp_sink import SmtpSink
+
+
+@pytest.fixture
+def sink():
+    with SmtpSink() as sink:
+        yield sink
+
+
+def make_sender(sink, send_log, size=1):
+    host, port = sink.address
+    pool = SmtpConnectionPool(host, port, size=size, timeout=5)
+    return EmailSender(pool, "fleet@example.com", send_log=send_log, batch_size=10)
+
+
+def make_emails(count, attachments=()):
+    return [
+        OutgoingEmail(
+            to=[f"department{number}@example.com"],
+            subject=f"Fuel bill {number}",
+            html_body=f"<p>Bill {number}</p>",
+            attachments=list(attachments),
+        )
+        for number in range(count)
+    ]
+
+
+def test_refused_recipient_fails_only_its_message(sink):
+    sink.refused_recipients = {"department1@example.com"}
+    emails = make_emails(3)
+    keys = [email.idempotency_key() for email in emails]
+
+    with SendLog(":memory:") as send_log:
+        result = make_sender(sink, send_log).send_all(emails)
+
+    assert result.sent == [keys[0], keys[2]]
+    assert list(result.failed) == [keys[1]]
+    assert "department1@example.com" in result.failed[keys[1]]
+    assert [message.recipients for message in sink.messages] == [
+        ["department0@example.com"],
+        ["department2@example.com"],
+    ]
+    # The refusal does not cost the connection
+    assert sink.connections == 1
+
+
+def test_dropped_connection_is_retried_on_a_new_one(sink):
+    sink.drop_messages = 1
+    emails = make_emails(2)
+
+    with SendLog(":memory:") as send_log:
+        sender = make_sender(sink, send_log)
+        result = sender.send_all(emails)
+
+    assert result.sent == [email.idempotency_key() for email in emails]
+    assert result.failed == {}
+    assert len(sink.messages) == 2
+    assert sender.pool.opened == 2
+
+
+def test_second_run_skips_sent_messages(sink, tmp_path):
+    attachment = tmp_path / "bill.csv"
+    attachment.write_text("Department,Total\nFleet,12.50\n")
+    emails = make_emails(3, [str(attachment)])
+    keys = [email.idempotency_key() for email in emails]
+    database_path = str(tmp_path / "sent.db")
+
+    with SendLog(database_path) as send_log:
+        first = make_sender(sink, send_log, size=2).send_all(emails)
+    with SendLog(database_path) as send_log:
+        second = make_sender(sink, send_log, size=2).send_all(emails)
+
+    assert sorted(first.sent) == sorted(keys)
+    assert second.sent == []
+    assert second.skipped == keys
+    assert len(sink.messages) == 3
+    assert all(b'filename="bill.csv"' in message.data for message in sink.messages)
@@ -0,0 +1,128 @@
+"""
+Headless tests of the review window's table model, on Qt's offscreen platform.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PySide6.QtCore")
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+
+from fuel_bill_automation.views.table_model import DataFrameTableModel  # noqa: E402
+
+Qt = QtCore.Qt
+CARD = 7071345678901234567
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def charges():
+    return pd.DataFrame(
+        {
+            "Card": pd.array([CARD, None, 5, 5, 12], dtype="Int64"),
+            "Employee": ["Ann", "bob", "Cy", None, "ANNA"],
+            "Amount": [10.5, 2.0, np.nan, 7.25, 1.0],
+        }
+    )
+
+
+def _model(df, **kwargs):
+    return DataFrameTableModel(df, **kwargs)
+
+
+def test_rows_are_fetched_in_blocks(app):
+    model = _model(pd.DataFrame({"x": range(25)}), fetch_size=10)
+    assert model.rowCount() == 10
+    assert model.canFetchMore()
+    model.fetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 25
+    assert not model.canFetchMore()
+    assert model.data(model.index(24, 0)) == "24"
+    model.close()
+
+
+def test_large_integers_and_missing_values_are_shown_exactly(app, charges):
+    model = _model(charges)
+    assert model.data(model.index(0, 0)) == str(CARD)
+    assert model.data(model.index(1, 0)) == ""
+    assert model.data(model.index(0, 2)) == "10.50"
+    assert model.data(model.index(2, 2)) == ""
+    model.close()
+
+
+def test_sort_keeps_ties_in_order_and_missing_last(app, charges):
+    model = _model(charges)
+    counts = []
+    model.view_changed.connect(lambda shown, total: counts.append((shown, total)))
+
+    model.sort(0, Qt.AscendingOrder)
+    assert model.wait_until_idle()
+    assert model.view_positions().tolist() == [2, 3, 4, 0, 1]
+
+    model.sort(0, Qt.DescendingOrder)
+    assert model.wait_until_idle()
+    assert model.view_positions().tolist() == [0, 4, 2, 3, 1]
+
+    # Text sorts like sort_values, upper case first
+    model.sort(1, Qt.AscendingOrder)
+    assert model.wait_until_idle()
+    assert model.view_positions().tolist() == [4, 0, 2, 1, 3]
+    assert counts == [(5, 5)] * 3
+    model.close()
+
+
+def test_filter_ignores_case_and_can_target_one_column(app, charges):
+    model = _model(charges)
+    model.set_filter("ann")
+    assert model.wait_until_idle()
+    assert model.view_positions().tolist() == [0, 4]
+
+    model.set_filter(str(CARD), column=0)
+    assert model.wait_until_idle()
+    assert model.view_positions().tolist() == [0]
+
+    model.set_filter("5", column=0)
+    assert model.wait_until_idle()
+    assert model.view_positions().tolist() == [0, 2, 3]
+    assert model.view_frame()["Card"].tolist() == [CARD, 5, 5]
+
+    model.set_filter("")
+    assert model.wait_until_idle()
+    assert model.shown_rows() == 5
+    model.close()
+
+
+def test_failed_view_reports_an_error_and_keeps_the_view(app, charges, monkeypatch):
+    model = _model(charges)
+    errors = []
+    model.error.connect(errors.append)
+
+    def fail(*args):
+        raise RuntimeError("bad column")
+
+    monkeypatch.setattr(model, "_sorted_positions", fail)
+    model.sort(0, Qt.AscendingOrder)
+    assert model.wait_until_idle()
+    assert errors == ["RuntimeError: bad column"]
+    assert model.view_positions().tolist() == [0, 1, 2, 3, 4]
+    assert not model.busy
+    model.close()
+
+
+def test_sort_and_filter_after_close_do_nothing(app, charges):
+    model = _model(charges)
+    model.close()
+    model.sort(0, Qt.AscendingOrder)
+    model.set_filter("ann")
+    assert not model.busy
+    assert model.wait_until_idle(timeout_ms=100)
+    assert model.view_positions().tolist() == [0, 1, 2, 3, 4]